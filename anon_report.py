@@ -1,5 +1,9 @@
+import logging
+
 import discord
 
+logger = logging.getLogger("affinity_bot")
+
 REPORT_CHANNEL_ID = 1399854220282302524  # replace with your staff-only channel ID
 
 class ReportModal(discord.ui.Modal, title="Anonymous Report"):
@@ -12,14 +16,37 @@ class ReportModal(discord.ui.Modal, title="Anonymous Report"):
 
     async def on_submit(self, interaction: discord.Interaction):
         report_channel = interaction.client.get_channel(REPORT_CHANNEL_ID)
+        if report_channel is None:
+            await interaction.response.send_message(
+                "❌ Reports can't be delivered right now. Please try again later or contact staff.",
+                ephemeral=True
+            )
+            return
         embed = discord.Embed(
             title="📢 New Report Recieved",
             description=self.report.value,
             color=discord.Color.red()
         )
         embed.set_footer(text="Submitted via Anonymous Reporting")
-        await report_channel.send(embed=embed)
-        await interaction.response.send_message("✅ Your report has been sent anonymously.", ephemeral=True)
+        # Use the bot's paced outbound queue when it has one; reports arriving together share a message.
+        # Queued sends can take a moment, so acknowledge the interaction first.
+        outbound = getattr(interaction.client, "outbound", None)
+        if outbound is not None:
+            await interaction.response.defer(ephemeral=True, thinking=True)
+            try:
+                await outbound.send(report_channel, coalesce=True, embed=embed)
+            except Exception as e:
+                # Resolve the "thinking" state rather than leaving the reporter waiting on it
+                logger.error(f"Error delivering anonymous report: {e}")
+                await interaction.followup.send(
+                    "❌ Your report couldn't be delivered. Please try again later or contact staff.",
+                    ephemeral=True
+                )
+                return
+            await interaction.followup.send("✅ Your report has been sent anonymously.", ephemeral=True)
+        else:
+            await report_channel.send(embed=embed)
+            await interaction.response.send_message("✅ Your report has been sent anonymously.", ephemeral=True)
 
 class AnonymousReportButton(discord.ui.View):
     def __init__(self):
@@ -0,0 +1,151 @@
+import asyncio
+import cProfile
+import collections
+import io
+import logging
+import pstats
+import re
+from typing import Deque, Dict, List, Optional, Tuple
+
+from metrics import Histogram
+
+logger = logging.getLogger("affinity_bot")
+
+# Task reprs look like <Task pending name='command:/scrim' coro=<...>>
+TASK_NAME_PATTERN = re.compile(r"<Task \w+ name='([^']*)'")
+
+
+def name_current_task(name: str):
+    """Name the running task so slow callbacks inside it can be attributed to it."""
+    task = asyncio.current_task()
+    if task is not None:
+        task.set_name(name)
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class LoopLagMonitor:
+    """Samples how late the event loop wakes a sleeping task, which is how long it was blocked."""
+
+    def __init__(self, histogram: Optional[Histogram] = None, interval: float = 0.25, window: int = 240):
+        self.histogram = histogram
+        self.interval = interval
+        # Most recent samples, for percentiles over the last `window * interval` seconds
+        self._samples: Deque[float] = collections.deque(maxlen=window)
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start sampling if not already running."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="loop-lag-monitor")
+        return self._task
+
+    def stop(self):
+        """Stop sampling."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self._samples.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if self.histogram is not None:
+                self.histogram.observe(lag)
+
+    def stats(self) -> Dict[str, float]:
+        """Get lag percentiles over the recent window and the worst lag since startup."""
+        if not self._samples:
+            return {"samples": 0, "p50": 0.0, "p99": 0.0, "recent_max": 0.0, "max": self.max_lag}
+        ordered = sorted(self._samples)
+        return {
+            "samples": len(ordered),
+            "p50": _percentile(ordered, 0.5),
+            "p99": _percentile(ordered, 0.99),
+            "recent_max": ordered[-1],
+            "max": self.max_lag,
+        }
+
+
+class SlowCallbackTracker(logging.Handler):
+    """Attributes asyncio debug-mode slow callback reports to the task that ran them.
+
+    In debug mode the event loop logs every callback that runs longer than
+    `loop.slow_callback_duration`. This handler picks those reports off the asyncio
+    logger and groups them by task name, so handlers that name their task (see
+    name_current_task) show up by name.
+    """
+
+    def __init__(self, histogram: Optional[Histogram] = None, recent: int = 20):
+        super().__init__()
+        self.histogram = histogram
+        # name -> [count, total seconds, max seconds]
+        self.totals: Dict[str, List[float]] = {}
+        self.recent: Deque[Tuple[str, float]] = collections.deque(maxlen=recent)
+        self.enabled = False
+
+    def enable(self, loop: asyncio.AbstractEventLoop, threshold: float):
+        """Turn on debug mode and start collecting callbacks slower than `threshold` seconds."""
+        loop.slow_callback_duration = threshold
+        loop.set_debug(True)
+        if not self.enabled:
+            logging.getLogger("asyncio").addHandler(self)
+            self.enabled = True
+
+    def disable(self, loop: asyncio.AbstractEventLoop):
+        """Turn debug mode off again; what was collected is kept."""
+        loop.set_debug(False)
+        logging.getLogger("asyncio").removeHandler(self)
+        self.enabled = False
+
+    def emit(self, record: logging.LogRecord):
+        # Emitted by the event loop as ('Executing %s took %.3f seconds', handle, seconds)
+        if not (isinstance(record.msg, str) and record.msg.startswith("Executing")
+                and isinstance(record.args, tuple) and len(record.args) == 2):
+            return
+        handle, seconds = record.args
+        match = TASK_NAME_PATTERN.search(str(handle))
+        name = match.group(1) if match else str(handle)[:120]
+
+        entry = self.totals.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+        self.recent.append((name, seconds))
+        if self.histogram is not None:
+            self.histogram.observe(seconds, name)
+
+    def top(self, limit: int = 5) -> List[Tuple[str, int, float, float]]:
+        """Get (name, count, total seconds, max seconds) for the callers that blocked the longest."""
+        ranked = sorted(self.totals.items(), key=lambda item: item[1][1], reverse=True)
+        return [(name, int(count), total, worst) for name, (count, total, worst) in ranked[:limit]]
+
+
+_profile_lock = asyncio.Lock()
+
+
+async def profile_event_loop(seconds: float, limit: int = 30) -> str:
+    """Profile everything the event loop thread runs for a number of seconds and report the hot spots."""
+    # Only one profiler can be active on a thread at a time
+    if _profile_lock.locked():
+        raise RuntimeError("A profile is already being captured")
+    async with _profile_lock:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(limit)
+    return out.getvalue()
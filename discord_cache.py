@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger("affinity_bot")
+
+
+class DiscordCache:
+    """Channels and roles the bot sends to, looked up once and kept current by gateway events.
+
+    A channel missing from the cache is looked up in the client's gateway cache and, failing
+    that, fetched from the API. Concurrent misses for the same channel share a single fetch.
+    Entries are dropped or replaced when the gateway reports the channel, role or guild
+    changed, and the whole cache is cleared when the gateway cache is rebuilt on a new
+    session.
+
+    Members are only needed for their roles. When the client keeps no member cache they are
+    fetched on demand and held in a small LRU for `member_ttl` seconds, since without the
+    members intent there are no gateway events to keep them current.
+    """
+
+    def __init__(self, client: discord.Client, max_members: int = 256, member_ttl: float = 60):
+        self.client = client
+        self._channels: Dict[int, discord.abc.GuildChannel] = {}
+        self._roles: Dict[int, discord.Role] = {}
+        self.max_members = max_members
+        self.member_ttl = member_ttl
+        # (guild_id, user_id) -> (member, expires_at), least recently used first
+        self._members: "OrderedDict[Tuple[int, int], Tuple[discord.Member, float]]" = OrderedDict()
+        # Channel fetches in flight, shared by every caller missing the same channel
+        self._fetching: Dict[int, asyncio.Future] = {}
+        self.metrics = {
+            "channel_hits": 0,
+            "channel_misses": 0,
+            "channel_fetches": 0,
+            "role_hits": 0,
+            "role_misses": 0,
+            "member_hits": 0,
+            "member_fetches": 0,
+            "invalidations": 0,
+        }
+
+    async def get_channel(self, channel_id: int) -> Optional[discord.abc.GuildChannel]:
+        """Get a channel by ID, fetching it from the API if the gateway has not cached it."""
+        channel = self._channels.get(channel_id)
+        if channel is not None:
+            self.metrics["channel_hits"] += 1
+            return channel
+
+        self.metrics["channel_misses"] += 1
+        channel = self.client.get_channel(channel_id)
+        if channel is None:
+            future = self._fetching.get(channel_id)
+            if future is None:
+                future = asyncio.ensure_future(self._fetch_channel(channel_id))
+                self._fetching[channel_id] = future
+                future.add_done_callback(lambda _: self._fetching.pop(channel_id, None))
+            # Shielded so one caller being cancelled doesn't cancel the fetch for the others
+            channel = await asyncio.shield(future)
+
+        if channel is not None:
+            self._channels[channel_id] = channel
+        return channel
+
+    async def _fetch_channel(self, channel_id: int) -> Optional[discord.abc.GuildChannel]:
+        """Fetch a channel from the API, or None if it doesn't exist or can't be seen."""
+        self.metrics["channel_fetches"] += 1
+        try:
+            return await self.client.fetch_channel(channel_id)
+        except (discord.NotFound, discord.Forbidden) as e:
+            logger.error(f"Channel with ID {channel_id} is not available: {e}")
+            return None
+
+    def get_role(self, role_id: int) -> Optional[discord.Role]:
+        """Get a role by ID from any guild the bot is in."""
+        role = self._roles.get(role_id)
+        if role is not None:
+            self.metrics["role_hits"] += 1
+            return role
+
+        self.metrics["role_misses"] += 1
+        for guild in self.client.guilds:
+            role = guild.get_role(role_id)
+            if role is not None:
+                self._roles[role_id] = role
+                return role
+        return None
+
+    async def get_member(self, guild: discord.Guild, user_id: int) -> Optional[discord.Member]:
+        """Get a guild member with their roles, fetching them if the client doesn't cache members."""
+        member = guild.get_member(user_id)
+        if member is not None:
+            return member
+
+        key = (guild.id, user_id)
+        entry = self._members.get(key)
+        now = time.monotonic()
+        if entry is not None and entry[1] > now:
+            self._members.move_to_end(key)
+            self.metrics["member_hits"] += 1
+            return entry[0]
+
+        self.metrics["member_fetches"] += 1
+        try:
+            member = await guild.fetch_member(user_id)
+        except discord.NotFound:
+            self._members.pop(key, None)
+            return None
+
+        self._members[key] = (member, now + self.member_ttl)
+        self._members.move_to_end(key)
+        while len(self._members) > self.max_members:
+            self._members.popitem(last=False)
+        return member
+
+    async def warm(self, channel_ids: Iterable[int], role_ids: Iterable[int]):
+        """Load channels and roles ahead of their first use, logging any that are missing."""
+        for channel_id in channel_ids:
+            if await self.get_channel(channel_id) is None:
+                logger.warning(f"Channel with ID {channel_id} not found")
+        for role_id in role_ids:
+            if self.get_role(role_id) is None:
+                logger.warning(f"Role with ID {role_id} not found")
+
+    def invalidate_channel(self, channel_id: int, replacement=None):
+        """Drop a cached channel, or replace it with its updated version."""
+        if channel_id not in self._channels:
+            return
+        self.metrics["invalidations"] += 1
+        if replacement is None:
+            del self._channels[channel_id]
+        else:
+            self._channels[channel_id] = replacement
+
+    def invalidate_role(self, role_id: int, replacement=None):
+        """Drop a cached role, or replace it with its updated version."""
+        if role_id not in self._roles:
+            return
+        self.metrics["invalidations"] += 1
+        if replacement is None:
+            del self._roles[role_id]
+        else:
+            self._roles[role_id] = replacement
+
+    def invalidate_member(self, guild_id: int, user_id: int):
+        """Drop a fetched member so their roles are fetched again."""
+        if self._members.pop((guild_id, user_id), None) is not None:
+            self.metrics["invalidations"] += 1
+
+    def invalidate_guild(self, guild_id: int):
+        """Drop every cached channel, role and member belonging to a guild."""
+        for cache in (self._channels, self._roles):
+            stale = [item_id for item_id, item in cache.items() if item.guild.id == guild_id]
+            for item_id in stale:
+                del cache[item_id]
+            self.metrics["invalidations"] += len(stale)
+        for key in [key for key in self._members if key[0] == guild_id]:
+            del self._members[key]
+
+    def clear(self):
+        """Drop everything, e.g. when the gateway cache has been rebuilt."""
+        self._channels.clear()
+        self._roles.clear()
+        self._members.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Get the hit, miss and invalidation counters together with the current size."""
+        return {
+            "channels": len(self._channels),
+            "roles": len(self._roles),
+            "members": len(self._members),
+            **self.metrics,
+        }
@@ -0,0 +1,125 @@
+from typing import Any, Iterator, List, Optional, Tuple
+
+# (start, end, item) with inclusive integer bounds
+Interval = Tuple[int, int, Any]
+
+
+class _Node:
+    """Node of a centered interval tree holding every interval that contains its center."""
+
+    __slots__ = ("center", "by_start", "by_end", "left", "right")
+
+    def __init__(self, center: int, by_start: List[Interval], by_end: List[Interval],
+                 left: Optional["_Node"], right: Optional["_Node"]):
+        self.center = center
+        self.by_start = by_start  # Ascending by start
+        self.by_end = by_end  # Descending by end
+        self.left = left
+        self.right = right
+
+
+def _build(intervals: List[Interval]) -> Optional[_Node]:
+    """Build a balanced centered interval tree from a list of intervals."""
+    if not intervals:
+        return None
+
+    # Split on the median endpoint so both sides hold about half the intervals
+    endpoints = sorted(point for start, end, _ in intervals for point in (start, end))
+    center = endpoints[len(endpoints) // 2]
+
+    left, here, right = [], [], []
+    for interval in intervals:
+        if interval[1] < center:
+            left.append(interval)
+        elif interval[0] > center:
+            right.append(interval)
+        else:
+            here.append(interval)
+
+    return _Node(
+        center,
+        sorted(here, key=lambda interval: interval[0]),
+        sorted(here, key=lambda interval: interval[1], reverse=True),
+        _build(left),
+        _build(right),
+    )
+
+
+def _overlapping(node: Optional[_Node], start: int, end: int, out: List[Any]):
+    """Collect items of every interval in the tree that overlaps [start, end]."""
+    while node is not None:
+        if end < node.center:
+            # Only intervals starting at or before the end of the range can reach it
+            for interval in node.by_start:
+                if interval[0] > end:
+                    break
+                out.append(interval[2])
+            node = node.left
+        elif start > node.center:
+            # Only intervals ending at or after the start of the range can reach it
+            for interval in node.by_end:
+                if interval[1] < start:
+                    break
+                out.append(interval[2])
+            node = node.right
+        else:
+            # The range covers the center, so every interval here overlaps it
+            out.extend(interval[2] for interval in node.by_start)
+            _overlapping(node.left, start, end, out)
+            node = node.right
+
+
+class _StaticTree:
+    """Immutable interval tree over a fixed set of intervals."""
+
+    __slots__ = ("intervals", "root")
+
+    def __init__(self, intervals: List[Interval]):
+        self.intervals = intervals
+        self.root = _build(intervals)
+
+
+class IntervalIndex:
+    """Index of closed integer intervals answering point and overlap queries in logarithmic time.
+
+    Intervals are kept in a handful of static centered interval trees whose sizes are
+    distinct powers of two. Adding an interval merges equal-sized trees like a binary
+    counter, so inserts cost O(log^2 n) amortized and a query visits O(log n) trees.
+    """
+
+    def __init__(self, intervals: Optional[List[Interval]] = None):
+        self._trees: List[_StaticTree] = []
+        self._size = 0
+        if intervals:
+            self._trees.append(_StaticTree(list(intervals)))
+            self._size = len(intervals)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Interval]:
+        for tree in self._trees:
+            yield from tree.intervals
+
+    def add(self, start: int, end: int, item: Any):
+        """Add the interval [start, end] carrying an item."""
+        if end < start:
+            raise ValueError(f"Interval end {end} is before its start {start}")
+
+        carry = [(start, end, item)]
+        # Merge trees no larger than the carry so tree sizes stay roughly doubling
+        while self._trees and len(self._trees[-1].intervals) <= len(carry):
+            carry.extend(self._trees.pop().intervals)
+        self._trees.append(_StaticTree(carry))
+        self._size += 1
+
+    def at(self, point: int) -> List[Any]:
+        """Get the items of every interval containing a point."""
+        return self.overlapping(point, point)
+
+    def overlapping(self, start: int, end: int) -> List[Any]:
+        """Get the items of every interval overlapping [start, end]."""
+        out: List[Any] = []
+        for tree in self._trees:
+            _overlapping(tree.root, start, end, out)
+        return out
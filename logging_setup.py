@@ -0,0 +1,84 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+from typing import Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as a single JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queues records with their arguments merged but the traceback kept apart from the message.
+
+    The stock QueueHandler folds the traceback into the message, which leaves the listener's
+    formatters nothing to put in their own exception field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Rendered now, so the queued record holds no references to the frames
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(path: str = "bot.log", level: int = logging.INFO, json_format: bool = False,
+                  max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5,
+                  rotate_when: Optional[str] = None) -> logging.handlers.QueueListener:
+    """Route all logging through a queue to console and rotating file handlers on a background thread.
+
+    Records are only put on a queue by the thread that logs them, so logging from the event
+    loop never waits on disk. The file rotates at `max_bytes`, or on the `rotate_when`
+    schedule (see TimedRotatingFileHandler) when given, keeping `backup_count` old files.
+    """
+    formatter = JsonFormatter() if json_format else logging.Formatter(LOG_FORMAT)
+
+    if rotate_when:
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            path, when=rotate_when, backupCount=backup_count, encoding="utf-8"
+        )
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(
+        log_queue, stream_handler, file_handler, respect_handler_level=True
+    )
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener.start()
+    # Write out whatever is still queued when the process exits
+    atexit.register(listener.stop)
+    return listener
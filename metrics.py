@@ -0,0 +1,190 @@
+import bisect
+import functools
+import logging
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from aiohttp import web
+
+logger = logging.getLogger("affinity_bot")
+
+# Latency buckets in seconds; 3.0 is Discord's deadline for acknowledging an interaction
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 3.0, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render a label set such as {kind="command",name="scrim"}."""
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Monotonically increasing count per label set."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labelvalues: str, amount: float = 1):
+        """Add to the count for a label set."""
+        self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def get(self, *labelvalues: str) -> float:
+        """Get the count for a label set."""
+        return self._values.get(labelvalues, 0)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_labels(self.labelnames, labelvalues)} {value}"
+            for labelvalues, value in sorted(self._values.items())
+        ]
+
+
+class Histogram:
+    """Distribution of observed values per label set, bucketed like a Prometheus histogram."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labelvalues: str):
+        """Record one observation for a label set."""
+        entry = self._values.get(labelvalues)
+        if entry is None:
+            entry = self._values[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def count(self, *labelvalues: str) -> int:
+        """Get the number of observations for a label set."""
+        entry = self._values.get(labelvalues)
+        return sum(entry[0]) if entry else 0
+
+    def bucket_counts(self, *labelvalues: str) -> Dict[str, int]:
+        """Get the cumulative count for each bucket bound of a label set."""
+        entry = self._values.get(labelvalues)
+        counts = entry[0] if entry else [0] * (len(self.buckets) + 1)
+        cumulative, total = {}, 0
+        for bound, count in zip([*map(str, self.buckets), "+Inf"], counts):
+            total += count
+            cumulative[bound] = total
+        return cumulative
+
+    def render(self) -> List[str]:
+        lines = []
+        for labelvalues, (counts, total) in sorted(self._values.items()):
+            for bound, count in self.bucket_counts(*labelvalues).items():
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labelvalues)} {sum(counts)}")
+        return lines
+
+
+class Stats:
+    """Gauge per key of a component's stats(), read when the registry is rendered."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, collect: Callable[[], Dict[str, float]]):
+        self.name = name
+        self.help = help
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        try:
+            values = self.collect()
+        except Exception as e:
+            logger.error(f"Error collecting {self.name}: {e}")
+            return []
+        return [f"{self.name}{_labels(('stat',), (key,))} {value}" for key, value in sorted(values.items())]
+
+
+class Registry:
+    """Collection of metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        """Add a metric and return it."""
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def stats(self, name: str, help: str, collect: Callable[[], Dict[str, float]]) -> Stats:
+        return self.register(Stats(name, help, collect))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def timed(histogram: Histogram, *labelvalues: str, errors: Counter = None):
+    """Decorate a coroutine function to record its duration, and its failures in `errors`.
+
+    When one label value fewer than the histogram has labels is given, the function's
+    qualified name fills in the last one.
+    """
+    def decorator(func):
+        values = labelvalues
+        if len(values) == len(histogram.labelnames) - 1:
+            values = (*values, func.__qualname__)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                if errors is not None:
+                    errors.inc(*values)
+                raise
+            finally:
+                histogram.observe(time.perf_counter() - started, *values)
+        return wrapper
+    return decorator
+
+
+async def start_http_server(registry: Registry, host: str, port: int) -> web.AppRunner:
+    """Serve the registry at /metrics; returns the runner to clean up on shutdown."""
+    async def handle(request):
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,238 @@
+import asyncio
+import collections
+import logging
+import random
+from typing import Any, Deque, Dict, List, Optional
+
+import aiohttp
+import discord
+
+logger = logging.getLogger("affinity_bot")
+
+# Discord allows a handful of messages per channel every few seconds
+CHANNEL_RATE = 5
+CHANNEL_PER = 5.0
+
+# Longest discord.py waits out a rate limit inside a request. Longer limits raise
+# RateLimited before anything is sent, and the dispatcher waits them out instead.
+# discord.py doesn't accept less than 30 seconds.
+MAX_RATELIMIT_WAIT = 30.0
+
+# Discord's limits for a single message
+MAX_CONTENT_LENGTH = 2000
+MAX_EMBEDS = 10
+
+
+class _Outgoing:
+    """A message waiting to be sent, and the future its sender is waiting on."""
+
+    __slots__ = ("kwargs", "coalesce", "queued_at", "future")
+
+    def __init__(self, kwargs: Dict[str, Any], coalesce: bool, queued_at: float, future: asyncio.Future):
+        self.kwargs = kwargs
+        self.coalesce = coalesce
+        self.queued_at = queued_at
+        self.future = future
+
+    @property
+    def mergeable(self) -> bool:
+        """Whether this message is plain content and embeds that can share a message with others."""
+        return self.coalesce and set(self.kwargs) <= {"content", "embed", "embeds"}
+
+    def embeds(self) -> List[discord.Embed]:
+        if "embeds" in self.kwargs:
+            return list(self.kwargs["embeds"])
+        return [self.kwargs["embed"]] if self.kwargs.get("embed") else []
+
+
+class _ChannelQueue:
+    """Messages waiting for one channel, and when recent ones were sent."""
+
+    __slots__ = ("channel", "pending", "sent_at", "wakeup", "worker")
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.pending: Deque[_Outgoing] = collections.deque()
+        self.sent_at: Deque[float] = collections.deque()
+        self.wakeup = asyncio.Event()
+        self.worker: Optional[asyncio.Task] = None
+
+
+class OutboundDispatcher:
+    """Sends messages through one queue per channel, paced to stay inside Discord's rate limits.
+
+    Each channel gets a worker that sends its messages in order, at most `rate` messages
+    every `per` seconds. discord.py already waits out short rate limits and retries
+    server errors inside each send; longer rate limits (see MAX_RATELIMIT_WAIT) and
+    connections that could not be opened are retried here with jittered exponential
+    backoff. Other errors fail just that message. Messages sent with
+    coalesce=True that queue up for the same channel within `coalesce_window` seconds are
+    merged into a single message when they fit in one.
+
+    Workers exit after `idle_timeout` seconds without messages.
+    """
+
+    def __init__(self, rate: int = CHANNEL_RATE, per: float = CHANNEL_PER, max_attempts: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 30.0, coalesce_window: float = 1.0,
+                 idle_timeout: float = 60.0):
+        self.rate = rate
+        self.per = per
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.coalesce_window = coalesce_window
+        self.idle_timeout = idle_timeout
+        self._queues: Dict[int, _ChannelQueue] = {}
+        self.metrics = {"sent": 0, "coalesced": 0, "retries": 0, "failed": 0}
+
+    async def send(self, channel, *, coalesce: bool = False, **kwargs) -> discord.Message:
+        """Queue a message for a channel and wait until it has been sent; takes channel.send's arguments."""
+        loop = asyncio.get_running_loop()
+        queue = self._queues.get(channel.id)
+        if queue is None:
+            queue = self._queues[channel.id] = _ChannelQueue(channel)
+
+        outgoing = _Outgoing(kwargs, coalesce, loop.time(), loop.create_future())
+        queue.pending.append(outgoing)
+        queue.wakeup.set()
+        if queue.worker is None or queue.worker.done():
+            queue.worker = asyncio.create_task(self._work(queue), name=f"outbound-{channel.id}")
+
+        # The message goes out even if the sender stops waiting for it
+        return await asyncio.shield(outgoing.future)
+
+    def stats(self) -> Dict[str, int]:
+        """Get the counters together with the number of messages waiting."""
+        return {"queued": sum(len(queue.pending) for queue in self._queues.values()), **self.metrics}
+
+    async def close(self, timeout: float = 10.0):
+        """Wait up to `timeout` seconds for queued messages to go out, then stop the workers."""
+        workers = [queue.worker for queue in self._queues.values() if queue.worker and not queue.worker.done()]
+        for queue in self._queues.values():
+            # Wake idle workers so they notice there is nothing left and exit
+            queue.wakeup.set()
+        if workers:
+            done, pending = await asyncio.wait(workers, timeout=timeout)
+            for worker in pending:
+                worker.cancel()
+        for queue in self._queues.values():
+            for outgoing in queue.pending:
+                if not outgoing.future.done():
+                    outgoing.future.set_exception(RuntimeError("Dispatcher closed before the message was sent"))
+        self._queues.clear()
+
+    async def _work(self, queue: _ChannelQueue):
+        """Send a channel's messages in order until it has been idle for a while."""
+        loop = asyncio.get_running_loop()
+        while True:
+            if not queue.pending:
+                queue.wakeup.clear()
+                try:
+                    await asyncio.wait_for(queue.wakeup.wait(), self.idle_timeout)
+                except asyncio.TimeoutError:
+                    pass
+                if not queue.pending:
+                    self._queues.pop(queue.channel.id, None)
+                    return
+                continue
+
+            first = queue.pending[0]
+            if first.mergeable:
+                # Give messages queued right after this one a chance to join it
+                delay = first.queued_at + self.coalesce_window - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            batch = self._take_batch(queue)
+
+            await self._pace(queue)
+            try:
+                message = await self._send_with_retry(queue.channel, self._merge(batch))
+            except Exception as e:
+                self.metrics["failed"] += len(batch)
+                logger.error(f"Failed to send {len(batch)} message(s) to channel {queue.channel.id}: {e}")
+                for outgoing in batch:
+                    if not outgoing.future.done():
+                        outgoing.future.set_exception(e)
+                continue
+
+            self.metrics["sent"] += 1
+            self.metrics["coalesced"] += len(batch) - 1
+            for outgoing in batch:
+                if not outgoing.future.done():
+                    outgoing.future.set_result(message)
+
+    def _take_batch(self, queue: _ChannelQueue) -> List[_Outgoing]:
+        """Take the next message off a queue, with the mergeable ones right behind it that still fit."""
+        batch = [queue.pending.popleft()]
+        if not batch[0].mergeable:
+            return batch
+
+        length = len(batch[0].kwargs.get("content") or "")
+        embeds = len(batch[0].embeds())
+        while queue.pending and queue.pending[0].mergeable:
+            candidate = queue.pending[0]
+            candidate_length = len(candidate.kwargs.get("content") or "")
+            # Merged contents are joined by a blank line
+            if length + candidate_length + 2 > MAX_CONTENT_LENGTH:
+                break
+            if embeds + len(candidate.embeds()) > MAX_EMBEDS:
+                break
+            batch.append(queue.pending.popleft())
+            length += candidate_length + 2
+            embeds += len(candidate.embeds())
+        return batch
+
+    @staticmethod
+    def _merge(batch: List[_Outgoing]) -> Dict[str, Any]:
+        """Build the send arguments for a batch of messages."""
+        if len(batch) == 1:
+            return batch[0].kwargs
+        contents = [outgoing.kwargs["content"] for outgoing in batch if outgoing.kwargs.get("content")]
+        embeds = [embed for outgoing in batch for embed in outgoing.embeds()]
+        merged = {}
+        if contents:
+            merged["content"] = "\n\n".join(contents)
+        if embeds:
+            merged["embeds"] = embeds
+        return merged
+
+    async def _pace(self, queue: _ChannelQueue):
+        """Wait until sending another message to this channel stays within the rate limit."""
+        loop = asyncio.get_running_loop()
+        while queue.sent_at and loop.time() - queue.sent_at[0] >= self.per:
+            queue.sent_at.popleft()
+        if len(queue.sent_at) >= self.rate:
+            await asyncio.sleep(queue.sent_at[0] + self.per - loop.time())
+            queue.sent_at.popleft()
+        queue.sent_at.append(loop.time())
+
+    async def _send_with_retry(self, channel, kwargs: Dict[str, Any]) -> discord.Message:
+        """Send a message, retrying with jittered backoff only when Discord cannot have posted it."""
+        for attempt in range(1, self.max_attempts + 1):
+            # Server errors are not retried: discord.py has already retried them, and a
+            # 5xx can come back for a message that was posted, so another try could
+            # post it twice
+            try:
+                return await channel.send(**kwargs)
+            except discord.RateLimited as e:
+                # Raised before the request went out, or for a 429, which Discord rejected
+                error = e
+                retry_after = e.retry_after
+            except aiohttp.ClientConnectorError as e:
+                # The connection was never opened, so nothing was sent
+                error = e
+                retry_after = None
+
+            if attempt == self.max_attempts:
+                raise error
+
+            # Full jitter, but never sooner than Discord asked us to wait
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+            if retry_after:
+                delay = max(delay, retry_after)
+            self.metrics["retries"] += 1
+            logger.warning(
+                f"Send to channel {channel.id} failed ({error}), retrying in {delay:.1f}s "
+                f"(attempt {attempt}/{self.max_attempts})"
+            )
+            await asyncio.sleep(delay)
@@ -0,0 +1,88 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import discord
+
+
+class Policy:
+    """Who may perform an action: members with any of the given roles, and optionally administrators."""
+
+    __slots__ = ("role_ids", "administrator")
+
+    def __init__(self, role_ids: Iterable[int] = (), administrator: bool = True):
+        self.role_ids = frozenset(role_ids)
+        self.administrator = administrator
+
+    def allows(self, member: discord.Member) -> bool:
+        """Decide whether a member satisfies this policy."""
+        if self.role_ids and not self.role_ids.isdisjoint(role.id for role in member.roles):
+            return True
+        return self.administrator and member.guild_permissions.administrator
+
+
+class PermissionResolver:
+    """Per-action permission checks with decisions cached per (guild, member).
+
+    Decisions only change when a member's roles, a role's permissions or the policies
+    change. The bot calls `invalidate_member`, `invalidate_guild` and `configure` on those
+    events. Without the members intent there are no member update events, so cached
+    decisions also expire after `ttl` seconds.
+    """
+
+    def __init__(self, policies: Dict[str, Policy], max_size: int = 1024, ttl: float = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.policies: Dict[str, Policy] = {}
+        # (guild_id, member_id) -> (expires_at, {action: allowed}), least recently used first
+        self._decisions: "OrderedDict[Tuple[int, int], Tuple[float, Dict[str, bool]]]" = OrderedDict()
+        self.metrics = {"hits": 0, "misses": 0, "invalidations": 0}
+        self.configure(policies)
+
+    def configure(self, policies: Dict[str, Policy]):
+        """Replace the policies and drop every decision made under the old ones."""
+        self.policies = dict(policies)
+        self._decisions.clear()
+
+    def allowed(self, member: Optional[discord.Member], action: str) -> bool:
+        """Check whether a member may perform an action."""
+        if member is None:
+            return False
+        policy = self.policies.get(action)
+        if policy is None:
+            raise KeyError(f"No permission policy for action '{action}'")
+
+        key = (member.guild.id, member.id)
+        now = time.monotonic()
+        entry = self._decisions.get(key)
+        if entry is None or entry[0] <= now:
+            entry = (now + self.ttl, {})
+            self._decisions[key] = entry
+            while len(self._decisions) > self.max_size:
+                self._decisions.popitem(last=False)
+        self._decisions.move_to_end(key)
+
+        decisions = entry[1]
+        decision = decisions.get(action)
+        if decision is None:
+            self.metrics["misses"] += 1
+            decision = decisions[action] = policy.allows(member)
+        else:
+            self.metrics["hits"] += 1
+        return decision
+
+    def invalidate_member(self, guild_id: int, member_id: int):
+        """Drop the decisions for a member, e.g. after their roles changed."""
+        if self._decisions.pop((guild_id, member_id), None) is not None:
+            self.metrics["invalidations"] += 1
+
+    def invalidate_guild(self, guild_id: int):
+        """Drop every decision for a guild, e.g. after a role's permissions changed."""
+        stale = [key for key in self._decisions if key[0] == guild_id]
+        for key in stale:
+            del self._decisions[key]
+        self.metrics["invalidations"] += len(stale)
+
+    def stats(self) -> Dict[str, int]:
+        """Get the cache counters together with the number of members cached."""
+        return {"size": len(self._decisions), **self.metrics}
@@ -0,0 +1,160 @@
+import datetime
+import math
+from typing import Iterator, Optional, Tuple
+
+# Seconds between occurrences for each supported FREQ
+FREQUENCIES = {
+    "DAILY": 24 * 3600,
+    "WEEKLY": 7 * 24 * 3600,
+}
+
+
+class Recurrence:
+    """Repeating schedule described by an RRULE subset: FREQ=DAILY|WEEKLY, INTERVAL, COUNT and UNTIL.
+
+    Occurrences are counted from the first one, index 0. With a timezone they keep the
+    first occurrence's wall-clock time in that zone, as RRULE does, so a 20:00 scrim stays
+    at 20:00 across daylight saving changes. Without one they are a fixed period apart in
+    absolute time, i.e. at a fixed UTC time.
+
+    Either way occurrences are at most a daylight saving shift away from
+    `start + index * period`, so the first one inside any window is found arithmetically
+    and expanding next week never walks the series' history.
+    """
+
+    __slots__ = ("start", "freq", "interval", "count", "until", "tz", "_local_start")
+
+    def __init__(self, start: float, freq: str = "WEEKLY", interval: int = 1,
+                 count: Optional[int] = None, until: Optional[float] = None,
+                 tz: Optional[datetime.tzinfo] = None):
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Unsupported FREQ {freq!r}")
+        if interval < 1:
+            raise ValueError("INTERVAL must be at least 1")
+        if count is not None and count < 1:
+            raise ValueError("COUNT must be at least 1")
+        self.start = start
+        self.freq = freq
+        self.interval = interval
+        self.count = count
+        # Last timestamp an occurrence may fall on, inclusive
+        self.until = until
+        self.tz = tz
+        self._local_start = datetime.datetime.fromtimestamp(start, tz) if tz is not None else None
+
+    @property
+    def period(self) -> float:
+        """Nominal seconds between consecutive occurrences."""
+        return FREQUENCIES[self.freq] * self.interval
+
+    @classmethod
+    def parse(cls, start: float, rule: str, tz: Optional[datetime.tzinfo] = None) -> "Recurrence":
+        """Build a recurrence from a rule such as FREQ=WEEKLY;INTERVAL=2;COUNT=10."""
+        parts = {}
+        for part in filter(None, rule.upper().replace("RRULE:", "").split(";")):
+            name, _, value = part.partition("=")
+            parts[name.strip()] = value.strip()
+
+        unknown = set(parts) - {"FREQ", "INTERVAL", "COUNT", "UNTIL"}
+        if unknown:
+            raise ValueError(f"Unsupported rule parts: {', '.join(sorted(unknown))}")
+
+        until = None
+        if "UNTIL" in parts:
+            until = datetime.datetime.strptime(parts["UNTIL"], "%Y%m%dT%H%M%SZ").replace(
+                tzinfo=datetime.timezone.utc
+            ).timestamp()
+        return cls(
+            start,
+            freq=parts.get("FREQ", "WEEKLY"),
+            interval=int(parts.get("INTERVAL", 1)),
+            count=int(parts["COUNT"]) if "COUNT" in parts else None,
+            until=until,
+            tz=tz,
+        )
+
+    def to_rule(self) -> str:
+        """Get the rule string for this recurrence."""
+        parts = [f"FREQ={self.freq}"]
+        if self.interval != 1:
+            parts.append(f"INTERVAL={self.interval}")
+        if self.count is not None:
+            parts.append(f"COUNT={self.count}")
+        if self.until is not None:
+            until = datetime.datetime.fromtimestamp(self.until, datetime.timezone.utc)
+            parts.append(f"UNTIL={until.strftime('%Y%m%dT%H%M%SZ')}")
+        return ";".join(parts)
+
+    def at(self, index: int) -> float:
+        """Get the timestamp of an occurrence index, ignoring the series' end."""
+        if self._local_start is None:
+            return self.start + index * self.period
+        # Aware datetime arithmetic is wall-clock arithmetic within the zone
+        return (self._local_start + datetime.timedelta(seconds=index * self.period)).timestamp()
+
+    def last_index(self) -> Optional[int]:
+        """Get the index of the final occurrence, or None if the series never ends."""
+        last = None
+        if self.count is not None:
+            last = self.count - 1
+        if self.until is not None:
+            if self.until < self.start:
+                return -1
+            by_until = int((self.until - self.start) // self.period)
+            # Step over a daylight saving shift either way
+            while self.at(by_until + 1) <= self.until:
+                by_until += 1
+            while by_until >= 0 and self.at(by_until) > self.until:
+                by_until -= 1
+            last = by_until if last is None else min(last, by_until)
+        return last
+
+    def occurrence(self, index: int) -> Optional[float]:
+        """Get the timestamp of an occurrence, or None if the series has no such occurrence."""
+        last = self.last_index()
+        if index < 0 or (last is not None and index > last):
+            return None
+        return self.at(index)
+
+    def first_index_from(self, timestamp: float) -> int:
+        """Get the index of the first occurrence at or after a timestamp, ignoring the series' end."""
+        index = max(0, math.ceil((timestamp - self.start) / self.period))
+        # Step over a daylight saving shift either way
+        while index > 0 and self.at(index - 1) >= timestamp:
+            index -= 1
+        while self.at(index) < timestamp:
+            index += 1
+        return index
+
+    def between(self, start: float, end: float) -> Iterator[Tuple[int, float]]:
+        """Yield (index, timestamp) for each occurrence within [start, end), in order."""
+        last = self.last_index()
+        index = self.first_index_from(start)
+        while last is None or index <= last:
+            timestamp = self.at(index)
+            if timestamp >= end:
+                return
+            yield index, timestamp
+            index += 1
+
+    def index_on(self, date: datetime.date) -> Optional[int]:
+        """Get the index of the occurrence falling on a date, in the series' timezone if it has one."""
+        midnight = datetime.datetime.combine(date, datetime.time(), self.tz).timestamp()
+        next_midnight = datetime.datetime.combine(date + datetime.timedelta(days=1), datetime.time(), self.tz).timestamp()
+        for index, _ in self.between(midnight, next_midnight):
+            return index
+        return None
+
+    def describe(self) -> str:
+        """Describe the schedule, such as 'every week at the same Europe/Berlin time, 10 times'."""
+        unit = "week" if self.freq == "WEEKLY" else "day"
+        description = f"every {unit}" if self.interval == 1 else f"every {self.interval} {unit}s"
+        if self.tz is not None:
+            description += f" at the same {self.tz} time"
+        else:
+            description += " at the same UTC time, not following daylight saving"
+        if self.count is not None:
+            description += f", {self.count} times"
+        if self.until is not None:
+            description += f" until <t:{int(self.until)}:d>"
+        return description
@@ -4,33 +4,152 @@ from discord.ext import commands
 import datetime
 import os
 import asyncio
+import concurrent.futures
+import contextlib
+import functools
+import hashlib
+import heapq
+import io
+import itertools
+import random
+import threading
+import time
 from discord import app_commands
-from typing import Dict, List, Optional, Union, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Union, Any
 import re
+import pathlib
 import googleapiclient.discovery
+import google_auth_httplib2
+import httplib2
 from google.oauth2.credentials import Credentials
 import logging
+import json
 import sqlite3
+import zoneinfo
 import aiosqlite
-
-reminder_loop_started = False
+from diagnostics import LoopLagMonitor, SlowCallbackTracker, name_current_task, profile_event_loop
+from discord_cache import DiscordCache
+from interval_index import IntervalIndex
+from logging_setup import setup_logging
+from metrics import Registry, start_http_server, timed
+from outbound import MAX_RATELIMIT_WAIT, OutboundDispatcher
+from permissions import PermissionResolver, Policy
+from recurrence import Recurrence
+from session_store import SessionStore
+
+# When the gateway connection that led to the current on_ready was opened
+connected_at: Optional[float] = None
 
 # --- Configure Logging ---
-logging.basicConfig(
+# Handlers run on a background thread so logging never blocks the event loop.
+# LOG_FORMAT=json writes one JSON object per line; LOG_ROTATE_WHEN (e.g. "midnight")
+# rotates on a schedule instead of at LOG_MAX_BYTES.
+log_listener = setup_logging(
+    path="bot.log",
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("bot.log")
-    ]
+    json_format=os.getenv("LOG_FORMAT", "").lower() == "json",
+    max_bytes=int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024)),
+    backup_count=int(os.getenv("LOG_BACKUP_COUNT", 5)),
+    rotate_when=os.getenv("LOG_ROTATE_WHEN") or None
 )
 logger = logging.getLogger("affinity_bot")
 
 # --- Bot Setup ---
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
-bot = commands.Bot(command_prefix="/", intents=intents)
+class AffinityBot(commands.Bot):
+    """Bot with a one-time startup and a shutdown that releases everything it started.
+
+    on_ready runs again after every reconnect, so it only handles work that depends on
+    the gateway cache. Opening the database, starting background tasks and registering
+    views happen exactly once in setup_hook, and close() undoes them.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # Long rate limits raise instead of holding the request; the outbound dispatcher waits them out
+        kwargs.setdefault("max_ratelimit_timeout", MAX_RATELIMIT_WAIT)
+        super().__init__(*args, **kwargs)
+        self._shut_down = False
+        self.metrics_runner = None
+        # Every message the bot posts on its own goes through here, paced per channel
+        self.outbound = OutboundDispatcher()
+
+    async def setup_hook(self):
+        """Initialize resources and start background work before connecting to the gateway."""
+        await db_manager.initialize()
+        await calendar_manager.initialize()
+
+        # Event loop diagnostics
+        loop_lag_monitor.start()
+        if DIAG_DEBUG_LOOP:
+            slow_callbacks.enable(self.loop, SLOW_CALLBACK_THRESHOLD)
+
+        # Background work; the loops wait for the first on_ready themselves
+        reminder_scheduler.start()
+        calendar_outbox.start()
+        sessions.start()
+
+        if METRICS_PORT:
+            try:
+                self.metrics_runner = await start_http_server(metrics_registry, METRICS_HOST, METRICS_PORT)
+            except OSError as e:
+                logger.error(f"Could not start the metrics endpoint on {METRICS_HOST}:{METRICS_PORT}: {e}")
+
+        # Register persistent views
+        self.add_view(PersistentScrimButton())
+        self.add_view(PersistentAbsenceView())
+        self.add_view(AnonymousReportButton())
+
+        # Sync slash commands, skipping the rate-limited API call when nothing changed
+        try:
+            sync_started = time.monotonic()
+            synced = await sync_command_tree()
+            logger.info(
+                f"Command sync {'ran' if synced else 'skipped'} in {time.monotonic() - sync_started:.2f}s"
+            )
+        except Exception as e:
+            logger.error(f"Error syncing slash commands: {e}")
+
+    async def close(self):
+        """Stop background work, disconnect, then persist pending state and close resources."""
+        if self._shut_down:
+            return await super().close()
+        self._shut_down = True
+
+        await reminder_scheduler.stop()
+        await calendar_outbox.stop()
+        loop_lag_monitor.stop()
+        # Let queued messages go out while the connection is still up
+        await self.outbound.close()
+        await super().close()
+
+        # Persist in-progress workflows, then close the Calendar workers and database
+        await sessions.close()
+        calendar_manager.close()
+        await db_manager.close()
+        if self.metrics_runner:
+            await self.metrics_runner.cleanup()
+        logger.info("Bot shut down, resources cleaned up")
+
+# Low-footprint mode drops the privileged intents and the member cache. Everything runs on
+# slash commands and components, member roles come from interaction payloads or an
+# on-demand fetch, and prefix commands such as forcesync are invoked by mentioning the bot.
+LOW_FOOTPRINT = os.getenv("BOT_LOW_FOOTPRINT", "").lower() in ("1", "true", "yes")
+
+if LOW_FOOTPRINT:
+    intents = discord.Intents.none()
+    intents.guilds = True
+    intents.guild_messages = True
+    intents.dm_messages = True
+    bot = AffinityBot(
+        command_prefix=commands.when_mentioned,
+        intents=intents,
+        chunk_guilds_at_startup=False,
+        member_cache_flags=discord.MemberCacheFlags.none()
+    )
+else:
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    bot = AffinityBot(command_prefix="/", intents=intents)
 
 # --- Configuration Constants ---
 # Team configuration
@@ -60,6 +179,101 @@ ALLOWED_ROLES = [
     1354280624625815773   # Coach role ID
 ]
 
+# Who may perform each action: members with any of the roles, or administrators
+PERMISSION_POLICIES = {
+    "schedule_scrim": Policy(ALLOWED_ROLES),
+    "view_absences": Policy(ALLOWED_ROLES),
+    "create_persistent_button": Policy(),
+    "manage_reminders": Policy(ALLOWED_ROLES),
+}
+
+# Team value of the reminder stages used by every team without stages of its own
+DEFAULT_REMINDER_TEAM = ""
+
+# Longest a reminder stage may be before the scrim, in minutes
+REMINDER_MAX_OFFSET = 7 * 24 * 60
+
+# Reminder stage offsets such as 24h, 2h, 30m or 1h30m
+REMINDER_OFFSET_PATTERN = re.compile(r"^\s*(?:(\d+)\s*d)?\s*(?:(\d+)\s*h)?\s*(?:(\d+)\s*m)?\s*$", re.IGNORECASE)
+
+# Seconds ahead for which the reminder scheduler holds deliveries in memory
+REMINDER_HORIZON = 6 * 3600
+
+# Seconds ahead that occurrences of recurring scrims are written to the scrims table.
+# Covers the longest reminder stage plus the scheduler's horizon, so every stage's
+# delivery exists before the scheduler reads that far.
+SERIES_WINDOW = REMINDER_MAX_OFFSET * 60 + 2 * REMINDER_HORIZON
+
+# Recurrence rule of scrims confirmed with "Confirm & Repeat Weekly"
+WEEKLY_RULE = "FREQ=WEEKLY"
+
+# Upcoming occurrences listed per series by /series_list
+SERIES_LIST_OCCURRENCES = 4
+
+# Seconds to wait before retrying a failed reminder
+REMINDER_RETRY_DELAY = 60
+
+# Longest the reminder scheduler sleeps without re-checking the clock
+REMINDER_MAX_SLEEP = 3600
+
+# Most reminders being sent at the same time
+REMINDER_MAX_CONCURRENCY = 20
+
+# Seconds that database writes are held so concurrent writers share one commit
+GROUP_COMMIT_WINDOW = 0.005
+
+# Number of read-only database connections used by query methods
+DB_READER_POOL_SIZE = 3
+
+# Pragmas applied to every database connection
+DB_PRAGMAS = {
+    "busy_timeout": 5000,  # Wait up to 5s for a lock instead of failing
+    "cache_size": -16000,  # 16 MB page cache per connection
+    "mmap_size": 134217728,  # Memory-map the first 128 MB of the file
+    "temp_store": "MEMORY",
+}
+
+# Extra pragmas for the writer connection; WAL with NORMAL sync only fsyncs at checkpoints
+DB_WRITER_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+}
+
+# Threads dedicated to Google Calendar calls, and how many more calls may wait for one
+CALENDAR_MAX_WORKERS = 4
+CALENDAR_MAX_QUEUED = 16
+
+# Seconds before a Google Calendar HTTP request times out
+CALENDAR_HTTP_TIMEOUT = 30
+
+# Most requests Google Calendar accepts in one batch request
+CALENDAR_BATCH_LIMIT = 50
+
+# Calendar outbox: entries per pass, attempts before giving up, and backoff bounds in seconds
+CALENDAR_OUTBOX_BATCH_SIZE = 50
+CALENDAR_OUTBOX_MAX_ATTEMPTS = 8
+CALENDAR_OUTBOX_BASE_DELAY = 30
+CALENDAR_OUTBOX_MAX_DELAY = 3600
+
+# Longest the calendar outbox worker sleeps without re-checking for due entries
+CALENDAR_OUTBOX_IDLE_SLEEP = 300
+
+# Seconds a new outbox entry waits for its management notification to be recorded before
+# the worker creates the event anyway, without adding the calendar link to a message
+CALENDAR_OUTBOX_HOLD = 120
+
+# Workflow sessions expire after this many seconds without activity (interaction tokens last 15 minutes)
+SESSION_TTL = 900
+
+# Most workflow sessions kept at once; the least recently used is evicted beyond this
+SESSION_MAX_ACTIVE = 5000
+
+# Seconds between sweeps for expired workflow sessions
+SESSION_SWEEP_INTERVAL = 60
+
+# Seconds between batched writes of changed workflow sessions to the database
+SESSION_FLUSH_INTERVAL = 1.0
+
 # Channel for absence notifications
 ABSENCE_MANAGEMENT_CHANNEL_ID = 1367628087130456135
 
@@ -71,6 +285,28 @@ MAP_OPTIONS = ["Abyss", "Ascent", "Bind", "Breeze", "Corrode", "Fracture", "Have
 SERVER_OPTIONS = ["Frankfurt", "London", "Amsterdam", "Paris", "Warsaw", "Stockholm", "Madrid", "Virginia", "Illinois", "Texas", "Oregon", "California"]
 FORMAT_OPTIONS = ["1 Game", "2 Games", "1 Game MR24", "2 Games MR24", "Best of 1", "Best of 3", "Best of 5"]
 
+# Estimated duration of each format, used to detect overlapping scrims
+FORMAT_DURATIONS = {
+    "1 Game": datetime.timedelta(minutes=60),
+    "2 Games": datetime.timedelta(minutes=120),
+    "1 Game MR24": datetime.timedelta(minutes=75),
+    "2 Games MR24": datetime.timedelta(minutes=150),
+    "Best of 1": datetime.timedelta(minutes=60),
+    "Best of 3": datetime.timedelta(minutes=180),
+    "Best of 5": datetime.timedelta(minutes=300),
+}
+DEFAULT_FORMAT_DURATION = datetime.timedelta(minutes=120)
+
+# Most scheduling conflicts listed in a scrim preview
+MAX_CONFLICTS_SHOWN = 10
+
+# Members fetched on demand for their roles when there is no member cache
+MEMBER_CACHE_SIZE = 256
+MEMBER_CACHE_TTL = 60  # Seconds
+
+# bot_state key holding the hash of the last command tree synced with Discord
+COMMAND_TREE_HASH_KEY = "command_tree_hash"
+
 # Absence types with their descriptions
 ABSENCE_TYPES = [
     {"label": "Vacation", "value": "vacation", "description": "Planned time off"},
@@ -96,230 +332,1708 @@ TIMEZONE_MAPPING = {
     "EST": -5, "EDT": -4, "PST": -8, "PDT": -7
 }
 
+# Zones that recurring scrims entered in a daylight saving timezone follow, so they keep
+# their local time when the clocks change. Other timezones repeat at a fixed UTC time;
+# GMT is UTC+0 all year, as in TIMEZONE_MAPPING, not London time.
+SERIES_TIMEZONES = {
+    "GMT": "UTC", "BST": "Europe/London",
+    "CET": "Europe/Berlin", "CEST": "Europe/Berlin",
+    "EST": "America/New_York", "EDT": "America/New_York",
+    "PST": "America/Los_Angeles", "PDT": "America/Los_Angeles"
+}
+
+# --- Metrics ---
+# Served in the Prometheus text format on a local port; set METRICS_PORT=0 to disable
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9108))
+
+metrics_registry = Registry()
+INTERACTION_SECONDS = metrics_registry.histogram(
+    "bot_interaction_duration_seconds", "Time spent handling an interaction", ("kind", "handler")
+)
+INTERACTION_ERRORS = metrics_registry.counter(
+    "bot_interaction_errors_total", "Interaction handlers that raised", ("kind", "handler")
+)
+DB_SECONDS = metrics_registry.histogram(
+    "bot_db_duration_seconds", "Time spent in a database method", ("method",)
+)
+DB_ERRORS = metrics_registry.counter(
+    "bot_db_errors_total", "Database methods that raised", ("method",)
+)
+CALENDAR_SECONDS = metrics_registry.histogram(
+    "bot_calendar_duration_seconds", "Time spent in a Google Calendar call", ("call",)
+)
+CALENDAR_ERRORS = metrics_registry.counter(
+    "bot_calendar_errors_total", "Google Calendar calls that raised", ("call",)
+)
+
+LOOP_LAG_SECONDS = metrics_registry.histogram(
+    "bot_event_loop_lag_seconds", "How late the event loop woke a sleeping task",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+SLOW_CALLBACK_SECONDS = metrics_registry.histogram(
+    "bot_slow_callback_duration_seconds", "Event loop callbacks that ran past the slow callback threshold",
+    ("task",), buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+
+# Event loop diagnostics. Slow callback reporting needs asyncio debug mode, which has a
+# cost, so it is off unless DIAG_DEBUG_LOOP is set; /diag can turn it on at runtime.
+LOOP_LAG_INTERVAL = 0.25  # Seconds between loop lag samples
+SLOW_CALLBACK_THRESHOLD = int(os.getenv("DIAG_SLOW_CALLBACK_MS", 100)) / 1000
+DIAG_DEBUG_LOOP = os.getenv("DIAG_DEBUG_LOOP", "").lower() in ("1", "true", "yes")
+DIAG_MAX_PROFILE_SECONDS = 60
+
+loop_lag_monitor = LoopLagMonitor(LOOP_LAG_SECONDS, interval=LOOP_LAG_INTERVAL)
+slow_callbacks = SlowCallbackTracker(SLOW_CALLBACK_SECONDS)
+
+def describe_interaction(kind: str, func, interaction: Optional[discord.Interaction]) -> str:
+    """Name an interaction handler by its command name or component custom_id."""
+    if interaction is not None:
+        if interaction.command is not None:
+            return f"{kind}:/{interaction.command.qualified_name}"
+        custom_id = (interaction.data or {}).get("custom_id")
+        if custom_id:
+            return f"{kind}:{func.__qualname__} custom_id={custom_id}"
+    return f"{kind}:{func.__qualname__}"
+
+def instrument(kind: str):
+    """Record the latency and failures of an interaction handler of a kind (command, component, modal).
+
+    The task running the handler is named after it, so event loop stalls can be attributed to it.
+    """
+    def decorator(func):
+        timed_func = timed(INTERACTION_SECONDS, kind, errors=INTERACTION_ERRORS)(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            interaction = next((arg for arg in args if isinstance(arg, discord.Interaction)), None)
+            name_current_task(describe_interaction(kind, func, interaction))
+            return await timed_func(*args, **kwargs)
+        return wrapper
+    return decorator
+
 # --- Database Setup ---
+# Schema migrations, applied in order. The position in this list (starting at 1)
+# is the schema version recorded in PRAGMA user_version once it has been applied.
+# Never edit a migration that has shipped; append a new one instead.
+SCHEMA_MIGRATIONS = [
+    # 1: Base tables
+    '''
+    CREATE TABLE IF NOT EXISTS scrims (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        team TEXT NOT NULL,
+        opponent TEXT NOT NULL,
+        start_time TIMESTAMP NOT NULL,
+        format TEXT NOT NULL,
+        maps TEXT NOT NULL,
+        server TEXT NOT NULL,
+        players TEXT NOT NULL,
+        opponent_rank TEXT NOT NULL,
+        reminder_sent BOOLEAN DEFAULT FALSE,
+        channel_id INTEGER NOT NULL,
+        role_id INTEGER NOT NULL
+    );
+    
+    CREATE TABLE IF NOT EXISTS absences (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        user_name TEXT NOT NULL,
+        absence_type TEXT NOT NULL,
+        start_date DATE NOT NULL,
+        end_date DATE NOT NULL,
+        team TEXT NOT NULL,
+        reason TEXT NOT NULL,
+        calendar_link TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    ''',
+    # 2: Partial index covering only scrims still waiting for a reminder
+    '''
+    CREATE INDEX IF NOT EXISTS idx_scrims_pending_reminder
+    ON scrims(start_time) WHERE reminder_sent = FALSE;
+    ''',
+    # 3: Absence lookups by team/date range and by user
+    '''
+    CREATE INDEX IF NOT EXISTS idx_absences_team_dates
+    ON absences(team, start_date, end_date);
+    
+    CREATE INDEX IF NOT EXISTS idx_absences_user
+    ON absences(user_id);
+    ''',
+    # 4: Scrim maps and players as child rows (scrims.maps/players are legacy and no longer written)
+    '''
+    CREATE TABLE IF NOT EXISTS scrim_maps (
+        scrim_id INTEGER NOT NULL REFERENCES scrims(id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        map_name TEXT NOT NULL,
+        PRIMARY KEY (scrim_id, position)
+    ) WITHOUT ROWID;
+    
+    CREATE TABLE IF NOT EXISTS scrim_players (
+        scrim_id INTEGER NOT NULL REFERENCES scrims(id) ON DELETE CASCADE,
+        position INTEGER NOT NULL,
+        player TEXT NOT NULL,
+        user_id INTEGER,
+        PRIMARY KEY (scrim_id, position)
+    ) WITHOUT ROWID;
+    
+    CREATE INDEX IF NOT EXISTS idx_scrim_players_user
+    ON scrim_players(user_id) WHERE user_id IS NOT NULL;
+    
+    WITH RECURSIVE split(scrim_id, position, item, rest) AS (
+        SELECT id, -1, NULL, maps || ',' FROM scrims WHERE maps != ''
+        UNION ALL
+        SELECT scrim_id, position + 1, substr(rest, 1, instr(rest, ',') - 1), substr(rest, instr(rest, ',') + 1)
+        FROM split WHERE rest != ''
+    )
+    INSERT INTO scrim_maps (scrim_id, position, map_name)
+    SELECT scrim_id, position, item FROM split WHERE position >= 0;
+    
+    WITH RECURSIVE split(scrim_id, position, item, rest) AS (
+        SELECT id, -1, NULL, players || ',' FROM scrims WHERE players != ''
+        UNION ALL
+        SELECT scrim_id, position + 1, substr(rest, 1, instr(rest, ',') - 1), substr(rest, instr(rest, ',') + 1)
+        FROM split WHERE rest != ''
+    )
+    INSERT INTO scrim_players (scrim_id, position, player, user_id)
+    SELECT scrim_id, position, item,
+           CASE WHEN trim(item) GLOB '<@[0-9]*>' OR trim(item) GLOB '<@![0-9]*>'
+                THEN CAST(replace(replace(replace(trim(item), '<@!', ''), '<@', ''), '>', '') AS INTEGER)
+           END
+    FROM split WHERE position >= 0;
+    ''',
+    # 5: Per-team scrim lookups by time, used for conflict detection
+    '''
+    CREATE INDEX IF NOT EXISTS idx_scrims_team_start
+    ON scrims(team, start_time);
+    ''',
+    # 6: Outbox of Google Calendar events waiting to be created
+    '''
+    CREATE TABLE IF NOT EXISTS calendar_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        absence_id INTEGER NOT NULL REFERENCES absences(id) ON DELETE CASCADE,
+        event TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL,
+        last_error TEXT,
+        notification_channel_id INTEGER,
+        notification_message_id INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    
+    CREATE INDEX IF NOT EXISTS idx_calendar_outbox_pending
+    ON calendar_outbox(next_attempt_at) WHERE status = 'pending';
+    
+    CREATE INDEX IF NOT EXISTS idx_calendar_outbox_absence
+    ON calendar_outbox(absence_id);
+    ''',
+    # 7: Workflow sessions persisted across restarts
+    '''
+    CREATE TABLE IF NOT EXISTS workflow_sessions (
+        user_id INTEGER PRIMARY KEY,
+        data TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    
+    CREATE INDEX IF NOT EXISTS idx_workflow_sessions_expiry
+    ON workflow_sessions(expires_at);
+    ''',
+    # 8: Small key/value store for bot state that must survive restarts
+    '''
+    CREATE TABLE IF NOT EXISTS bot_state (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    ) WITHOUT ROWID;
+    ''',
+    # 9: Configurable reminder stages, with a delivery row per scrim and stage.
+    #    The scrims.reminder_sent flag becomes the 30 minute stage and is no longer read.
+    '''
+    CREATE TABLE IF NOT EXISTS reminder_stages (
+        team TEXT NOT NULL,
+        offset_minutes INTEGER NOT NULL CHECK (offset_minutes > 0),
+        PRIMARY KEY (team, offset_minutes)
+    ) WITHOUT ROWID;
+    
+    INSERT OR IGNORE INTO reminder_stages (team, offset_minutes) VALUES ('', 30);
+    
+    CREATE TABLE IF NOT EXISTS reminder_deliveries (
+        scrim_id INTEGER NOT NULL REFERENCES scrims(id) ON DELETE CASCADE,
+        offset_minutes INTEGER NOT NULL,
+        due_at REAL NOT NULL,
+        sent_at REAL,
+        PRIMARY KEY (scrim_id, offset_minutes)
+    ) WITHOUT ROWID;
+    
+    INSERT OR IGNORE INTO reminder_deliveries (scrim_id, offset_minutes, due_at, sent_at)
+    SELECT id, 30, start_time - 1800, CASE WHEN reminder_sent THEN start_time - 1800 END
+    FROM scrims;
+    
+    CREATE INDEX IF NOT EXISTS idx_reminder_deliveries_due
+    ON reminder_deliveries(due_at) WHERE sent_at IS NULL;
+    
+    DROP INDEX IF EXISTS idx_scrims_pending_reminder;
+    ''',
+    # 10: Recurring scrim series. Occurrences are expanded from the rule and only written
+    #     to scrims (with their series and occurrence index) shortly before they happen.
+    '''
+    CREATE TABLE IF NOT EXISTS scrim_series (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        team TEXT NOT NULL,
+        opponent TEXT NOT NULL,
+        opponent_rank TEXT NOT NULL,
+        format TEXT NOT NULL,
+        server TEXT NOT NULL,
+        maps TEXT NOT NULL,
+        players TEXT NOT NULL,
+        channel_id INTEGER NOT NULL,
+        role_id INTEGER NOT NULL,
+        first_start REAL NOT NULL,
+        rule TEXT NOT NULL,
+        materialized_until REAL NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    
+    CREATE TABLE IF NOT EXISTS scrim_series_exceptions (
+        series_id INTEGER NOT NULL REFERENCES scrim_series(id) ON DELETE CASCADE,
+        occurrence INTEGER NOT NULL,
+        skipped BOOLEAN NOT NULL DEFAULT FALSE,
+        overrides TEXT NOT NULL DEFAULT '{}',
+        PRIMARY KEY (series_id, occurrence)
+    ) WITHOUT ROWID;
+    
+    ALTER TABLE scrims ADD COLUMN series_id INTEGER REFERENCES scrim_series(id);
+    ALTER TABLE scrims ADD COLUMN occurrence INTEGER;
+    
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_scrims_series_occurrence
+    ON scrims(series_id, occurrence) WHERE series_id IS NOT NULL;
+    ''',
+    # 11: Timezone whose wall-clock time a series follows; NULL repeats at a fixed UTC time
+    '''
+    ALTER TABLE scrim_series ADD COLUMN timezone TEXT;
+    ''',
+]
+
+# Hot queries that must be served by an index, checked against EXPLAIN QUERY PLAN at startup
+INDEXED_QUERIES = {
+    "due reminder deliveries": (
+        "SELECT scrim_id FROM reminder_deliveries WHERE sent_at IS NULL AND due_at > ? AND due_at <= ?", (0, 0)
+    ),
+    "team absences": (
+        "SELECT id FROM absences WHERE team = ? AND start_date <= ? AND end_date >= ?", ("", "", "")
+    ),
+    "user absences": (
+        "SELECT id FROM absences WHERE user_id = ?", (0,)
+    ),
+    "player scrims": (
+        "SELECT scrim_id FROM scrim_players WHERE user_id = ?", (0,)
+    ),
+    "team scrims": (
+        "SELECT id FROM scrims WHERE team = ? AND start_time >= ? AND start_time < ?", ("", 0, 0)
+    ),
+    "due calendar events": (
+        "SELECT id FROM calendar_outbox WHERE status = 'pending' AND next_attempt_at <= ?", (0,)
+    ),
+    "series occurrence": (
+        "SELECT id FROM scrims WHERE series_id = ? AND occurrence = ?", (0, 0)
+    ),
+}
+
+# Matches a Discord user mention such as <@123> or <@!123>
+USER_MENTION_PATTERN = re.compile(r"^<@!?(\d+)>$")
+
+def resolve_player_id(player: str) -> Optional[int]:
+    """Get the Discord user ID from a player entry if it is a mention."""
+    match = USER_MENTION_PATTERN.match(player.strip())
+    return int(match.group(1)) if match else None
+
+class ScrimRecord:
+    """A scheduled scrim as stored in the database"""
+    
+    __slots__ = ("id", "team", "opponent", "start_time", "format", "maps", "server",
+                 "players", "player_user_ids", "opponent_rank", "channel_id", "role_id",
+                 "series_id", "occurrence")
+    
+    def __init__(self, id, team, opponent, start_time, format, maps, server, players,
+                 opponent_rank, channel_id, role_id, player_user_ids=None, series_id=None, occurrence=None):
+        self.id = id
+        self.team = team
+        self.opponent = opponent
+        self.start_time = start_time
+        self.format = format
+        self.maps = tuple(maps)
+        self.server = server
+        self.players = tuple(players)
+        # Discord user ID for each entry in players, or None where it wasn't a mention
+        if player_user_ids is None:
+            player_user_ids = (resolve_player_id(player) for player in self.players)
+        self.player_user_ids = tuple(player_user_ids)
+        self.opponent_rank = opponent_rank
+        self.channel_id = channel_id
+        self.role_id = role_id
+        # Series this scrim is an occurrence of, and which one, for recurring scrims
+        self.series_id = series_id
+        self.occurrence = occurrence
+        
+    def __repr__(self):
+        return f"<ScrimRecord id={self.id} team={self.team!r} start_time={self.start_time}>"
+
+class ScrimSeries:
+    """A recurring scrim: one template expanded into occurrences by its recurrence rule"""
+    
+    __slots__ = ("id", "team", "opponent", "opponent_rank", "format", "maps", "server", "players",
+                 "channel_id", "role_id", "recurrence", "exceptions", "materialized_until")
+    
+    def __init__(self, id, team, opponent, opponent_rank, format, maps, server, players,
+                 channel_id, role_id, recurrence: Recurrence, exceptions=None, materialized_until=0.0):
+        self.id = id
+        self.team = team
+        self.opponent = opponent
+        self.opponent_rank = opponent_rank
+        self.format = format
+        self.maps = tuple(maps)
+        self.server = server
+        self.players = tuple(players)
+        self.channel_id = channel_id
+        self.role_id = role_id
+        self.recurrence = recurrence
+        # Occurrence index -> (skipped, overrides) for occurrences that differ from the template
+        self.exceptions: Dict[int, Tuple[bool, Dict[str, Any]]] = dict(exceptions or {})
+        # Occurrences scheduled before this timestamp have been written to the scrims table
+        self.materialized_until = materialized_until
+        
+    def is_skipped(self, index) -> bool:
+        return self.exceptions.get(index, (False, {}))[0]
+        
+    def finished(self, now) -> bool:
+        """Whether the series has no occurrences after a timestamp"""
+        last = self.recurrence.last_index()
+        return last is not None and (last < 0 or self.recurrence.occurrence(last) <= now)
+        
+    def occurrence(self, index, overrides=None) -> ScrimRecord:
+        """Build the scrim for an occurrence with its overrides applied"""
+        if overrides is None:
+            overrides = self.exceptions.get(index, (False, {}))[1]
+        start = overrides.get("start_time", self.recurrence.at(index))
+        return ScrimRecord(
+            id=None,
+            team=self.team,
+            opponent=overrides.get("opponent", self.opponent),
+            start_time=datetime.datetime.fromtimestamp(start),
+            format=self.format,
+            maps=self.maps,
+            server=self.server,
+            players=self.players,
+            opponent_rank=overrides.get("opponent_rank", self.opponent_rank),
+            channel_id=self.channel_id,
+            role_id=self.role_id,
+            series_id=self.id,
+            occurrence=index
+        )
+        
+    def expand(self, start, end) -> Iterator[ScrimRecord]:
+        """Yield the occurrences scheduled within [start, end) that haven't been skipped, lazily"""
+        for index, _ in self.recurrence.between(start, end):
+            if not self.is_skipped(index):
+                yield self.occurrence(index)
+                
+    def __repr__(self):
+        return f"<ScrimSeries id={self.id} team={self.team!r} rule={self.recurrence.to_rule()!r}>"
+
+class AbsenceRecord:
+    """An absence as held in the in-memory absence index"""
+    
+    __slots__ = ("id", "user_id", "user_name", "absence_type", "start_date", "end_date", "team")
+    
+    def __init__(self, id, user_id, user_name, absence_type, start_date, end_date, team):
+        self.id = id
+        self.user_id = user_id
+        self.user_name = user_name
+        self.absence_type = absence_type
+        # Inclusive datetime.date bounds
+        self.start_date = start_date
+        self.end_date = end_date
+        self.team = team
+        
+    def __repr__(self):
+        return f"<AbsenceRecord id={self.id} user={self.user_name!r} {self.start_date}..{self.end_date}>"
+
 class DatabaseManager:
     """Handles all database operations"""
     
-    def __init__(self, db_path="bot_data.db"):
+    def __init__(self, db_path="bot_data.db", group_commit=True, group_commit_window=GROUP_COMMIT_WINDOW,
+                 reader_pool_size=DB_READER_POOL_SIZE):
         self.db_path = db_path
+        # Single writer connection; also used for schema changes
         self.connection = None
+        # Pool of read-only connections for query methods
+        self.reader_pool_size = reader_pool_size
+        self._readers = []
+        self._idle_readers = None
+        # Absences by team, indexed by their date range
+        self.absence_index: Dict[str, IntervalIndex] = {}
+        # Reminder stage offsets in minutes by team, longest first
+        self.reminder_stages: Dict[str, Tuple[int, ...]] = {}
+        # Recurring scrim series by ID, with their exceptions
+        self.scrim_series: Dict[int, ScrimSeries] = {}
+        self.group_commit = group_commit
+        self.group_commit_window = group_commit_window
+        # Writes waiting for the next group commit: (query, params, future)
+        self._pending_writes = []
+        self._flush_task = None
+        # Serializes transactions on the shared connection
+        self._write_lock = asyncio.Lock()
         
     async def initialize(self):
-        """Initialize the database and create tables if they don't exist"""
+        """Initialize the database and bring the schema up to date"""
+        if self.connection is not None:
+            logger.warning("Database already initialized")
+            return
+            
         self.connection = await aiosqlite.connect(self.db_path)
+        await self._apply_pragmas(self.connection, {**DB_PRAGMAS, **DB_WRITER_PRAGMAS})
         
-        # Create scrim table
-        await self.connection.execute('''
-        CREATE TABLE IF NOT EXISTS scrims (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            team TEXT NOT NULL,
-            opponent TEXT NOT NULL,
-            start_time TIMESTAMP NOT NULL,
-            format TEXT NOT NULL,
-            maps TEXT NOT NULL,
-            server TEXT NOT NULL,
-            players TEXT NOT NULL,
-            opponent_rank TEXT NOT NULL,
-            reminder_sent BOOLEAN DEFAULT FALSE,
-            channel_id INTEGER NOT NULL,
-            role_id INTEGER NOT NULL
-        )
-        ''')
+        await self.migrate()
+        await self.check_query_plans()
         
-        # Create absence table
-        await self.connection.execute('''
-        CREATE TABLE IF NOT EXISTS absences (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            user_name TEXT NOT NULL,
-            absence_type TEXT NOT NULL,
-            start_date DATE NOT NULL,
-            end_date DATE NOT NULL,
-            team TEXT NOT NULL,
-            reason TEXT NOT NULL,
-            calendar_link TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        ''')
+        # Readers are opened after migrating so they never see a half-built schema.
+        # An in-memory database can't be shared, so reads stay on the writer.
+        if self.db_path != ":memory:":
+            reader_uri = f"{pathlib.Path(self.db_path).resolve().as_uri()}?mode=ro"
+            self._idle_readers = asyncio.Queue()
+            for _ in range(self.reader_pool_size):
+                reader = await aiosqlite.connect(reader_uri, uri=True)
+                await self._apply_pragmas(reader, {**DB_PRAGMAS, "query_only": 1})
+                self._readers.append(reader)
+                self._idle_readers.put_nowait(reader)
         
-        await self.connection.commit()
-        logger.info("Database initialized")
+        await self.load_absence_index()
+        await self.load_reminder_stages()
+        await self.load_scrim_series()
+        
+        logger.info(f"Database initialized with {len(self._readers)} reader connections")
+        
+    @staticmethod
+    async def _apply_pragmas(connection, pragmas):
+        """Apply a set of PRAGMA settings to a connection"""
+        for name, value in pragmas.items():
+            await connection.execute(f"PRAGMA {name} = {value}")
+            
+    @contextlib.asynccontextmanager
+    async def _reader(self):
+        """Borrow a read-only connection from the pool"""
+        if self._idle_readers is None:
+            # Reads fall back to the writer; hold the write lock so a read's own
+            # transaction never interleaves with a batch being committed on it
+            async with self._write_lock:
+                yield self.connection
+            return
+            
+        reader = await self._idle_readers.get()
+        try:
+            yield reader
+        finally:
+            self._idle_readers.put_nowait(reader)
+            
+    async def _read(self, query, params=()):
+        """Run a query on a pooled reader and fetch every row"""
+        async with self._reader() as reader:
+            cursor = await reader.execute(query, params)
+            rows = await cursor.fetchall()
+            await cursor.close()
+            return rows
+        
+    async def get_schema_version(self) -> int:
+        """Get the schema version recorded in the database file"""
+        cursor = await self.connection.execute('PRAGMA user_version')
+        row = await cursor.fetchone()
+        return row[0] if row else 0
+        
+    async def migrate(self):
+        """Apply every migration newer than the recorded schema version"""
+        current = await self.get_schema_version()
+        target = len(SCHEMA_MIGRATIONS)
+        
+        if current > target:
+            raise RuntimeError(
+                f"Database schema version {current} is newer than this bot supports ({target})"
+            )
+        
+        for version in range(current + 1, target + 1):
+            # Each migration and its version bump commit together, or not at all
+            script = SCHEMA_MIGRATIONS[version - 1]
+            try:
+                await self.connection.executescript(
+                    f"BEGIN;\n{script}\nPRAGMA user_version = {version};\nCOMMIT;"
+                )
+            except Exception:
+                await self.connection.rollback()
+                raise
+            logger.info(f"Applied database migration {version}")
+            
+    async def explain(self, query, params=()) -> List[str]:
+        """Get the EXPLAIN QUERY PLAN details for a query"""
+        cursor = await self.connection.execute(f"EXPLAIN QUERY PLAN {query}", params)
+        rows = await cursor.fetchall()
+        return [row[-1] for row in rows]
+        
+    async def check_query_plans(self) -> List[str]:
+        """Warn about hot queries that have regressed to a full table scan"""
+        regressions = []
+        for name, (query, params) in INDEXED_QUERIES.items():
+            plan = await self.explain(query, params)
+            if any(detail.startswith("SCAN") for detail in plan):
+                regressions.append(name)
+                logger.warning(f"Query '{name}' is not using an index: {'; '.join(plan)}")
+        return regressions
         
     async def close(self):
         """Close the database connection"""
+        # Let any queued writes land before closing
+        if self._flush_task:
+            await self._flush_task
+            
+        for reader in self._readers:
+            await reader.close()
+        self._readers = []
+        self._idle_readers = None
+        
         if self.connection:
             await self.connection.close()
+            self.connection = None
+            
+    async def _write(self, query, params=()):
+        """Run a single write statement and return the row ID it inserted"""
+        async def operation(connection):
+            cursor = await connection.execute(query, params)
+            return cursor.lastrowid
+            
+        return await self._write_operation(operation)
+        
+    async def _write_operation(self, operation):
+        """Run an async operation(connection) as one atomic unit of a write transaction"""
+        if not self.group_commit:
+            async with self._write_lock:
+                try:
+                    await self.connection.execute("BEGIN")
+                    result = await operation(self.connection)
+                    await self.connection.commit()
+                    return result
+                except Exception:
+                    await self.connection.rollback()
+                    raise
+                    
+        future = asyncio.get_running_loop().create_future()
+        self._pending_writes.append((operation, future))
+        
+        # The first write in a window schedules the commit for everything that follows
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_writes())
+            
+        return await future
+        
+    async def _flush_writes(self):
+        """Commit every write queued during the group commit window in one transaction"""
+        await asyncio.sleep(self.group_commit_window)
+        
+        async with self._write_lock:
+            # Writes queued from here on start a new window
+            batch, self._pending_writes = self._pending_writes, []
+            self._flush_task = None
             
+            results = []
+            try:
+                await self.connection.execute("BEGIN")
+                for operation, future in batch:
+                    # Each operation gets a savepoint so a failure only undoes its own statements
+                    await self.connection.execute("SAVEPOINT write_operation")
+                    try:
+                        results.append((future, await operation(self.connection)))
+                        await self.connection.execute("RELEASE write_operation")
+                    except Exception as e:
+                        if not future.done():
+                            future.set_exception(e)
+                        # Raises if the error already aborted the whole transaction
+                        await self.connection.execute("ROLLBACK TO write_operation")
+                        await self.connection.execute("RELEASE write_operation")
+                        
+                await self.connection.commit()
+            except Exception as e:
+                # Leave the writer outside a transaction so the next batch can BEGIN,
+                # and fail every write in this batch instead of leaving it waiting
+                logger.error(f"Group commit of {len(batch)} writes failed: {e}")
+                try:
+                    await self.connection.rollback()
+                except Exception as rollback_error:
+                    logger.error(f"Rolling back the failed group commit failed: {rollback_error}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+                
+            for future, result in results:
+                if not future.done():
+                    future.set_result(result)
+            
+    @timed(DB_SECONDS, errors=DB_ERRORS)
     async def add_scrim(self, team, opponent, start_time, format_type, maps, server, 
                         players, opponent_rank, channel_id, role_id):
-        """Add a scrim to the database"""
-        # Convert maps list to comma-separated string if it's a list
-        if isinstance(maps, list):
-            maps = ",".join(maps)
-            
-        # Convert players list to comma-separated string if it's a list
-        if isinstance(players, list):
-            players = ",".join(players)
+        """Add a scrim, its maps and its players to the database"""
+        async def operation(connection):
+            return await self._insert_scrim(
+                connection, team, opponent, start_time, format_type, maps, server,
+                players, opponent_rank, channel_id, role_id
+            )
             
-        await self.connection.execute('''
+        return await self._write_operation(operation)
+        
+    async def _insert_scrim(self, connection, team, opponent, start_time, format_type, maps, server,
+                            players, opponent_rank, channel_id, role_id, series_id=None, occurrence=None):
+        """Insert a scrim with its maps, players and reminder deliveries; returns its ID"""
+        # The legacy comma-joined maps/players columns are left empty
+        cursor = await connection.execute('''
         INSERT INTO scrims 
-        (team, opponent, start_time, format, maps, server, players, opponent_rank, channel_id, role_id)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (team, opponent, start_time.timestamp(), format_type, maps, server, 
-              players, opponent_rank, channel_id, role_id))
+        (team, opponent, start_time, format, maps, server, players, opponent_rank, channel_id, role_id,
+         series_id, occurrence)
+        VALUES (?, ?, ?, ?, '', ?, '', ?, ?, ?, ?, ?)
+        ''', (team, opponent, start_time.timestamp(), format_type, server, 
+              opponent_rank, channel_id, role_id, series_id, occurrence))
+        scrim_id = cursor.lastrowid
+            
+        await connection.executemany(
+            'INSERT INTO scrim_maps (scrim_id, position, map_name) VALUES (?, ?, ?)',
+            [(scrim_id, position, map_name) for position, map_name in enumerate(maps)]
+        )
+        await connection.executemany(
+            'INSERT INTO scrim_players (scrim_id, position, player, user_id) VALUES (?, ?, ?, ?)',
+            [(scrim_id, position, player, resolve_player_id(player))
+             for position, player in enumerate(players)]
+        )
         
-        await self.connection.commit()
+        # One delivery per reminder stage that is still ahead. A scrim scheduled after
+        # all of them have passed still gets its shortest stage, sent right away.
+        start = start_time.timestamp()
+        now = datetime.datetime.now().timestamp()
+        offsets = self.get_reminder_offsets(team)
+        stages = [(offset, start - offset * 60) for offset in offsets if start - offset * 60 > now]
+        if not stages and offsets and start > now:
+            stages = [(offsets[-1], start - offsets[-1] * 60)]
+        await connection.executemany(
+            'INSERT INTO reminder_deliveries (scrim_id, offset_minutes, due_at) VALUES (?, ?, ?)',
+            [(scrim_id, offset, due) for offset, due in stages]
+        )
+        return scrim_id
         
-        # Get the last inserted ID
-        cursor = await self.connection.execute('SELECT last_insert_rowid()')
-        row = await cursor.fetchone()
-        return row[0] if row else None
+    @staticmethod
+    async def _delete_scrims(connection, scrim_ids):
+        """Delete scrims with their maps, players and reminder deliveries"""
+        params = [(scrim_id,) for scrim_id in scrim_ids]
+        await connection.executemany('DELETE FROM reminder_deliveries WHERE scrim_id = ?', params)
+        await connection.executemany('DELETE FROM scrim_maps WHERE scrim_id = ?', params)
+        await connection.executemany('DELETE FROM scrim_players WHERE scrim_id = ?', params)
+        await connection.executemany('DELETE FROM scrims WHERE id = ?', params)
         
-    async def get_upcoming_scrims(self, hours_ahead=24):
-        """Get scrims in the next X hours that need reminders"""
+    async def _load_scrims(self, condition, params=()) -> List[ScrimRecord]:
+        """Load every scrim matching a WHERE condition together with its maps and players"""
+        async with self._reader() as reader:
+            # Read all three tables from one snapshot so child rows match their scrims
+            await reader.execute("BEGIN")
+            try:
+                cursor = await reader.execute(f'''
+                SELECT id, team, opponent, start_time, format, server, 
+                       opponent_rank, channel_id, role_id, series_id, occurrence 
+                FROM scrims 
+                WHERE {condition}
+                ORDER BY start_time
+                ''', params)
+                scrim_rows = await cursor.fetchall()
+                
+                cursor = await reader.execute(f'''
+                SELECT scrim_id, map_name FROM scrim_maps 
+                WHERE scrim_id IN (SELECT id FROM scrims WHERE {condition})
+                ORDER BY scrim_id, position
+                ''', params)
+                map_rows = await cursor.fetchall()
+                
+                cursor = await reader.execute(f'''
+                SELECT scrim_id, player, user_id FROM scrim_players 
+                WHERE scrim_id IN (SELECT id FROM scrims WHERE {condition})
+                ORDER BY scrim_id, position
+                ''', params)
+                player_rows = await cursor.fetchall()
+            finally:
+                await reader.execute("COMMIT")
+                
+        maps = {}
+        for scrim_id, map_name in map_rows:
+            maps.setdefault(scrim_id, []).append(map_name)
+            
+        players = {}
+        player_user_ids = {}
+        for scrim_id, player, user_id in player_rows:
+            players.setdefault(scrim_id, []).append(player)
+            player_user_ids.setdefault(scrim_id, []).append(user_id)
+            
+        return [
+            ScrimRecord(
+                id=row[0],
+                team=row[1],
+                opponent=row[2],
+                start_time=datetime.datetime.fromtimestamp(row[3]),
+                format=row[4],
+                maps=maps.get(row[0], ()),
+                server=row[5],
+                players=players.get(row[0], ()),
+                player_user_ids=player_user_ids.get(row[0], ()),
+                opponent_rank=row[6],
+                channel_id=row[7],
+                role_id=row[8],
+                series_id=row[9],
+                occurrence=row[10]
+            )
+            for row in scrim_rows
+        ]
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def get_upcoming_scrims(self, hours_ahead=24) -> List[ScrimRecord]:
+        """Get scrims in the next X hours that still have reminders to send"""
         now = datetime.datetime.now().timestamp()
         upcoming_time = (datetime.datetime.now() + datetime.timedelta(hours=hours_ahead)).timestamp()
         
-        cursor = await self.connection.execute('''
-        SELECT id, team, opponent, start_time, format, maps, server, players, 
-               opponent_rank, channel_id, role_id 
-        FROM scrims 
-        WHERE start_time BETWEEN ? AND ? 
-        AND reminder_sent = FALSE
-        ''', (now, upcoming_time))
+        return await self._load_scrims(
+            "start_time BETWEEN ? AND ? AND id IN "
+            "(SELECT scrim_id FROM reminder_deliveries WHERE sent_at IS NULL)", (now, upcoming_time)
+        )
         
-        rows = await cursor.fetchall()
-        results = []
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def get_pending_deliveries(self, due_after, due_before,
+                                     started_after) -> List[Tuple[ScrimRecord, int, float]]:
+        """Get (scrim, offset_minutes, due_at) for unsent reminders due within (due_after, due_before]
+        of scrims starting after a timestamp"""
+        deliveries = "SELECT scrim_id FROM reminder_deliveries WHERE sent_at IS NULL AND due_at > ? AND due_at <= ?"
+        scrims = await self._load_scrims(
+            f"id IN ({deliveries}) AND start_time > ?", (due_after, due_before, started_after)
+        )
+        by_id = {scrim.id: scrim for scrim in scrims}
         
-        for row in rows:
-            # Convert timestamp to datetime
-            start_time = datetime.datetime.fromtimestamp(row[3])
+        rows = await self._read('''
+        SELECT scrim_id, offset_minutes, due_at FROM reminder_deliveries
+        WHERE sent_at IS NULL AND due_at > ? AND due_at <= ?
+        ORDER BY due_at
+        ''', (due_after, due_before))
+        return [
+            (by_id[scrim_id], offset_minutes, due_at)
+            for scrim_id, offset_minutes, due_at in rows
+            if scrim_id in by_id
+        ]
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def get_scrim_deliveries(self, scrim_id) -> List[Tuple[int, float]]:
+        """Get (offset_minutes, due_at) for a scrim's unsent reminders"""
+        rows = await self._read('''
+        SELECT offset_minutes, due_at FROM reminder_deliveries
+        WHERE scrim_id = ? AND sent_at IS NULL
+        ''', (scrim_id,))
+        return [tuple(row) for row in rows]
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def get_team_scrims_between(self, team, start_time, end_time) -> List[ScrimRecord]:
+        """Get a team's scrims starting within [start_time, end_time)"""
+        return await self._load_scrims(
+            "team = ? AND start_time >= ? AND start_time < ?",
+            (team, start_time.timestamp(), end_time.timestamp())
+        )
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def get_player_scrims(self, user_id, started_after=None) -> List[ScrimRecord]:
+        """Get the scrims a player is rostered for, optionally only those starting after a timestamp"""
+        if started_after is None:
+            started_after = datetime.datetime.now().timestamp()
+            
+        return await self._load_scrims(
+            "id IN (SELECT scrim_id FROM scrim_players WHERE user_id = ?) AND start_time > ?",
+            (user_id, started_after)
+        )
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def mark_reminders_sent(self, deliveries, sent_at=None):
+        """Mark a batch of (scrim_id, offset_minutes) reminders as sent in one transaction"""
+        if sent_at is None:
+            sent_at = datetime.datetime.now().timestamp()
             
-            # Parse maps and players back to lists
-            maps = row[5].split(",") if row[5] else []
-            players = row[7].split(",") if row[7] else []
+        async def operation(connection):
+            await connection.executemany('''
+            UPDATE reminder_deliveries SET sent_at = ? WHERE scrim_id = ? AND offset_minutes = ?
+            ''', [(sent_at, scrim_id, offset_minutes) for scrim_id, offset_minutes in deliveries])
             
-            results.append({
+        await self._write_operation(operation)
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def load_reminder_stages(self):
+        """Load every team's reminder stages into memory"""
+        rows = await self._read('SELECT team, offset_minutes FROM reminder_stages')
+        self.reminder_stages = self._group_stages(rows)
+        
+    @staticmethod
+    def _group_stages(rows) -> Dict[str, Tuple[int, ...]]:
+        stages = {}
+        for team, offset_minutes in rows:
+            stages.setdefault(team, []).append(offset_minutes)
+        return {team: tuple(sorted(offsets, reverse=True)) for team, offsets in stages.items()}
+        
+    def get_reminder_offsets(self, team) -> Tuple[int, ...]:
+        """Get the reminder stages in effect for a team, in minutes before the start and longest first
+        (served from memory)"""
+        return self.reminder_stages.get(team) or self.reminder_stages.get(DEFAULT_REMINDER_TEAM, ())
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def add_reminder_stage(self, team, offset_minutes) -> bool:
+        """Add a reminder stage, returning False if the team already has it. A team's first own
+        stage is added to a copy of the default stages it was using until then"""
+        return await self._change_reminder_stage('''
+        INSERT OR IGNORE INTO reminder_stages (team, offset_minutes) VALUES (?, ?)
+        ''', (team, offset_minutes), copy_defaults=team != DEFAULT_REMINDER_TEAM)
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def remove_reminder_stage(self, team, offset_minutes) -> bool:
+        """Remove a reminder stage, returning False if the team doesn't have it"""
+        return await self._change_reminder_stage('''
+        DELETE FROM reminder_stages WHERE team = ? AND offset_minutes = ?
+        ''', (team, offset_minutes))
+        
+    async def _change_reminder_stage(self, query, params, copy_defaults=False) -> bool:
+        """Apply a stage change and bring the unsent deliveries of scrims that haven't started in line with it"""
+        team = params[0]
+        
+        async def operation(connection):
+            cursor = await connection.execute(query, params)
+            if cursor.rowcount == 0:
+                return None
+                
+            if copy_defaults:
+                # Only when the stage just added is the team's only one, i.e. it was on the defaults
+                await connection.execute('''
+                INSERT OR IGNORE INTO reminder_stages (team, offset_minutes)
+                SELECT ?, offset_minutes FROM reminder_stages
+                WHERE team = ? AND (SELECT COUNT(*) FROM reminder_stages WHERE team = ?) = 1
+                ''', (team, DEFAULT_REMINDER_TEAM, team))
+                
+            cursor = await connection.execute('SELECT team, offset_minutes FROM reminder_stages')
+            stages = self._group_stages(await cursor.fetchall())
+            defaults = stages.get(DEFAULT_REMINDER_TEAM, ())
+            
+            now = datetime.datetime.now().timestamp()
+            if team == DEFAULT_REMINDER_TEAM:
+                # The defaults apply to every team without stages of its own
+                cursor = await connection.execute(
+                    'SELECT DISTINCT team FROM scrims WHERE start_time > ?', (now,)
+                )
+                affected = {row[0]: defaults for row in await cursor.fetchall() if row[0] not in stages}
+            else:
+                affected = {team: stages.get(team) or defaults}
+                
+            for affected_team, offsets in affected.items():
+                placeholders = ", ".join("?" for _ in offsets)
+                await connection.execute(f'''
+                DELETE FROM reminder_deliveries
+                WHERE sent_at IS NULL AND offset_minutes NOT IN ({placeholders})
+                AND scrim_id IN (SELECT id FROM scrims WHERE team = ? AND start_time > ?)
+                ''', (*offsets, affected_team, now))
+                # Only stages that are still ahead; one that has already passed is not sent late
+                for offset in offsets:
+                    await connection.execute('''
+                    INSERT OR IGNORE INTO reminder_deliveries (scrim_id, offset_minutes, due_at)
+                    SELECT id, ?, start_time - ? FROM scrims
+                    WHERE team = ? AND start_time > ?
+                    ''', (offset, offset * 60, affected_team, now + offset * 60))
+            return stages
+            
+        stages = await self._write_operation(operation)
+        if stages is None:
+            return False
+        self.reminder_stages = stages
+        return True
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def add_absence(self, user_id, user_name, absence_type, start_date, end_date, team, reason,
+                          calendar_link=None, calendar_event=None):
+        """Add an absence record to the database and the absence index
+        
+        If a calendar event body is given it is queued in the calendar outbox in the same transaction.
+        The entry is held until release_outbox_event records its notification, or for at most
+        CALENDAR_OUTBOX_HOLD seconds if that never happens.
+        """
+        async def operation(connection):
+            cursor = await connection.execute('''
+            INSERT INTO absences 
+            (user_id, user_name, absence_type, start_date, end_date, team, reason, calendar_link)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (user_id, user_name, absence_type, start_date, end_date, team, reason, calendar_link))
+            absence_id = cursor.lastrowid
+            
+            if calendar_event is not None:
+                await connection.execute('''
+                INSERT INTO calendar_outbox (absence_id, event, next_attempt_at)
+                VALUES (?, ?, ?)
+                ''', (absence_id, json.dumps(calendar_event), datetime.datetime.now().timestamp() + CALENDAR_OUTBOX_HOLD))
+                
+            return absence_id
+            
+        absence_id = await self._write_operation(operation)
+        
+        self._index_absence(AbsenceRecord(
+            id=absence_id,
+            user_id=user_id,
+            user_name=user_name,
+            absence_type=absence_type,
+            start_date=datetime.date.fromisoformat(start_date),
+            end_date=datetime.date.fromisoformat(end_date),
+            team=team
+        ))
+        return absence_id
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def release_outbox_event(self, absence_id, channel_id=None, message_id=None):
+        """Record the management notification to update once an absence's calendar event exists,
+        if one was sent, and make the absence's held outbox entry due now"""
+        await self._write('''
+        UPDATE calendar_outbox 
+        SET notification_channel_id = ?, notification_message_id = ?, next_attempt_at = ? 
+        WHERE absence_id = ? AND status = 'pending' AND attempts = 0
+        ''', (channel_id, message_id, datetime.datetime.now().timestamp(), absence_id))
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def get_due_outbox_events(self, now, limit=50) -> List[Dict[str, Any]]:
+        """Get pending calendar outbox entries whose next attempt is due"""
+        rows = await self._read('''
+        SELECT id, absence_id, event, attempts, notification_channel_id, notification_message_id 
+        FROM calendar_outbox 
+        WHERE status = 'pending' AND next_attempt_at <= ? 
+        ORDER BY next_attempt_at 
+        LIMIT ?
+        ''', (now, limit))
+        
+        return [
+            {
                 "id": row[0],
-                "team": row[1],
-                "opponent": row[2],
-                "start_time": start_time,
-                "format": row[4],
-                "maps": maps,
-                "server": row[6],
-                "players": players,
-                "opponent_rank": row[8],
-                "channel_id": row[9],
-                "role_id": row[10]
-            })
+                "absence_id": row[1],
+                "event": json.loads(row[2]),
+                "attempts": row[3],
+                "notification_channel_id": row[4],
+                "notification_message_id": row[5]
+            }
+            for row in rows
+        ]
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def get_next_outbox_attempt(self) -> Optional[float]:
+        """Get the time of the earliest pending calendar outbox attempt, if any"""
+        rows = await self._read('''
+        SELECT MIN(next_attempt_at) FROM calendar_outbox WHERE status = 'pending'
+        ''')
+        return rows[0][0] if rows else None
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def complete_outbox_event(self, outbox_id, absence_id, calendar_link):
+        """Mark a calendar outbox entry as done and store the event link on its absence"""
+        async def operation(connection):
+            await connection.execute('''
+            UPDATE absences SET calendar_link = ? WHERE id = ?
+            ''', (calendar_link, absence_id))
+            await connection.execute('''
+            UPDATE calendar_outbox SET status = 'done', last_error = NULL WHERE id = ?
+            ''', (outbox_id,))
             
-        return results
+        await self._write_operation(operation)
         
-    async def mark_reminder_sent(self, scrim_id):
-        """Mark a scrim reminder as sent"""
-        await self.connection.execute('''
-        UPDATE scrims SET reminder_sent = TRUE WHERE id = ?
-        ''', (scrim_id,))
-        await self.connection.commit()
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def retry_outbox_event(self, outbox_id, attempts, next_attempt_at, error):
+        """Record a failed calendar outbox attempt; a next_attempt_at of None gives up on the entry"""
+        status = "pending" if next_attempt_at is not None else "failed"
+        await self._write('''
+        UPDATE calendar_outbox 
+        SET status = ?, attempts = ?, next_attempt_at = COALESCE(?, next_attempt_at), last_error = ? 
+        WHERE id = ?
+        ''', (status, attempts, next_attempt_at, error, outbox_id))
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def save_sessions(self, upserts, deletes):
+        """Persist a batch of workflow session changes in one transaction"""
+        async def operation(connection):
+            if upserts:
+                await connection.executemany('''
+                INSERT INTO workflow_sessions (user_id, data, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(user_id) DO UPDATE SET data = excluded.data, expires_at = excluded.expires_at
+                ''', upserts)
+            if deletes:
+                await connection.executemany(
+                    'DELETE FROM workflow_sessions WHERE user_id = ?',
+                    [(user_id,) for user_id in deletes]
+                )
+                
+        await self._write_operation(operation)
         
-    async def add_absence(self, user_id, user_name, absence_type, start_date, end_date, team, reason, calendar_link=None):
-        """Add an absence record to the database"""
-        await self.connection.execute('''
-        INSERT INTO absences 
-        (user_id, user_name, absence_type, start_date, end_date, team, reason, calendar_link)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (user_id, user_name, absence_type, start_date, end_date, team, reason, calendar_link))
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def load_session(self, user_id):
+        """Get a persisted workflow session as (data, expires_at), if there is one"""
+        rows = await self._read('''
+        SELECT data, expires_at FROM workflow_sessions WHERE user_id = ?
+        ''', (user_id,))
+        return rows[0] if rows else None
         
-        await self.connection.commit()
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def delete_expired_sessions(self, now):
+        """Delete persisted workflow sessions that expired before a timestamp"""
+        await self._write('''
+        DELETE FROM workflow_sessions WHERE expires_at <= ?
+        ''', (now,))
         
-        # Get the last inserted ID
-        cursor = await self.connection.execute('SELECT last_insert_rowid()')
-        row = await cursor.fetchone()
-        return row[0] if row else None
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def get_state(self, key):
+        """Get a persisted bot state value, if it has been set"""
+        rows = await self._read('SELECT value FROM bot_state WHERE key = ?', (key,))
+        return rows[0][0] if rows else None
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def set_state(self, key, value):
+        """Persist a bot state value"""
+        await self._write('''
+        INSERT INTO bot_state (key, value) VALUES (?, ?)
+        ON CONFLICT(key) DO UPDATE SET value = excluded.value
+        ''', (key, value))
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def load_scrim_series(self):
+        """Load every recurring scrim series and its exceptions into memory"""
+        rows = await self._read('''
+        SELECT id, team, opponent, opponent_rank, format, server, maps, players,
+               channel_id, role_id, first_start, rule, materialized_until, timezone
+        FROM scrim_series
+        ''')
+        exception_rows = await self._read('''
+        SELECT series_id, occurrence, skipped, overrides FROM scrim_series_exceptions
+        ''')
+        
+        exceptions = {}
+        for series_id, occurrence, skipped, overrides in exception_rows:
+            exceptions.setdefault(series_id, {})[occurrence] = (bool(skipped), json.loads(overrides))
+            
+        self.scrim_series = {}
+        for row in rows:
+            tz = None
+            if row[13] is not None:
+                try:
+                    tz = zoneinfo.ZoneInfo(row[13])
+                except (zoneinfo.ZoneInfoNotFoundError, ValueError):
+                    logger.warning(f"Scrim series ID {row[0]} has unknown timezone {row[13]!r}, repeating at a fixed UTC time")
+            try:
+                recurrence = Recurrence.parse(row[10], row[11], tz)
+            except ValueError as e:
+                logger.warning(f"Skipping scrim series ID {row[0]} with unreadable rule {row[11]!r}: {e}")
+                continue
+            self.scrim_series[row[0]] = ScrimSeries(
+                id=row[0],
+                team=row[1],
+                opponent=row[2],
+                opponent_rank=row[3],
+                format=row[4],
+                server=row[5],
+                maps=json.loads(row[6]),
+                players=json.loads(row[7]),
+                channel_id=row[8],
+                role_id=row[9],
+                recurrence=recurrence,
+                exceptions=exceptions.get(row[0]),
+                materialized_until=row[12]
+            )
+        logger.info(f"Loaded {len(self.scrim_series)} recurring scrim series")
+        
+    async def _materialize(self, connection, series: ScrimSeries, until, now) -> List[ScrimRecord]:
+        """Write a series' occurrences scheduled up to `until` to the scrims table"""
+        # Occurrences that passed while nothing was materializing them are not created late
+        scrims = []
+        for scrim in series.expand(max(series.materialized_until, now), until):
+            if scrim.start_time.timestamp() <= now:
+                continue
+            scrim.id = await self._insert_scrim(
+                connection, scrim.team, scrim.opponent, scrim.start_time, scrim.format, scrim.maps,
+                scrim.server, scrim.players, scrim.opponent_rank, scrim.channel_id, scrim.role_id,
+                series_id=series.id, occurrence=scrim.occurrence
+            )
+            scrims.append(scrim)
+        await connection.execute(
+            'UPDATE scrim_series SET materialized_until = ? WHERE id = ?', (until, series.id)
+        )
+        return scrims
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def add_scrim_series(self, team, opponent, start_time, format_type, maps, server, players,
+                               opponent_rank, channel_id, role_id, rule=WEEKLY_RULE, timezone=None,
+                               window=SERIES_WINDOW) -> Tuple[ScrimSeries, List[ScrimRecord]]:
+        """Add a recurring scrim series starting at `start_time` and create its occurrences within
+        the window; returns the series and those occurrences. With a `timezone` name occurrences
+        keep their wall-clock time in that zone, otherwise they repeat at a fixed UTC time"""
+        recurrence = Recurrence.parse(
+            start_time.timestamp(), rule, zoneinfo.ZoneInfo(timezone) if timezone else None
+        )
+        now = datetime.datetime.now().timestamp()
+        until = now + window
+        
+        async def operation(connection):
+            cursor = await connection.execute('''
+            INSERT INTO scrim_series
+            (team, opponent, opponent_rank, format, server, maps, players, channel_id, role_id,
+             first_start, rule, timezone)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (team, opponent, opponent_rank, format_type, server, json.dumps(list(maps)),
+                  json.dumps(list(players)), channel_id, role_id, recurrence.start, recurrence.to_rule(),
+                  timezone))
+            series = ScrimSeries(
+                cursor.lastrowid, team, opponent, opponent_rank, format_type, maps, server, players,
+                channel_id, role_id, recurrence
+            )
+            return series, await self._materialize(connection, series, until, now)
+            
+        series, scrims = await self._write_operation(operation)
+        series.materialized_until = until
+        self.scrim_series[series.id] = series
+        return series, scrims
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def materialize_series(self, until) -> List[ScrimRecord]:
+        """Create every series occurrence scheduled before `until` that isn't in the scrims table yet"""
+        now = datetime.datetime.now().timestamp()
+        behind = [
+            series for series in self.scrim_series.values()
+            if series.materialized_until < until and not series.finished(now)
+        ]
+        if not behind:
+            return []
+            
+        async def operation(connection):
+            scrims = []
+            for series in behind:
+                scrims.extend(await self._materialize(connection, series, until, now))
+            return scrims
+            
+        scrims = await self._write_operation(operation)
+        for series in behind:
+            series.materialized_until = until
+        return scrims
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def set_series_exception(self, series_id, occurrence, skipped=False,
+                                   overrides=None) -> Tuple[List[int], List[ScrimRecord]]:
+        """Skip an occurrence of a series or change some of its details (opponent, opponent_rank,
+        start_time); returns the IDs of scrims removed and the scrims created in their place"""
+        series = self.scrim_series[series_id]
+        current_skipped, current_overrides = series.exceptions.get(occurrence, (False, {}))
+        exception = (skipped or current_skipped, {**current_overrides, **(overrides or {})})
+        now = datetime.datetime.now().timestamp()
+        
+        async def operation(connection):
+            await connection.execute('''
+            INSERT INTO scrim_series_exceptions (series_id, occurrence, skipped, overrides)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(series_id, occurrence) DO UPDATE
+            SET skipped = excluded.skipped, overrides = excluded.overrides
+            ''', (series_id, occurrence, exception[0], json.dumps(exception[1])))
+            
+            # An occurrence already in the scrims table is replaced with its new details
+            cursor = await connection.execute(
+                'SELECT id FROM scrims WHERE series_id = ? AND occurrence = ? AND start_time > ?',
+                (series_id, occurrence, now)
+            )
+            removed = [row[0] for row in await cursor.fetchall()]
+            await self._delete_scrims(connection, removed)
+            
+            scheduled_at = series.recurrence.occurrence(occurrence)
+            if exception[0] or scheduled_at is None or scheduled_at >= series.materialized_until:
+                return removed, []
+            scrim = series.occurrence(occurrence, exception[1])
+            if scrim.start_time.timestamp() <= now:
+                return removed, []
+            scrim.id = await self._insert_scrim(
+                connection, scrim.team, scrim.opponent, scrim.start_time, scrim.format, scrim.maps,
+                scrim.server, scrim.players, scrim.opponent_rank, scrim.channel_id, scrim.role_id,
+                series_id=series_id, occurrence=occurrence
+            )
+            return removed, [scrim]
+            
+        result = await self._write_operation(operation)
+        series.exceptions[occurrence] = exception
+        return result
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def end_scrim_series(self, series_id, at=None) -> List[int]:
+        """End a series so no occurrences happen after `at`; returns the IDs of scrims removed"""
+        series = self.scrim_series[series_id]
+        if at is None:
+            at = datetime.datetime.now().timestamp()
+        recurrence = Recurrence(
+            series.recurrence.start, series.recurrence.freq, series.recurrence.interval,
+            series.recurrence.count, at if series.recurrence.until is None else min(at, series.recurrence.until),
+            series.recurrence.tz
+        )
+        
+        async def operation(connection):
+            await connection.execute(
+                'UPDATE scrim_series SET rule = ? WHERE id = ?', (recurrence.to_rule(), series_id)
+            )
+            cursor = await connection.execute(
+                'SELECT id FROM scrims WHERE series_id = ? AND start_time > ?', (series_id, at)
+            )
+            removed = [row[0] for row in await cursor.fetchall()]
+            await self._delete_scrims(connection, removed)
+            return removed
+            
+        removed = await self._write_operation(operation)
+        series.recurrence = recurrence
+        return removed
+        
+    def get_series_occurrences_between(self, team, start_time, end_time) -> List[ScrimRecord]:
+        """Get a team's series occurrences within [start_time, end_time) that aren't in the scrims
+        table yet (served from memory)"""
+        start, end = start_time.timestamp(), end_time.timestamp()
+        occurrences = []
+        for series in self.scrim_series.values():
+            if series.team == team:
+                occurrences.extend(series.expand(max(start, series.materialized_until), end))
+        return occurrences
+        
+    @timed(DB_SECONDS, errors=DB_ERRORS)
+    async def load_absence_index(self):
+        """Build the in-memory absence index from the absences table"""
+        rows = await self._read('''
+        SELECT id, user_id, user_name, absence_type, start_date, end_date, team 
+        FROM absences
+        ''')
+        
+        intervals_by_team = {}
+        for row in rows:
+            try:
+                start_date = datetime.date.fromisoformat(row[4])
+                end_date = datetime.date.fromisoformat(row[5])
+            except ValueError:
+                logger.warning(f"Skipping absence ID {row[0]} with unreadable dates {row[4]!r} - {row[5]!r}")
+                continue
+                
+            record = AbsenceRecord(row[0], row[1], row[2], row[3], start_date, end_date, row[6])
+            intervals_by_team.setdefault(record.team, []).append(
+                (start_date.toordinal(), end_date.toordinal(), record)
+            )
+            
+        self.absence_index = {
+            team: IntervalIndex(intervals) for team, intervals in intervals_by_team.items()
+        }
+        logger.info(f"Loaded {sum(len(index) for index in self.absence_index.values())} absences into the index")
+        
+    def _index_absence(self, record: AbsenceRecord):
+        """Add a single absence to the in-memory index"""
+        if record.end_date < record.start_date:
+            logger.warning(f"Not indexing absence ID {record.id}: end date is before start date")
+            return
+            
+        index = self.absence_index.setdefault(record.team, IntervalIndex())
+        index.add(record.start_date.toordinal(), record.end_date.toordinal(), record)
+        
+    def get_absences_on(self, team, date: datetime.date) -> List[AbsenceRecord]:
+        """Get the absences of a team's players covering a date (served from memory)"""
+        index = self.absence_index.get(team)
+        if index is None:
+            return []
+        return sorted(index.at(date.toordinal()), key=lambda record: record.user_name.lower())
+        
+    def get_overlapping_absences(self, start_date: datetime.date, end_date: datetime.date,
+                                 team=None) -> List[AbsenceRecord]:
+        """Get the absences overlapping a date range, optionally for one team only (served from memory)"""
+        if team is None:
+            indexes = self.absence_index.values()
+        else:
+            indexes = [self.absence_index[team]] if team in self.absence_index else []
+            
+        results = []
+        for index in indexes:
+            results.extend(index.overlapping(start_date.toordinal(), end_date.toordinal()))
+        return sorted(results, key=lambda record: (record.start_date, record.user_name.lower()))
+
+def format_offset(minutes: int) -> str:
+    """Describe a reminder offset, such as 30 minutes, 2 hours or 3 days."""
+    count, unit = split_offset(minutes)
+    return f"{count} {unit}" + ("" if count == 1 else "s")
+
+def split_offset(minutes: int) -> Tuple[int, str]:
+    """Split a reminder offset into a count and the largest unit that divides it evenly."""
+    # 24 and 48 hours read better than 1 and 2 days for reminders
+    if minutes % 1440 == 0 and minutes >= 3 * 1440:
+        return minutes // 1440, "day"
+    if minutes % 60 == 0:
+        return minutes // 60, "hour"
+    return minutes, "minute"
+
+def parse_offset(text: str) -> Optional[int]:
+    """Parse a reminder offset such as 24h, 2h, 30m or 1h30m into minutes."""
+    match = REMINDER_OFFSET_PATTERN.match(text)
+    if not match or not any(match.groups()):
+        return None
+    days, hours, minutes = (int(group or 0) for group in match.groups())
+    total = days * 1440 + hours * 60 + minutes
+    return total if 0 < total <= REMINDER_MAX_OFFSET else None
+
+def describe_reminder_stages(offsets) -> str:
+    """Describe when reminders are sent for a set of stages."""
+    if not offsets:
+        return "No reminders are sent for this team's scrims."
+    described = [format_offset(offset) for offset in offsets]
+    if len(described) == 1:
+        return f"A reminder will be sent {described[0]} before the scrim starts."
+    return f"Reminders will be sent {', '.join(described[:-1])} and {described[-1]} before the scrim starts."
 
 # Initialize the database manager
 db_manager = DatabaseManager(db_path="/app/data/bot_data.db")
 
-# Cached channel and role references
-channel_cache = {}
-role_cache = {}
+# Cached channel and role references, kept current by gateway events
+discord_cache = DiscordCache(bot, max_members=MEMBER_CACHE_SIZE, member_ttl=MEMBER_CACHE_TTL)
 
-# Session cache for user data during workflows
-session_cache = {}
+# Permission decisions, cached per member
+permissions = PermissionResolver(PERMISSION_POLICIES)
+
+# Session store for user data during workflows
+sessions = SessionStore(
+    ttl=SESSION_TTL,
+    max_size=SESSION_MAX_ACTIVE,
+    sweep_interval=SESSION_SWEEP_INTERVAL,
+    backend=db_manager,
+    flush_interval=SESSION_FLUSH_INTERVAL
+)
+
+# Cache and queue counters, read at scrape time
+metrics_registry.stats("bot_sessions", "Workflow session store size and eviction counters", sessions.stats)
+metrics_registry.stats("bot_discord_cache", "Channel, role and member cache sizes and counters", discord_cache.stats)
+metrics_registry.stats("bot_permissions", "Permission decision cache size and counters", permissions.stats)
+metrics_registry.stats("bot_outbound", "Outbound message queue size and counters", bot.outbound.stats)
 
 # --- Calendar Integration ---
 class CalendarManager:
     """Handles Google Calendar integration"""
     
-    def __init__(self):
+    def __init__(self, max_workers=CALENDAR_MAX_WORKERS, max_queued=CALENDAR_MAX_QUEUED):
         self.client_id = os.getenv("GOOGLE_CLIENT_ID")
         self.client_secret = os.getenv("GOOGLE_CLIENT_SECRET")
         self.refresh_token = os.getenv("GOOGLE_REFRESH_TOKEN")
         self.calendar_id = os.getenv("GOOGLE_CALENDAR_ID")
+        self.credentials = None
         self.service = None
+        self._service_lock = asyncio.Lock()
+        # Dedicated threads for Calendar I/O, each with its own keep-alive HTTP client
+        self.max_workers = max_workers
+        self._executor = None
+        self._thread_state = threading.local()
+        # Bounds calls running or waiting for a worker; callers beyond that wait their turn
+        self._slots = asyncio.Semaphore(max_workers + max_queued)
         
     async def initialize(self):
-        """Initialize the Google Calendar service"""
+        """Prepare Google Calendar credentials; the service itself is built on first use"""
         try:
-            if not all([self.client_id, self.client_secret, self.refresh_token, self.calendar_id]):
+            if not self.is_configured:
                 logger.warning("Google Calendar credentials not fully configured")
                 return False
                 
-            credentials = Credentials.from_authorized_user_info({
+            self.credentials = Credentials.from_authorized_user_info({
                 "client_id": self.client_id,
                 "client_secret": self.client_secret,
                 "refresh_token": self.refresh_token,
             })
-            
-            self.service = googleapiclient.discovery.build(
-                "calendar", "v3", credentials=credentials
-            )
-            logger.info("Google Calendar service initialized")
+            logger.info("Google Calendar credentials loaded")
             return True
         except Exception as e:
             logger.error(f"Failed to initialize Google Calendar: {e}")
             return False
             
+    async def get_service(self):
+        """Get the Google Calendar service, building it off the event loop the first time"""
+        if self.service:
+            return self.service
+            
+        async with self._service_lock:
+            if self.service:
+                return self.service
+                
+            if self.credentials is None:
+                raise RuntimeError("Google Calendar credentials not initialized")
+                
+            # Use the discovery document bundled with google-api-python-client so that
+            # building the client never goes to the network. The service is only used to
+            # build requests; they execute on the calling worker thread's own HTTP client.
+            started = time.perf_counter()
+            self.service = await self._run(
+                functools.partial(
+                    googleapiclient.discovery.build,
+                    "calendar", "v3",
+                    credentials=self.credentials,
+                    static_discovery=True,
+                    cache_discovery=False
+                )
+            )
+            CALENDAR_SECONDS.observe(time.perf_counter() - started, "CalendarManager.build")
+            logger.info("Google Calendar service initialized")
+            return self.service
+            
+    def _thread_http(self):
+        """Get the authorized HTTP client owned by the current worker thread"""
+        # httplib2 connections are not thread-safe, so every worker keeps its own
+        http = getattr(self._thread_state, "http", None)
+        if http is None:
+            http = google_auth_httplib2.AuthorizedHttp(
+                self.credentials, http=httplib2.Http(timeout=CALENDAR_HTTP_TIMEOUT)
+            )
+            self._thread_state.http = http
+        return http
+        
+    async def _run(self, function):
+        """Run a blocking Calendar call on the dedicated executor, waiting if it is saturated"""
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="calendar"
+            )
+            
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, function)
+            
+    def _execute(self, request):
+        """Execute an API request on the current worker thread's HTTP client"""
+        return request.execute(http=self._thread_http())
+        
+    def close(self):
+        """Stop the Calendar worker threads"""
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+            
+    @property
+    def is_configured(self) -> bool:
+        """Whether all Google Calendar credentials are present"""
+        return all([self.client_id, self.client_secret, self.refresh_token, self.calendar_id])
+        
+    @staticmethod
+    def build_absence_event(player_name, absence_type, start_date, end_date, reason, team) -> Dict[str, Any]:
+        """Build the Google Calendar event body for an absence"""
+        # Get color ID based on absence type
+        color_id = GCAL_COLOR_MAP.get(absence_type, "1")
+        
+        return {
+            "summary": f"{player_name} - {absence_type}",
+            "description": f"Team: {team}\nReason: {reason}",
+            "start": {
+                "date": start_date,  # All day event
+            },
+            "end": {
+                "date": end_date,  # All day event
+            },
+            "colorId": color_id,
+        }
+        
+    @timed(CALENDAR_SECONDS, errors=CALENDAR_ERRORS)
+    async def insert_event(self, event: Dict[str, Any]) -> Optional[str]:
+        """Insert an event into the calendar and return its link, raising on failure"""
+        service = await self.get_service()
+        
+        request = service.events().insert(
+            calendarId=self.calendar_id,
+            body=event
+        )
+        response = await self._run(functools.partial(self._execute, request))
+        
+        logger.info(f"Calendar event created: {response.get('htmlLink')}")
+        return response.get("htmlLink")
+        
+    def _execute_batch(self, service, events: List[Dict[str, Any]]) -> List[Union[str, Exception]]:
+        """Insert up to one batch of events in a single HTTP request (runs in a worker thread)"""
+        # An event the batch never answers is reported as failed, so the outbox retries it
+        results: List[Union[str, Exception]] = [RuntimeError("no batch response")] * len(events)
+        
+        def callback(request_id, response, exception):
+            index = int(request_id)
+            results[index] = exception if exception is not None else response.get("htmlLink")
+            
+        batch = service.new_batch_http_request(callback=callback)
+        for index, event in enumerate(events):
+            batch.add(
+                service.events().insert(calendarId=self.calendar_id, body=event),
+                request_id=str(index)
+            )
+        batch.execute(http=self._thread_http())
+        return results
+        
+    @timed(CALENDAR_SECONDS, errors=CALENDAR_ERRORS)
+    async def insert_events(self, events: List[Dict[str, Any]]) -> List[Union[str, Exception]]:
+        """Insert many events through the batch endpoint
+        
+        Returns one entry per event, in order: the event link, or the exception that event failed with.
+        """
+        try:
+            service = await self.get_service()
+        except Exception as e:
+            return [e] * len(events)
+            
+        results: List[Union[str, Exception]] = []
+        for offset in range(0, len(events), CALENDAR_BATCH_LIMIT):
+            chunk = events[offset:offset + CALENDAR_BATCH_LIMIT]
+            try:
+                results.extend(await self._run(functools.partial(self._execute_batch, service, chunk)))
+            except Exception as e:
+                # The whole batch request failed, so every event in it did
+                results.extend([e] * len(chunk))
+                
+        created = sum(1 for result in results if not isinstance(result, Exception))
+        logger.info(f"Calendar batch insert: {created}/{len(events)} events created")
+        return results
+        
     async def add_absence(self, player_name, absence_type, start_date, end_date, reason, team):
         """Add an absence to Google Calendar"""
-        if not self.service:
+        if not self.credentials:
             logger.warning("Google Calendar service not initialized")
             return None
             
         try:
-            # Get color ID based on absence type
-            color_id = GCAL_COLOR_MAP.get(absence_type, "1")
-            
-            # Create event
-            event = {
-                "summary": f"{player_name} - {absence_type}",
-                "description": f"Team: {team}\nReason: {reason}",
-                "start": {
-                    "date": start_date,  # All day event
-                },
-                "end": {
-                    "date": end_date,  # All day event
-                },
-                "colorId": color_id,
-            }
-            
-            # Insert the event
-            response = await asyncio.to_thread(
-                self.service.events().insert(
-                    calendarId=self.calendar_id,
-                    body=event
-                ).execute
-            )
-            
-            logger.info(f"Calendar event created: {response.get('htmlLink')}")
-            return response.get("htmlLink")
+            event = self.build_absence_event(player_name, absence_type, start_date, end_date, reason, team)
+            return await self.insert_event(event)
         except Exception as e:
             logger.error(f"Error adding to Google Calendar: {e}")
             return None
+            
+    async def add_absences(self, absences: List[Dict[str, Any]]) -> List[Union[str, Exception]]:
+        """Add many absences to Google Calendar at once
+        
+        Each absence is a dict of add_absence's keyword arguments. Returns the event link or
+        the exception for each absence, in order.
+        """
+        events = [self.build_absence_event(**absence) for absence in absences]
+        return await self.insert_events(events)
 
 # Initialize the calendar manager
 calendar_manager = CalendarManager()
 
+class CalendarOutboxWorker:
+    """Background worker that pushes queued absence events to Google Calendar with retries"""
+    
+    def __init__(self, batch_size=CALENDAR_OUTBOX_BATCH_SIZE, max_attempts=CALENDAR_OUTBOX_MAX_ATTEMPTS,
+                 base_delay=CALENDAR_OUTBOX_BASE_DELAY, max_delay=CALENDAR_OUTBOX_MAX_DELAY,
+                 idle_sleep=CALENDAR_OUTBOX_IDLE_SLEEP):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.idle_sleep = idle_sleep
+        self._wakeup = asyncio.Event()
+        self._task = None
+        
+    def notify(self):
+        """Wake the worker because a new event was queued"""
+        self._wakeup.set()
+        
+    def start(self):
+        """Start the worker task if it is not already running"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+        
+    async def stop(self):
+        """Cancel the worker task and wait for it to finish"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        # A task that already failed has logged its error; don't let it abort shutdown
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        
+    async def run(self):
+        """Process due outbox entries, then sleep until the next one is due or new work arrives"""
+        await bot.wait_until_ready()
+        
+        while not bot.is_closed():
+            try:
+                self._wakeup.clear()
+                now = datetime.datetime.now().timestamp()
+                entries = await db_manager.get_due_outbox_events(now, limit=self.batch_size)
+                
+                if entries:
+                    await self.process(entries)
+                    
+                # A full batch means there may be more due right away
+                if len(entries) == self.batch_size:
+                    continue
+                    
+                next_attempt = await db_manager.get_next_outbox_attempt()
+                timeout = self.idle_sleep
+                if next_attempt is not None:
+                    timeout = min(max(next_attempt - datetime.datetime.now().timestamp(), 0), self.idle_sleep)
+                    
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+                    
+            except Exception as e:
+                logger.error(f"Error in calendar outbox worker: {e}")
+                await asyncio.sleep(self.base_delay)
+                
+    async def process(self, entries: List[Dict[str, Any]]):
+        """Create the calendar events for a batch of outbox entries in one batch request"""
+        results = await calendar_manager.insert_events([entry["event"] for entry in entries])
+        for entry, result in zip(entries, results):
+            await self.handle_result(entry, result)
+            
+    async def handle_result(self, entry: Dict[str, Any], result: Union[str, Exception]):
+        """Complete an outbox entry, or schedule a retry if its event could not be created"""
+        attempts = entry["attempts"] + 1
+        if isinstance(result, Exception):
+            e = result
+            if attempts >= self.max_attempts:
+                logger.error(
+                    f"Giving up on calendar event for absence ID {entry['absence_id']} after {attempts} attempts: {e}"
+                )
+                await db_manager.retry_outbox_event(entry["id"], attempts, None, str(e))
+                return
+                
+            # Exponential backoff with jitter
+            delay = min(self.base_delay * 2 ** (attempts - 1), self.max_delay) * random.uniform(0.5, 1.0)
+            logger.warning(
+                f"Calendar event for absence ID {entry['absence_id']} failed (attempt {attempts}), "
+                f"retrying in {delay:.0f}s: {e}"
+            )
+            await db_manager.retry_outbox_event(
+                entry["id"], attempts, datetime.datetime.now().timestamp() + delay, str(e)
+            )
+            return
+            
+        calendar_link = result
+        await db_manager.complete_outbox_event(entry["id"], entry["absence_id"], calendar_link)
+        
+        if calendar_link and entry["notification_message_id"]:
+            await self.update_notification(
+                entry["notification_channel_id"], entry["notification_message_id"], calendar_link
+            )
+            
+    async def update_notification(self, channel_id, message_id, calendar_link):
+        """Add the calendar link to a management notification that has already been sent"""
+        try:
+            channel = await discord_cache.get_channel(channel_id)
+            if channel is None:
+                return
+            message = await channel.fetch_message(message_id)
+            if not message.embeds:
+                return
+                
+            embed = message.embeds[0]
+            embed.add_field(name="Calendar", value=f"[View in Calendar]({calendar_link})", inline=False)
+            await message.edit(embed=embed)
+        except Exception as e:
+            logger.error(f"Error updating management notification {message_id} with calendar link: {e}")
+
+# Initialize the calendar outbox worker
+calendar_outbox = CalendarOutboxWorker()
+
 # --- Helper Functions ---
 def is_valid_date(date_string: str) -> bool:
     """Validate if the string is a correctly formatted date (DD/MM/YYYY)."""
@@ -361,9 +2075,69 @@ def get_timezone_offset(timezone_str: str) -> int:
         
     return 0  # Default to UTC
 
-def has_permission(member: discord.Member) -> bool:
-    """Check if a member has permission to use admin commands."""
-    return any(role.id in ALLOWED_ROLES for role in member.roles) or member.guild_permissions.administrator
+def has_permission(member: Optional[discord.Member], action: str) -> bool:
+    """Check if a member may perform an action under PERMISSION_POLICIES."""
+    return permissions.allowed(member, action)
+
+async def get_interaction_member(interaction: discord.Interaction) -> Optional[discord.Member]:
+    """Get the interacting user as a member of the team guild, with their roles."""
+    # Guild interactions carry the member and their roles, so no member cache is needed
+    if isinstance(interaction.user, discord.Member):
+        return interaction.user
+
+    # Interactions from DMs only carry the user; look them up in the guild the team roles live in
+    management_role = discord_cache.get_role(MANAGEMENT_ROLE_ID)
+    if management_role is None:
+        return None
+    try:
+        return await discord_cache.get_member(management_role.guild, interaction.user.id)
+    except discord.HTTPException as e:
+        logger.error(f"Error fetching member {interaction.user.id}: {e}")
+        return None
+
+async def send_session_expired(interaction: discord.Interaction):
+    """Tell the user their workflow session is gone and they need to start over."""
+    message = "⌛ This session has expired. Please start again."
+    if interaction.response.is_done():
+        await interaction.followup.send(message, ephemeral=True)
+    else:
+        await interaction.response.send_message(message, ephemeral=True)
+
+def get_format_duration(format_type: str) -> datetime.timedelta:
+    """Get the estimated duration of a scrim format."""
+    return FORMAT_DURATIONS.get(format_type, DEFAULT_FORMAT_DURATION)
+
+async def find_scrim_conflicts(team: str, start_time: datetime.datetime, format_type: str,
+                               players: List[str]) -> List[str]:
+    """Describe overlapping team scrims and absent players for a scrim being scheduled."""
+    conflicts = []
+    end_time = start_time + get_format_duration(format_type)
+    
+    # Any scrim that could still be running at start_time began at most one longest-format ago
+    longest = max(max(FORMAT_DURATIONS.values()), DEFAULT_FORMAT_DURATION)
+    nearby_scrims = await db_manager.get_team_scrims_between(team, start_time - longest, end_time)
+    # Recurring scrims further ahead than what has been written to the database
+    nearby_scrims += db_manager.get_series_occurrences_between(team, start_time - longest, end_time)
+    for scrim in nearby_scrims:
+        if scrim.start_time + get_format_duration(scrim.format) > start_time:
+            conflicts.append(
+                f"{team} already has a scrim against **{scrim.opponent}** at "
+                f"<t:{int(scrim.start_time.timestamp())}:F> ({scrim.format})"
+            )
+            
+    # Match listed players to absences by user ID when mentioned, otherwise by name
+    player_ids = {resolve_player_id(player) for player in players} - {None}
+    player_names = {player.strip().lstrip("@").lower() for player in players}
+    
+    absences = db_manager.get_overlapping_absences(start_time.date(), end_time.date(), team=team)
+    for absence in absences:
+        if absence.user_id in player_ids or absence.user_name.lower() in player_names:
+            conflicts.append(
+                f"**{absence.user_name}** is absent ({absence.absence_type}) from "
+                f"{absence.start_date.strftime('%d/%m/%Y')} to {absence.end_date.strftime('%d/%m/%Y')}"
+            )
+            
+    return conflicts
 
 def generate_scrim_embed(team: str, data: Dict[str, Any]) -> discord.Embed:
     """Generate embed for scrim announcement."""
@@ -372,14 +2146,10 @@ def generate_scrim_embed(team: str, data: Dict[str, Any]) -> discord.Embed:
     
     # Format players list
     players = data.get('players', [])
-    if isinstance(players, str):
-        players = players.split(',')
     players_formatted = '\n'.join(f"- {player}" for player in players)
     
     # Format maps list
     maps_value = data.get("maps", [])
-    if isinstance(maps_value, str):
-        maps_value = maps_value.split(',')
     maps_text = '\n'.join(f"- {map_name}" for map_name in maps_value)
     
     # Get unix timestamp for Discord time format
@@ -404,7 +2174,7 @@ def generate_scrim_embed(team: str, data: Dict[str, Any]) -> discord.Embed:
     embed.add_field(name="👥 Players", value=players_formatted, inline=False)
     
     # Add reminder note
-    embed.add_field(name="⏰ Reminder", value="A reminder will be sent 30 minutes before the scrim starts.",
+    embed.add_field(name="⏰ Reminder", value=describe_reminder_stages(db_manager.get_reminder_offsets(team)),
                     inline=False)
                     
     return embed
@@ -432,14 +2202,10 @@ class BasicView(discord.ui.View):
     """Base view with common functionality."""
     
     def __init__(self, user_id: int, timeout: int = 300):
+        # A view timing out only stops handling its buttons; the workflow session may still be in
+        # use by later steps and expires through the session store's sliding TTL instead
         super().__init__(timeout=timeout)
         self.user_id = user_id
-        
-    async def on_timeout(self):
-        """Clean up on timeout."""
-        if self.user_id in session_cache:
-            del session_cache[self.user_id]
-            logger.info(f"Session timed out for user {self.user_id}")
 
 class ConfirmCancelView(BasicView):
     """View with confirm and cancel buttons."""
@@ -469,10 +2235,10 @@ class ConfirmCancelView(BasicView):
         """Called when confirm is pressed. Override in subclasses."""
         pass
         
+    @instrument("component")
     async def cancel_callback(self, interaction: discord.Interaction):
         """Called when cancel is pressed."""
-        if self.user_id in session_cache:
-            del session_cache[self.user_id]
+        sessions.end(self.user_id)
         
         await interaction.response.send_message(
             "❌ Operation cancelled.",
@@ -491,11 +2257,12 @@ class AbsenceButton(discord.ui.Button):
             emoji="📅"
         )
 
+    @instrument("component")
     async def callback(self, interaction: discord.Interaction):
         """Handle button press."""
         # Initialize session data
         user_id = interaction.user.id
-        session_cache[user_id] = {"workflow": "absence"}
+        sessions.begin(user_id, "absence")
         
         # Create dropdown for absence type
         select = discord.ui.Select(
@@ -523,6 +2290,7 @@ class AbsenceButton(discord.ui.Button):
             ephemeral=True
         )
         
+    @instrument("component")
     async def on_absence_type_select(self, interaction: discord.Interaction, select):
         """Handle absence type selection."""
         user_id = interaction.user.id
@@ -531,8 +2299,13 @@ class AbsenceButton(discord.ui.Button):
             None
         )
         
+        session = sessions.get(user_id)
+        if session is None:
+            await send_session_expired(interaction)
+            return
+        
         if absence_type:
-            session_cache[user_id]["absence_type"] = absence_type
+            session["absence_type"] = absence_type
             
             # Show the modal form
             modal = AbsenceDetailsModal(user_id, absence_type)
@@ -586,6 +2359,7 @@ class AbsenceDetailsModal(discord.ui.Modal):
         self.add_item(self.team)
         self.add_item(self.reason)
 
+    @instrument("modal")
     async def on_submit(self, interaction: discord.Interaction):
         """Process the form submission."""
         try:
@@ -622,10 +2396,10 @@ class AbsenceDetailsModal(discord.ui.Modal):
             calendar_start_date = convert_date_format(start_date)
             calendar_end_date = convert_date_format(end_date)
 
-            # Add to Google Calendar
-            calendar_link = None
-            try:
-                calendar_link = await calendar_manager.add_absence(
+            # Queue the Google Calendar event; the outbox worker creates it in the background
+            calendar_event = None
+            if calendar_manager.is_configured:
+                calendar_event = calendar_manager.build_absence_event(
                     player_name=user.display_name,
                     absence_type=self.absence_type["label"],
                     start_date=calendar_start_date,
@@ -633,11 +2407,9 @@ class AbsenceDetailsModal(discord.ui.Modal):
                     reason=reason,
                     team=team
                 )
-            except Exception as e:
-                logger.error(f"Error adding to Google Calendar: {e}")
 
-            # Add absence to database
-            await db_manager.add_absence(
+            # Add absence to database, together with its outbox entry
+            absence_id = await db_manager.add_absence(
                 user_id=user.id,
                 user_name=user.display_name,
                 absence_type=self.absence_type["label"],
@@ -645,7 +2417,7 @@ class AbsenceDetailsModal(discord.ui.Modal):
                 end_date=calendar_end_date,
                 team=team,
                 reason=reason,
-                calendar_link=calendar_link
+                calendar_event=calendar_event
             )
 
             # Create confirmation embed
@@ -661,30 +2433,37 @@ class AbsenceDetailsModal(discord.ui.Modal):
             confirm_embed.timestamp = datetime.datetime.now()
 
             # Send confirmation to the user
+            content = "Your absence has been submitted successfully!"
+            if calendar_event:
+                content += " It will be added to the team calendar shortly."
             await interaction.followup.send(
-                content="Your absence has been submitted successfully!",
+                content=content,
                 embed=confirm_embed,
                 ephemeral=True
             )
 
             # Send notification to management channel
-            await self.send_management_notification(
+            notification = await self.send_management_notification(
                 interaction,
                 user,
                 self.absence_type["label"],
                 start_date,
                 end_date,
                 team,
-                reason,
-                calendar_link
+                reason
             )
 
-            # Inform user about calendar addition (if successful)
-            if calendar_link:
-                await interaction.followup.send(
-                    f"Event added to the team calendar: {calendar_link}",
-                    ephemeral=True
-                )
+            # The absence workflow is complete
+            sessions.end(self.user_id)
+
+            # Let the outbox worker add the calendar link to the notification once the event exists.
+            # The entry stays held until this is recorded, so the worker can't finish it first.
+            if calendar_event:
+                if notification:
+                    await db_manager.release_outbox_event(absence_id, notification.channel.id, notification.id)
+                else:
+                    await db_manager.release_outbox_event(absence_id)
+                calendar_outbox.notify()
 
         except Exception as e:
             logger.error(f"Error processing absence: {e}")
@@ -703,14 +2482,14 @@ class AbsenceDetailsModal(discord.ui.Modal):
             team: str,
             reason: str,
             calendar_link: Optional[str] = None
-    ):
-        """Send notification to the management channel."""
+    ) -> Optional[discord.Message]:
+        """Send notification to the management channel and return the message sent."""
         try:
             # Get the management channel
-            channel = interaction.client.get_channel(ABSENCE_MANAGEMENT_CHANNEL_ID)
+            channel = await discord_cache.get_channel(ABSENCE_MANAGEMENT_CHANNEL_ID)
             if not channel:
                 logger.error(f"Management channel with ID {ABSENCE_MANAGEMENT_CHANNEL_ID} not found.")
-                return
+                return None
 
             # Get team role ID
             team_role_id = TEAM_CONFIG[team]["role_id"]
@@ -735,10 +2514,12 @@ class AbsenceDetailsModal(discord.ui.Modal):
             # Mention the team role and management role
             content = f"<@&{team_role_id}> <@&{MANAGEMENT_ROLE_ID}> - New absence notification from team member"
 
-            await channel.send(content=content, embed=notification_embed)
+            # Not coalesced: the outbox later edits this message's embed to add the calendar link
+            return await bot.outbound.send(channel, content=content, embed=notification_embed)
             
         except Exception as e:
             logger.error(f"Error sending management notification: {e}")
+            return None
 
 # --- Scrim Scheduler Components ---
 class TeamSelectionView(BasicView):
@@ -753,9 +2534,14 @@ class TeamSelectionView(BasicView):
             button.callback = lambda i, tn=team_name: self.select_team(i, tn)
             self.add_item(button)
     
+    @instrument("component")
     async def select_team(self, interaction: discord.Interaction, team: str):
         """Handle team selection."""
-        session_cache[self.user_id]["team"] = team
+        session = sessions.get(self.user_id)
+        if session is None:
+            await send_session_expired(interaction)
+            return
+        session["team"] = team
         
         # After team selection, show the date/time modal
         await interaction.response.send_modal(ScrimDateTimeModal(self.user_id))
@@ -795,6 +2581,7 @@ class ScrimDateTimeModal(discord.ui.Modal, title="Scrim Date and Time"):
         self.add_item(self.time_input)
         self.add_item(self.timezone_input)
 
+    @instrument("modal")
     async def on_submit(self, interaction: discord.Interaction):
         """Process the date and time submission."""
         try:
@@ -821,8 +2608,12 @@ class ScrimDateTimeModal(discord.ui.Modal, title="Scrim Date and Time"):
             utc_timestamp = int(naive_date_time_obj.timestamp()) - (timezone_offset * 3600)
             date_time_obj = datetime.datetime.fromtimestamp(utc_timestamp)
 
-            # Store in session cache
-            session_cache[self.user_id].update({
+            # Store in session
+            session = sessions.get(self.user_id)
+            if session is None:
+                await send_session_expired(interaction)
+                return
+            session.update({
                 "date": date_str,
                 "time": time_str,
                 "timezone": timezone_str,
@@ -864,14 +2655,24 @@ class OpponentDetailsModal(discord.ui.Modal, title="Opponent Details"):
         self.add_item(self.opponent_team)
         self.add_item(self.opponent_rank)
 
+    @instrument("modal")
     async def on_submit(self, interaction: discord.Interaction):
         """Process the opponent details submission."""
+        session = sessions.get(self.user_id)
+        if session is None:
+            await send_session_expired(interaction)
+            return
+        
         # Store opponent details
-        session_cache[self.user_id].update({
+        session.update({
             "opponent": self.opponent_team.value,
             "opponent_rank": self.opponent_rank.value
         })
 
+        await self.prompt_format(interaction)
+        
+    async def prompt_format(self, interaction: discord.Interaction):
+        """Ask for the match format."""
         # Create the format selection view
         view = discord.ui.View(timeout=300)
         
@@ -891,11 +2692,20 @@ class OpponentDetailsModal(discord.ui.Modal, title="Opponent Details"):
             ephemeral=True
         )
         
+    @instrument("component")
     async def on_format_select(self, interaction: discord.Interaction, select):
         """Handle format selection."""
         selected_format = select.values[0]
-        session_cache[self.user_id]["format"] = selected_format
+        session = sessions.get(self.user_id)
+        if session is None:
+            await send_session_expired(interaction)
+            return
+        session["format"] = selected_format
+        
+        await self.prompt_maps(interaction)
         
+    async def prompt_maps(self, interaction: discord.Interaction):
+        """Ask for the maps to be played."""
         # Create maps selection view
         view = discord.ui.View(timeout=300)
         
@@ -917,11 +2727,20 @@ class OpponentDetailsModal(discord.ui.Modal, title="Opponent Details"):
             ephemeral=True
         )
         
+    @instrument("component")
     async def on_maps_select(self, interaction: discord.Interaction, select):
         """Handle maps selection."""
         selected_maps = select.values
-        session_cache[self.user_id]["maps"] = selected_maps
+        session = sessions.get(self.user_id)
+        if session is None:
+            await send_session_expired(interaction)
+            return
+        session["maps"] = selected_maps
         
+        await self.prompt_server(interaction)
+        
+    async def prompt_server(self, interaction: discord.Interaction):
+        """Ask for the server location."""
         # Create server selection view
         view = discord.ui.View(timeout=300)
         
@@ -941,10 +2760,15 @@ class OpponentDetailsModal(discord.ui.Modal, title="Opponent Details"):
             ephemeral=True
         )
         
+    @instrument("component")
     async def on_server_select(self, interaction: discord.Interaction, select):
         """Handle server selection."""
         selected_server = select.values[0]
-        session_cache[self.user_id]["server"] = selected_server
+        session = sessions.get(self.user_id)
+        if session is None:
+            await send_session_expired(interaction)
+            return
+        session["server"] = selected_server
         
         # Continue to player selection modal
         await interaction.response.send_modal(PlayerSelectionModal(self.user_id))
@@ -963,6 +2787,7 @@ class OpponentDetailsView(BasicView):
         button.callback = self.on_button_click
         self.add_item(button)
         
+    @instrument("component")
     async def on_button_click(self, interaction: discord.Interaction):
         await interaction.response.send_modal(OpponentDetailsModal(self.user_id))
 
@@ -982,25 +2807,47 @@ class PlayerSelectionModal(discord.ui.Modal, title="Player Selection"):
         
         self.add_item(self.players_input)
 
+    @instrument("modal")
     async def on_submit(self, interaction: discord.Interaction):
         """Process player selection."""
         # Process player input - split by newlines for proper handling
         players = self.players_input.value.strip().split('\n')
-        session_cache[self.user_id]["players"] = players
-
-        # Generate preview embed
-        team = session_cache[self.user_id]["team"]
-        embed = generate_scrim_embed(team, session_cache[self.user_id])
+        data = sessions.get(self.user_id)
+        if data is None:
+            await send_session_expired(interaction)
+            return
+        data["players"] = players
+
+        await send_scrim_preview(interaction, self.user_id, data)
+
+async def send_scrim_preview(interaction: discord.Interaction, user_id: int, data: Dict[str, Any]):
+    """Show the scrim announcement preview with any conflicts and the confirm buttons."""
+    # Generate preview embed
+    team = data["team"]
+    embed = generate_scrim_embed(team, data)
+
+    # Warn about clashes before the captain confirms
+    content = "Here's a preview of your scrim announcement:"
+    try:
+        conflicts = await find_scrim_conflicts(team, data["start_time"], data["format"], data["players"])
+        if conflicts:
+            # Keep the message well inside Discord's 2000 character limit
+            shown = [f"- {conflict}" for conflict in conflicts[:MAX_CONFLICTS_SHOWN]]
+            if len(conflicts) > MAX_CONFLICTS_SHOWN:
+                shown.append(f"- ...and {len(conflicts) - MAX_CONFLICTS_SHOWN} more")
+            content = "⚠️ **Possible scheduling conflicts:**\n" + "\n".join(shown) + f"\n\n{content}"
+    except Exception as e:
+        logger.error(f"Error checking scrim conflicts: {e}")
 
-        # Create confirmation view
-        view = ScrimConfirmationView(self.user_id)
-        
-        await interaction.response.send_message(
-            "Here's a preview of your scrim announcement:",
-            embed=embed,
-            view=view,
-            ephemeral=True
-        )
+    # Create confirmation view
+    view = ScrimConfirmationView(user_id)
+    
+    await interaction.response.send_message(
+        content,
+        embed=embed,
+        view=view,
+        ephemeral=True
+    )
 
 class ScrimConfirmationView(ConfirmCancelView):
     """View for confirming or canceling a scrim announcement."""
@@ -1012,14 +2859,39 @@ class ScrimConfirmationView(ConfirmCancelView):
             cancel_label="Cancel"
         )
         
+        # Add repeat button between confirm and cancel
+        cancel_button = self.children[-1]
+        self.remove_item(cancel_button)
+        repeat_button = discord.ui.Button(
+            label="Confirm & Repeat Weekly",
+            style=discord.ButtonStyle.primary,
+            custom_id=f"repeat_{user_id}"
+        )
+        repeat_button.callback = self.repeat_callback
+        self.add_item(repeat_button)
+        self.add_item(cancel_button)
+        
+    @instrument("component")
     async def confirm_callback(self, interaction: discord.Interaction):
         """Handle scrim confirmation."""
+        await self.confirm(interaction, repeat=False)
+        
+    @instrument("component")
+    async def repeat_callback(self, interaction: discord.Interaction):
+        """Handle scrim confirmation as a weekly recurring series."""
+        await self.confirm(interaction, repeat=True)
+        
+    async def confirm(self, interaction: discord.Interaction, repeat: bool):
+        """Announce the scrim and store it, once or as a weekly series."""
         try:
             await interaction.response.defer(ephemeral=True)
             
             # Get scrim data
             user_id = self.user_id
-            data = session_cache[user_id]
+            data = sessions.get(user_id)
+            if data is None:
+                await send_session_expired(interaction)
+                return
             team = data["team"]
             
             # Get channel and role IDs
@@ -1035,7 +2907,7 @@ class ScrimConfirmationView(ConfirmCancelView):
                 return
                 
             # Get the channel
-            channel = interaction.client.get_channel(channel_id)
+            channel = await discord_cache.get_channel(channel_id)
             if not channel:
                 await interaction.followup.send(
                     f"❌ Error: Could not find channel with ID {channel_id}",
@@ -1045,6 +2917,13 @@ class ScrimConfirmationView(ConfirmCancelView):
                 
             # Generate embed
             embed = generate_scrim_embed(team, data)
+            series_timezone = SERIES_TIMEZONES.get(data.get("timezone", ""))
+            if repeat:
+                recurrence = Recurrence.parse(
+                    data["start_time"].timestamp(), WEEKLY_RULE,
+                    zoneinfo.ZoneInfo(series_timezone) if series_timezone else None
+                )
+                embed.add_field(name="🔁 Repeats", value=recurrence.describe().capitalize(), inline=False)
             
             # Include role ping in the message content
             content = (
@@ -1055,10 +2934,10 @@ class ScrimConfirmationView(ConfirmCancelView):
             )
             
             # Send the announcement
-            await channel.send(content=content, embed=embed)
+            await bot.outbound.send(channel, content=content, embed=embed)
             
             # Add to database
-            scrim_id = await db_manager.add_scrim(
+            details = dict(
                 team=team,
                 opponent=data["opponent"],
                 start_time=data["start_time"],
@@ -1070,16 +2949,45 @@ class ScrimConfirmationView(ConfirmCancelView):
                 channel_id=channel_id,
                 role_id=role_id
             )
+            if repeat:
+                # Only occurrences within the next few days are written; later ones follow as they approach
+                series, scrims = await db_manager.add_scrim_series(
+                    **details, rule=WEEKLY_RULE, timezone=series_timezone
+                )
+                logger.info(f"Added scrim series ID {series.id} with {len(scrims)} upcoming occurrences")
+            else:
+                scrim_id = await db_manager.add_scrim(**details)
+                logger.info(f"Added scrim to database with ID {scrim_id}")
+                scrims = [ScrimRecord(
+                    id=scrim_id,
+                    team=team,
+                    opponent=data["opponent"],
+                    start_time=data["start_time"],
+                    format=data["format"],
+                    maps=data["maps"],
+                    server=data["server"],
+                    players=data["players"],
+                    opponent_rank=data["opponent_rank"],
+                    channel_id=channel_id,
+                    role_id=role_id
+                )]
             
-            logger.info(f"Added scrim to database with ID {scrim_id}")
+            # Queue the reminders right away instead of waiting for a poll
+            for record in scrims:
+                await reminder_scheduler.schedule(record)
             
             # Clean up session data
-            del session_cache[user_id]
+            sessions.end(user_id)
             
-            await interaction.followup.send(
-                "✅ Scrim announcement confirmed and sent! A reminder will be sent 30 minutes before the scrim starts.",
-                ephemeral=True
+            message = "✅ Scrim announcement confirmed and sent! " + describe_reminder_stages(
+                db_manager.get_reminder_offsets(team)
             )
+            if repeat:
+                message += (
+                    f"\n🔁 It repeats every week as series #{series.id}. "
+                    f"Use /series_skip or /series_override to change a single week, or /series_end to stop it."
+                )
+            await interaction.followup.send(message, ephemeral=True)
             
         except Exception as e:
             logger.error(f"Error confirming scrim: {e}")
@@ -1102,14 +3010,71 @@ class PersistentScrimButton(discord.ui.View):
         custom_id="persistent_scrim_button",
         emoji="🗓️"
     )
+    @instrument("component")
     async def scrim_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         await start_scrim_workflow(interaction)
 
 # --- Commands and Workflows ---
+async def resume_scrim_workflow(interaction: discord.Interaction, user_id: int, data: Dict[str, Any]):
+    """Continue a scrim workflow from the first step that has not been completed."""
+    if "team" not in data:
+        await interaction.response.send_message(
+            "Please select your team:",
+            view=TeamSelectionView(user_id),
+            ephemeral=True
+        )
+    elif "start_time" not in data:
+        await interaction.response.send_modal(ScrimDateTimeModal(user_id))
+    elif "opponent" not in data:
+        await interaction.response.send_modal(OpponentDetailsModal(user_id))
+    elif "format" not in data:
+        await OpponentDetailsModal(user_id).prompt_format(interaction)
+    elif "maps" not in data:
+        await OpponentDetailsModal(user_id).prompt_maps(interaction)
+    elif "server" not in data:
+        await OpponentDetailsModal(user_id).prompt_server(interaction)
+    elif "players" not in data:
+        await interaction.response.send_modal(PlayerSelectionModal(user_id))
+    else:
+        await send_scrim_preview(interaction, user_id, data)
+
+class ResumeScrimView(BasicView):
+    """View offering to resume an unfinished scrim workflow or start a new one."""
+    
+    def __init__(self, user_id: int):
+        super().__init__(user_id)
+        
+        resume_button = discord.ui.Button(label="Resume", style=discord.ButtonStyle.success)
+        resume_button.callback = self.resume_callback
+        self.add_item(resume_button)
+        
+        restart_button = discord.ui.Button(label="Start over", style=discord.ButtonStyle.secondary)
+        restart_button.callback = self.restart_callback
+        self.add_item(restart_button)
+        
+    @instrument("component")
+    async def resume_callback(self, interaction: discord.Interaction):
+        """Pick the workflow up where it was left."""
+        data = sessions.get(self.user_id)
+        if data is None:
+            await send_session_expired(interaction)
+            return
+        await resume_scrim_workflow(interaction, self.user_id, data)
+        
+    @instrument("component")
+    async def restart_callback(self, interaction: discord.Interaction):
+        """Discard the unfinished workflow and start again."""
+        sessions.begin(self.user_id, "scrim")
+        await interaction.response.send_message(
+            "Please select your team:",
+            view=TeamSelectionView(self.user_id),
+            ephemeral=True
+        )
+
 async def start_scrim_workflow(interaction: discord.Interaction):
     """Start the scrim scheduling workflow."""
     # Check for permissions
-    if not has_permission(interaction.user):
+    if not has_permission(await get_interaction_member(interaction), "schedule_scrim"):
         embed = discord.Embed(
             title="❌ Access Denied",
             description="You do not have permission to schedule scrims.",
@@ -1118,9 +3083,21 @@ async def start_scrim_workflow(interaction: discord.Interaction):
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
 
-    # Initialize session data
+    # Offer to resume a workflow left unfinished, including one from before a restart
     user_id = interaction.user.id
-    session_cache[user_id] = {"workflow": "scrim"}
+    existing = await sessions.restore(user_id)
+    if existing is not None and existing.get("workflow") == "scrim" and "team" in existing:
+        await interaction.response.send_message(
+            f"You have an unfinished scrim for **{existing['team']}**"
+            + (f" against **{existing['opponent']}**" if "opponent" in existing else "")
+            + ". Do you want to continue where you left off?",
+            view=ResumeScrimView(user_id),
+            ephemeral=True
+        )
+        return
+
+    # Initialize session data
+    sessions.begin(user_id, "scrim")
 
     # Prompt for Team Selection
     view = TeamSelectionView(user_id)
@@ -1131,16 +3108,18 @@ async def start_scrim_workflow(interaction: discord.Interaction):
     )
 
 @bot.tree.command(name="scrim", description="Start a scrim announcement!")
+@instrument("command")
 async def scrim(interaction: discord.Interaction):
     """Slash command to start scheduling a scrim."""
     await start_scrim_workflow(interaction)
 
 @bot.tree.command(name="absence", description="Submit an absence notification")
+@instrument("command")
 async def absence(interaction: discord.Interaction):
     """Slash command to submit an absence."""
     # Initialize session data
     user_id = interaction.user.id
-    session_cache[user_id] = {"workflow": "absence"}
+    sessions.begin(user_id, "absence")
     
     # Create and show absence type selection view
     view = discord.ui.View(timeout=300)
@@ -1158,14 +3137,20 @@ async def absence(interaction: discord.Interaction):
         max_values=1
     )
     
+    @instrument("component")
     async def select_callback(i):
         absence_type = next(
             (type for type in ABSENCE_TYPES if type["value"] == select.values[0]),
             None
         )
         
+        session = sessions.get(user_id)
+        if session is None:
+            await send_session_expired(i)
+            return
+        
         if absence_type:
-            session_cache[user_id]["absence_type"] = absence_type
+            session["absence_type"] = absence_type
             modal = AbsenceDetailsModal(user_id, absence_type)
             await i.response.send_modal(modal)
     
@@ -1178,11 +3163,304 @@ async def absence(interaction: discord.Interaction):
         ephemeral=True
     )
 
+@bot.tree.command(name="availability", description="See which players of a team are absent on a date")
+@app_commands.describe(team="The team to check", date="Date to check (DD/MM/YYYY), defaults to today")
+@app_commands.choices(team=[app_commands.Choice(name=team_name, value=team_name) for team_name in TEAM_CONFIG])
+@instrument("command")
+async def availability(interaction: discord.Interaction, team: app_commands.Choice[str], date: Optional[str] = None):
+    """Slash command to list the absent players of a team on a date."""
+    # Check for permissions
+    if not has_permission(await get_interaction_member(interaction), "view_absences"):
+        embed = discord.Embed(
+            title="❌ Access Denied",
+            description="You do not have permission to view team availability.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+        
+    # Parse the date, defaulting to today
+    if date is None:
+        check_date = datetime.date.today()
+    elif is_valid_date(date):
+        check_date = datetime.datetime.strptime(date, "%d/%m/%Y").date()
+    else:
+        await interaction.response.send_message(
+            "Invalid date format. Please use DD/MM/YYYY.",
+            ephemeral=True
+        )
+        return
+        
+    absences = db_manager.get_absences_on(team.value, check_date)
+    
+    # Create availability embed
+    embed = discord.Embed(
+        title=f"🗓️ {team.value} Availability",
+        description=f"Absences on {check_date.strftime('%d/%m/%Y')}",
+        color=TEAM_CONFIG[team.value]["color"]
+    )
+    
+    if absences:
+        for absence in absences[:25]:  # Embeds hold at most 25 fields
+            embed.add_field(
+                name=absence.user_name,
+                value=(
+                    f"{absence.absence_type} • "
+                    f"{absence.start_date.strftime('%d/%m/%Y')} - {absence.end_date.strftime('%d/%m/%Y')}"
+                ),
+                inline=False
+            )
+    else:
+        embed.add_field(name="✅ Everyone available", value="No absences recorded for this date.", inline=False)
+        
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="reminder_stages", description="List, add or remove the reminders sent before scrims")
+@app_commands.describe(
+    action="What to do",
+    team="The team to change; leave empty for the default stages of teams without their own",
+    offset="How long before the scrim, e.g. 24h, 2h or 30m"
+)
+@app_commands.choices(
+    action=[
+        app_commands.Choice(name="List", value="list"),
+        app_commands.Choice(name="Add", value="add"),
+        app_commands.Choice(name="Remove", value="remove"),
+    ],
+    team=[app_commands.Choice(name=team_name, value=team_name) for team_name in TEAM_CONFIG]
+)
+@instrument("command")
+async def reminder_stages(interaction: discord.Interaction, action: app_commands.Choice[str],
+                          team: Optional[app_commands.Choice[str]] = None, offset: Optional[str] = None):
+    """Slash command to manage the reminder stages sent before a team's scrims."""
+    # Check for permissions
+    if not has_permission(await get_interaction_member(interaction), "manage_reminders"):
+        embed = discord.Embed(
+            title="❌ Access Denied",
+            description="You do not have permission to manage scrim reminders.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+        
+    if action.value != "list":
+        team_name = team.value if team else DEFAULT_REMINDER_TEAM
+        label = team.value if team else "the default stages"
+        minutes = parse_offset(offset) if offset else None
+        if minutes is None:
+            await interaction.response.send_message(
+                "Please give an offset between 1 minute and 7 days, e.g. 24h, 2h or 30m.",
+                ephemeral=True
+            )
+            return
+            
+        await interaction.response.defer(ephemeral=True)
+        if action.value == "add":
+            on_defaults = team is not None and team_name not in db_manager.reminder_stages
+            changed = await db_manager.add_reminder_stage(team_name, minutes)
+            message = f"✅ Added a {format_offset(minutes)} reminder to {label}."
+            if on_defaults:
+                stages = describe_reminder_stages(db_manager.get_reminder_offsets(team_name))
+                message += f" {label} now has its own stages, copied from the defaults. {stages}"
+            unchanged = f"Nothing changed: {label} already has a {format_offset(minutes)} reminder."
+        else:
+            changed = await db_manager.remove_reminder_stage(team_name, minutes)
+            message = f"✅ Removed the {format_offset(minutes)} reminder from {label}."
+            unchanged = f"Nothing changed: {label} has no {format_offset(minutes)} reminder."
+        if not changed:
+            await interaction.followup.send(unchanged, ephemeral=True)
+            return
+            
+        # Pending deliveries were changed in the database; pick them up
+        await reminder_scheduler.load()
+        await interaction.followup.send(message, ephemeral=True)
+        return
+        
+    embed = discord.Embed(
+        title="⏰ Scrim Reminder Stages",
+        description="Teams without stages of their own use the default stages.",
+        color=discord.Color.blue()
+    )
+    defaults = db_manager.reminder_stages.get(DEFAULT_REMINDER_TEAM, ())
+    embed.add_field(name="Default", value=describe_reminder_stages(defaults), inline=False)
+    for team_name in TEAM_CONFIG:
+        own = db_manager.reminder_stages.get(team_name)
+        embed.add_field(
+            name=team_name,
+            value=describe_reminder_stages(own) if own else "Uses the default stages.",
+            inline=False
+        )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+async def check_series_access(interaction: discord.Interaction, series_id: int) -> Optional[ScrimSeries]:
+    """Get a scrim series for a series command, replying with the reason when it can't be used."""
+    if not has_permission(await get_interaction_member(interaction), "schedule_scrim"):
+        embed = discord.Embed(
+            title="❌ Access Denied",
+            description="You do not have permission to manage recurring scrims.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return None
+        
+    series = db_manager.scrim_series.get(series_id)
+    if series is None:
+        await interaction.response.send_message(f"There is no scrim series #{series_id}.", ephemeral=True)
+    return series
+
+async def find_series_occurrence(interaction: discord.Interaction, series: ScrimSeries, date: str) -> Optional[int]:
+    """Get the index of a series' upcoming occurrence on a DD/MM/YYYY date, replying when there is none."""
+    if not is_valid_date(date):
+        await interaction.response.send_message("Invalid date format. Please use DD/MM/YYYY.", ephemeral=True)
+        return None
+        
+    index = series.recurrence.index_on(datetime.datetime.strptime(date, "%d/%m/%Y").date())
+    now = datetime.datetime.now().timestamp()
+    if index is None or series.recurrence.occurrence(index) <= now:
+        await interaction.response.send_message(
+            f"Series #{series.id} has no upcoming scrim on {date}.", ephemeral=True
+        )
+        return None
+    return index
+
+async def apply_series_exception(series_id: int, occurrence: int, skipped=False, overrides=None):
+    """Record a series exception and move the reminders of the affected scrim over to its new details."""
+    removed, created = await db_manager.set_series_exception(series_id, occurrence, skipped, overrides)
+    for scrim_id in removed:
+        reminder_scheduler.cancel(scrim_id)
+    for record in created:
+        await reminder_scheduler.schedule(record)
+
+@bot.tree.command(name="series_list", description="List recurring scrims and their upcoming dates")
+@app_commands.describe(team="Only list this team's series")
+@app_commands.choices(team=[app_commands.Choice(name=team_name, value=team_name) for team_name in TEAM_CONFIG])
+@instrument("command")
+async def series_list(interaction: discord.Interaction, team: Optional[app_commands.Choice[str]] = None):
+    """Slash command to list recurring scrim series with their next occurrences."""
+    if not has_permission(await get_interaction_member(interaction), "schedule_scrim"):
+        embed = discord.Embed(
+            title="❌ Access Denied",
+            description="You do not have permission to view recurring scrims.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+        
+    now = datetime.datetime.now().timestamp()
+    embed = discord.Embed(title="🔁 Recurring Scrims", color=discord.Color.blue())
+    for series in db_manager.scrim_series.values():
+        if (team and series.team != team.value) or series.finished(now):
+            continue
+        if len(embed.fields) == 25:  # Embeds hold at most 25 fields
+            break
+            
+        # Only the next few occurrences are expanded, however long the series has run
+        lines = []
+        for index, _ in itertools.islice(series.recurrence.between(now, float("inf")), SERIES_LIST_OCCURRENCES):
+            scrim = series.occurrence(index)
+            when = f"<t:{int(scrim.start_time.timestamp())}:F>"
+            if series.is_skipped(index):
+                lines.append(f"~~{when}~~ skipped")
+            elif index in series.exceptions:
+                lines.append(f"{when} vs **{scrim.opponent}** (changed)")
+            else:
+                lines.append(when)
+        embed.add_field(
+            name=f"#{series.id} {series.team} vs {series.opponent}",
+            value=f"{series.format} • {series.recurrence.describe()}\n" + "\n".join(lines),
+            inline=False
+        )
+        
+    if not embed.fields:
+        embed.description = "No recurring scrims are scheduled."
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="series_skip", description="Skip one date of a recurring scrim")
+@app_commands.describe(series_id="The series number shown by /series_list", date="Date to skip (DD/MM/YYYY)")
+@instrument("command")
+async def series_skip(interaction: discord.Interaction, series_id: int, date: str):
+    """Slash command to skip a single occurrence of a recurring scrim."""
+    series = await check_series_access(interaction, series_id)
+    if series is None:
+        return
+    index = await find_series_occurrence(interaction, series, date)
+    if index is None:
+        return
+        
+    await interaction.response.defer(ephemeral=True)
+    await apply_series_exception(series_id, index, skipped=True)
+    await interaction.followup.send(f"✅ Skipped {series.team} vs {series.opponent} on {date}.", ephemeral=True)
+
+@bot.tree.command(name="series_override", description="Change the opponent or time of one date of a recurring scrim")
+@app_commands.describe(
+    series_id="The series number shown by /series_list",
+    date="Date of the scrim to change (DD/MM/YYYY)",
+    opponent="Opponent for this date",
+    opponent_rank="Opponent rank for this date",
+    time="New start time on that date (HH:MM)",
+    timezone="Timezone of the new time (e.g. CET, UTC+2), defaults to UTC"
+)
+@instrument("command")
+async def series_override(interaction: discord.Interaction, series_id: int, date: str,
+                          opponent: Optional[str] = None, opponent_rank: Optional[str] = None,
+                          time: Optional[str] = None, timezone: Optional[str] = None):
+    """Slash command to change the details of a single occurrence of a recurring scrim."""
+    series = await check_series_access(interaction, series_id)
+    if series is None:
+        return
+    index = await find_series_occurrence(interaction, series, date)
+    if index is None:
+        return
+        
+    overrides = {}
+    if opponent:
+        overrides["opponent"] = opponent
+    if opponent_rank:
+        overrides["opponent_rank"] = opponent_rank
+    if time:
+        try:
+            naive_date_time_obj = datetime.datetime.strptime(f"{date} {time}", "%d/%m/%Y %H:%M")
+        except ValueError:
+            await interaction.response.send_message("Invalid time format. Please use HH:MM.", ephemeral=True)
+            return
+        timezone_offset = get_timezone_offset((timezone or "UTC").upper().strip())
+        overrides["start_time"] = naive_date_time_obj.timestamp() - timezone_offset * 3600
+    if not overrides:
+        await interaction.response.send_message(
+            "Please give a new opponent, opponent rank or time for this date.", ephemeral=True
+        )
+        return
+        
+    await interaction.response.defer(ephemeral=True)
+    await apply_series_exception(series_id, index, overrides=overrides)
+    scrim = db_manager.scrim_series[series_id].occurrence(index)
+    await interaction.followup.send(
+        f"✅ {series.team} now plays **{scrim.opponent}** at <t:{int(scrim.start_time.timestamp())}:F>.",
+        ephemeral=True
+    )
+
+@bot.tree.command(name="series_end", description="Stop a recurring scrim")
+@app_commands.describe(series_id="The series number shown by /series_list")
+@instrument("command")
+async def series_end(interaction: discord.Interaction, series_id: int):
+    """Slash command to end a recurring scrim series, removing its upcoming occurrences."""
+    series = await check_series_access(interaction, series_id)
+    if series is None:
+        return
+        
+    await interaction.response.defer(ephemeral=True)
+    for scrim_id in await db_manager.end_scrim_series(series_id):
+        reminder_scheduler.cancel(scrim_id)
+    await interaction.followup.send(
+        f"✅ Ended series #{series_id} ({series.team} vs {series.opponent}).", ephemeral=True
+    )
+
 @bot.tree.command(name="create_scrim_button", description="Create a persistent scrim scheduling button")
+@instrument("command")
 async def create_scrim_button(interaction: discord.Interaction):
     """Admin command to create a persistent scrim button."""
     # Check for admin permissions
-    if not interaction.user.guild_permissions.administrator:
+    if not has_permission(await get_interaction_member(interaction), "create_persistent_button"):
         embed = discord.Embed(
             title="❌ Access Denied",
             description="You need administrator permissions to create a persistent button.",
@@ -1216,10 +3494,11 @@ async def create_scrim_button(interaction: discord.Interaction):
     await interaction.followup.send("✅ Persistent scrim button created successfully!", ephemeral=True)
 
 @bot.tree.command(name="setup_absence_button", description="Set up the persistent absence button in this channel")
+@instrument("command")
 async def setup_absence_button(interaction: discord.Interaction):
     """Admin command to set up the persistent absence button."""
     # Check for admin permissions
-    if not interaction.user.guild_permissions.administrator:
+    if not has_permission(await get_interaction_member(interaction), "create_persistent_button"):
         embed = discord.Embed(
             title="❌ Access Denied",
             description="You need administrator permissions to create a persistent button.",
@@ -1237,74 +3516,343 @@ async def setup_absence_button(interaction: discord.Interaction):
     await interaction.channel.send(embed=embed, view=PersistentAbsenceView())
     await interaction.followup.send("Absence button has been set up successfully!", ephemeral=True)
 
+@bot.tree.command(name="diag", description="Show event loop diagnostics (bot owner only)")
+@app_commands.describe(
+    slow_callbacks_on="Turn asyncio slow callback reporting on or off",
+    profile_seconds="Also capture a cProfile snapshot of the event loop for this many seconds"
+)
+@app_commands.default_permissions(administrator=True)
+@instrument("command")
+async def diag(
+    interaction: discord.Interaction,
+    slow_callbacks_on: Optional[bool] = None,
+    profile_seconds: Optional[app_commands.Range[int, 1, DIAG_MAX_PROFILE_SECONDS]] = None
+):
+    """Owner command reporting loop lag, slow callbacks and optionally a profile."""
+    if not await bot.is_owner(interaction.user):
+        embed = discord.Embed(
+            title="❌ Access Denied",
+            description="Only the bot owner can view diagnostics.",
+            color=discord.Color.red()
+        )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+
+    if slow_callbacks_on is True:
+        slow_callbacks.enable(bot.loop, SLOW_CALLBACK_THRESHOLD)
+    elif slow_callbacks_on is False:
+        slow_callbacks.disable(bot.loop)
+
+    lag = loop_lag_monitor.stats()
+    embed = discord.Embed(title="🩺 Diagnostics", color=discord.Color.blurple())
+    embed.add_field(
+        name="Event loop lag",
+        value=(
+            f"p50 {lag['p50'] * 1000:.1f} ms · p99 {lag['p99'] * 1000:.1f} ms · "
+            f"recent max {lag['recent_max'] * 1000:.1f} ms · max {lag['max'] * 1000:.1f} ms"
+        ),
+        inline=False
+    )
+
+    status = f"on (>{SLOW_CALLBACK_THRESHOLD * 1000:.0f} ms)" if slow_callbacks.enabled else "off"
+    worst = slow_callbacks.top()
+    lines = [
+        f"`{name[:80]}` ×{count}, {total:.2f}s total, worst {worst_seconds:.2f}s"
+        for name, count, total, worst_seconds in worst
+    ]
+    embed.add_field(
+        name=f"Slow callbacks ({status})",
+        value="\n".join(lines) if lines else "None recorded",
+        inline=False
+    )
+    embed.add_field(
+        name="Tasks",
+        value=f"{len(asyncio.all_tasks())} running, {len(sessions)} sessions active",
+        inline=False
+    )
+    for name, component in (("Sessions", sessions), ("Discord cache", discord_cache),
+                            ("Permissions", permissions), ("Outbound", bot.outbound)):
+        embed.add_field(
+            name=name,
+            value=" · ".join(f"{key} {value}" for key, value in component.stats().items()),
+            inline=False
+        )
+
+    if not profile_seconds:
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        report = await profile_event_loop(profile_seconds)
+    except RuntimeError as e:
+        await interaction.followup.send(f"❌ {e}", embed=embed, ephemeral=True)
+        return
+    await interaction.followup.send(
+        embed=embed,
+        file=discord.File(io.BytesIO(report.encode()), filename="profile.txt"),
+        ephemeral=True
+    )
+
 # --- Reminder System ---
-async def reminder_check_loop():
-    """Background task to check for upcoming reminders."""
-    await bot.wait_until_ready()
+class ReminderScheduler:
+    """Fires scrim reminder stages at their exact due time using a min-heap of deadlines
     
-    while not bot.is_closed():
-        try:
-            # Fetch upcoming scrims (within next 24 hours) that need reminders
-            upcoming_scrims = await db_manager.get_upcoming_scrims(hours_ahead=24)
+    Only deliveries due within `horizon` seconds are held in memory; the rest stay in the
+    database behind a partial index and are loaded as the horizon moves forward. Memory and
+    startup cost follow how many reminders are due soon, not how many are pending overall.
+    """
+    
+    def __init__(self, horizon=REMINDER_HORIZON, retry_delay=REMINDER_RETRY_DELAY,
+                 max_sleep=REMINDER_MAX_SLEEP, max_concurrency=REMINDER_MAX_CONCURRENCY):
+        self.horizon = horizon
+        self.retry_delay = retry_delay
+        self.max_sleep = max_sleep
+        # Bounds how many reminders are being sent at once
+        self._sending = asyncio.Semaphore(max_concurrency)
+        # Held while reminders popped from the heap are sent and recorded
+        self._firing = asyncio.Lock()
+        # (scrim_id, offset_minutes) delivered but not yet recorded because the database write failed
+        self._unmarked = set()
+        # Heap of (due_timestamp, scrim_id, offset_minutes); stale entries are skipped lazily
+        self._heap = []
+        # Pending deliveries by (scrim_id, offset_minutes), with the due time of their live heap entry
+        self._pending = {}
+        # Every unsent delivery due up to this timestamp is in memory
+        self._loaded_until = 0.0
+        # Bumped by load() so reads started before it are discarded
+        self._generation = 0
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.wakeups = 0
+        
+    def _push(self, scrim: ScrimRecord, offset_minutes, due):
+        """Add or replace a pending delivery"""
+        self._pending[(scrim.id, offset_minutes)] = (due, scrim)
+        heapq.heappush(self._heap, (due, scrim.id, offset_minutes))
+        
+        # Wake the loop if this reminder is due before the one it is sleeping on
+        if self._heap[0][1:] == (scrim.id, offset_minutes):
+            self._wakeup.set()
             
-            for scrim in upcoming_scrims:
-                # Calculate when the reminder should be sent (30 mins before scrim)
-                reminder_time = scrim["start_time"] - datetime.timedelta(minutes=30)
+    async def schedule(self, scrim: ScrimRecord):
+        """Queue the unsent deliveries of a newly added scrim that fall within the loaded horizon"""
+        # Later deliveries are picked up from the database as the horizon reaches them
+        for offset_minutes, due in await db_manager.get_scrim_deliveries(scrim.id):
+            if due <= self._loaded_until:
+                self._push(scrim, offset_minutes, due)
                 
-                # If it's time to send the reminder (within 1 minute)
-                now = datetime.datetime.now()
-                if now <= reminder_time <= now + datetime.timedelta(minutes=1):
-                    try:
-                        # Send the reminder
-                        await send_scrim_reminder(scrim)
-                        
-                        # Mark as sent in database
-                        await db_manager.mark_reminder_sent(scrim["id"])
-                        
-                        logger.info(f"Sent reminder for scrim ID {scrim['id']}")
-                    except Exception as e:
-                        logger.error(f"Error sending reminder for scrim ID {scrim['id']}: {e}")
+    def cancel(self, scrim_id):
+        """Drop every pending delivery of a scrim"""
+        for key in [key for key in self._pending if key[0] == scrim_id]:
+            del self._pending[key]
+            
+    async def load(self):
+        """Drop what is held in memory and load the deliveries due within the horizon, e.g. after
+        the reminder stages changed"""
+        # Reminders being sent are still unsent in the database until fire() records them;
+        # reading them back before then would send them again
+        async with self._firing:
+            await self._load()
             
-            # Check every minute
-            await asyncio.sleep(60)
+    async def _load(self):
+        self._generation += 1
+        self._heap.clear()
+        self._pending.clear()
+        self._loaded_until = 0.0
+        self._wakeup.set()
+        await self.extend()
+        
+        now = datetime.datetime.now().timestamp()
+        overdue = sum(1 for due, _ in self._pending.values() if due <= now)
+        logger.info(f"Loaded {len(self._pending)} reminders due within the horizon ({overdue} overdue)")
+        
+    async def extend(self):
+        """Load the unsent deliveries due between the end of what is loaded and the horizon"""
+        generation = self._generation
+        now = datetime.datetime.now().timestamp()
+        # Recurring scrims get their upcoming occurrences, and their deliveries, written first
+        try:
+            await db_manager.materialize_series(now + SERIES_WINDOW)
+        except Exception as e:
+            logger.error(f"Error creating upcoming recurring scrims: {e}")
+        due_after = self._loaded_until
+        # Moved before reading so scrims added during the read are scheduled directly
+        self._loaded_until = now + self.horizon
+        try:
+            deliveries = await db_manager.get_pending_deliveries(
+                due_after, self._loaded_until, started_after=now
+            )
+        except Exception:
+            if generation == self._generation:
+                self._loaded_until = due_after
+            raise
             
+        if generation != self._generation:
+            return
+        for scrim, offset_minutes, due in deliveries:
+            if (scrim.id, offset_minutes) not in self._unmarked:
+                self._push(scrim, offset_minutes, due)
+                
+    def start(self):
+        """Start the scheduler task if it is not already running"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+        
+    async def stop(self):
+        """Cancel the scheduler task and wait for it to finish"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        # A task that already failed has logged its error; don't let it abort shutdown
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        
+    def _next_delay(self):
+        """Seconds until the earliest live reminder is due, or None if nothing is pending"""
+        while self._heap:
+            due, scrim_id, offset_minutes = self._heap[0]
+            entry = self._pending.get((scrim_id, offset_minutes))
+            if entry is None or entry[0] != due:
+                # Cancelled or rescheduled since this entry was pushed
+                heapq.heappop(self._heap)
+                continue
+            return due - datetime.datetime.now().timestamp()
+        return None
+        
+    async def run(self):
+        """Sleep until the next deadline, fire everything that is due, repeat"""
+        await bot.wait_until_ready()
+        await self.load()
+        
+        while not bot.is_closed():
+            try:
+                # Read further ahead once half of the horizon has been used up
+                until_extend = self._loaded_until - self.horizon / 2 - datetime.datetime.now().timestamp()
+                if until_extend <= 0:
+                    await self.extend()
+                    continue
+                    
+                delay = self._next_delay()
+                if delay is None or delay > 0:
+                    # Cap the sleep so wall-clock jumps are picked up eventually
+                    timeout = self.max_sleep if delay is None else min(delay, self.max_sleep)
+                    timeout = min(timeout, until_extend)
+                    if self._unmarked:
+                        # Retry recording delivered reminders without resending them
+                        timeout = min(timeout, self.retry_delay)
+                        await self.record_sent([])
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    self.wakeups += 1
+                    continue
+                    
+                due, skipped = self._pop_due()
+                await self.fire(due, skipped)
+                
+            except Exception as e:
+                logger.error(f"Error in reminder scheduler: {e}")
+                await asyncio.sleep(self.retry_delay)
+                
+    def _pop_due(self) -> Tuple[List[Tuple[ScrimRecord, int]], List[Tuple[int, int]]]:
+        """Remove every reminder that is due now; returns (scrim, offset_minutes) to send and the
+        (scrim_id, offset_minutes) keys superseded by a shorter stage of the same scrim"""
+        now = datetime.datetime.now().timestamp()
+        latest = {}
+        skipped = []
+        while self._heap and self._heap[0][0] <= now:
+            due, scrim_id, offset_minutes = heapq.heappop(self._heap)
+            entry = self._pending.pop((scrim_id, offset_minutes), None)
+            if entry is None or entry[0] != due:
+                # Cancelled or rescheduled since this entry was pushed
+                if entry is not None:
+                    self._pending[(scrim_id, offset_minutes)] = entry
+                continue
+            # After downtime several stages of a scrim can be overdue; only the shortest is sent
+            current = latest.get(scrim_id)
+            if current is None or offset_minutes < current[1]:
+                if current is not None:
+                    skipped.append((scrim_id, current[1]))
+                latest[scrim_id] = (entry[1], offset_minutes)
+            else:
+                skipped.append((scrim_id, offset_minutes))
+        return list(latest.values()), skipped
+        
+    async def fire(self, deliveries: List[Tuple[ScrimRecord, int]], skipped=()):
+        """Send reminders concurrently, then record every delivered or skipped one in a single write"""
+        async with self._firing:
+            delivered = await asyncio.gather(*(self.deliver(scrim, offset) for scrim, offset in deliveries))
+            await self.record_sent([
+                *((scrim.id, offset) for (scrim, offset), sent in zip(deliveries, delivered) if sent),
+                *skipped
+            ])
+        
+    async def deliver(self, scrim: ScrimRecord, offset_minutes) -> bool:
+        """Send a single reminder stage; on failure schedule a retry for it alone and return False"""
+        async with self._sending:
+            try:
+                await send_scrim_reminder(scrim, offset_minutes)
+                logger.info(f"Sent {format_offset(offset_minutes)} reminder for scrim ID {scrim.id}")
+                return True
+            except Exception as e:
+                logger.error(f"Error sending {format_offset(offset_minutes)} reminder for scrim ID {scrim.id}: {e}")
+                
+        # Retry until the scrim starts
+        retry_at = datetime.datetime.now().timestamp() + self.retry_delay
+        if retry_at < scrim.start_time.timestamp():
+            self._push(scrim, offset_minutes, retry_at)
+        return False
+        
+    async def record_sent(self, deliveries):
+        """Mark delivered reminders as sent, keeping them to retry if the write fails"""
+        deliveries = self._unmarked.union(deliveries)
+        if not deliveries:
+            return
+        try:
+            await db_manager.mark_reminders_sent(sorted(deliveries))
+            self._unmarked.clear()
         except Exception as e:
-            logger.error(f"Error in reminder check loop: {e}")
-            await asyncio.sleep(60)  # Keep trying even if there's an error
+            logger.error(f"Error recording {len(deliveries)} sent reminders: {e}")
+            self._unmarked = deliveries
+
+# Initialize the reminder scheduler
+reminder_scheduler = ReminderScheduler()
 
-async def send_scrim_reminder(scrim: Dict[str, Any]):
-    """Send a reminder for a scrim."""
+async def send_scrim_reminder(scrim: ScrimRecord, offset_minutes: int):
+    """Send the reminder stage due `offset_minutes` before a scrim."""
     # Get the channel
-    channel_id = scrim["channel_id"]
-    channel = bot.get_channel(channel_id)
+    channel_id = scrim.channel_id
+    channel = await discord_cache.get_channel(channel_id)
     
     if not channel:
-        logger.error(f"Could not find channel with ID {channel_id} for reminder")
-        return
+        # Raise so the scheduler retries instead of marking the reminder sent
+        raise RuntimeError(f"Could not find channel with ID {channel_id} for reminder")
     
     # Get the role ID
-    role_id = scrim["role_id"]
+    role_id = scrim.role_id
     
     # Get the team (for color)
-    team = scrim["team"]
+    team = scrim.team
     color = TEAM_CONFIG.get(team, {}).get("color", discord.Color(0x3498DB))
     
     # Get the players
-    players = scrim["players"]
-    if isinstance(players, str):
-        players = players.split(',')
+    players = scrim.players
     
     # Create player pings if any are specified
     player_pings = "\n".join(players) if players else "Team members"
     
     # Convert the datetime to a Unix timestamp for Discord's timestamp format
-    unix_timestamp = int(scrim["start_time"].timestamp())
+    unix_timestamp = int(scrim.start_time.timestamp())
     
     # Create the reminder message
     reminder_message = (
         f"🔔 **REMINDER** 🔔\n"
         f"<@&{role_id}>\n\n"
-        f"Your scrim against **{scrim['opponent']}** starts in 30 minutes at <t:{unix_timestamp}:t>!\n\n"
+        f"Your scrim against **{scrim.opponent}** starts in {format_offset(offset_minutes)} at <t:{unix_timestamp}:t>!\n\n"
         f"**Players:**\n{player_pings}\n\n"
         f"Please be ready and in voice channels."
     )
@@ -1317,57 +3865,114 @@ async def send_scrim_reminder(scrim: Dict[str, Any]):
     )
     
     # Send the reminder
-    await channel.send(content=f"<@&{role_id}> **30-MINUTE SCRIM REMINDER**", embed=embed)
+    # Reminders for the same channel due at the same moment can share one message
+    count, unit = split_offset(offset_minutes)
+    await bot.outbound.send(
+        channel,
+        coalesce=True,
+        content=f"<@&{role_id}> **{count}-{unit.upper()} SCRIM REMINDER**",
+        embed=embed
+    )
+
+# --- Command Tree Sync ---
+def command_tree_hash() -> str:
+    """Get a stable hash of the global application commands as Discord would receive them."""
+    payload = sorted(
+        (command.to_dict() for command in bot.tree.get_commands()),
+        key=lambda command: (command.get("type", 1), command["name"])
+    )
+    # Commands are registered per application, so a different bot token must sync again
+    digest = hashlib.sha256(str(bot.application_id).encode())
+    digest.update(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode())
+    return digest.hexdigest()
+
+async def sync_command_tree(force: bool = False) -> bool:
+    """Sync slash commands with Discord if they changed since the last sync; returns whether it synced."""
+    tree_hash = command_tree_hash()
+    if not force:
+        try:
+            if await db_manager.get_state(COMMAND_TREE_HASH_KEY) == tree_hash:
+                return False
+        except Exception as e:
+            logger.error(f"Error reading synced command tree hash: {e}")
+
+    synced = await bot.tree.sync()
+    logger.info(f"Synced {len(synced)} slash commands with Discord")
+    try:
+        await db_manager.set_state(COMMAND_TREE_HASH_KEY, tree_hash)
+    except Exception as e:
+        logger.error(f"Error saving synced command tree hash: {e}")
+    return True
 
 # --- Bot Setup and Events ---
 @bot.event
-async def on_ready():
-    """Handle bot startup."""
-    global reminder_loop_started
+async def on_connect():
+    """Record when the gateway connection was opened, for the startup timing report."""
+    global connected_at
+    connected_at = time.monotonic()
 
+@bot.event
+async def on_ready():
+    """Handle readiness; runs again after every reconnect, so one-time setup lives in setup_hook."""
     try:
-        # Initialize database and calendar
-        await db_manager.initialize()
-        await calendar_manager.initialize()
+        # Optional: send button message in interface channel on startup (only do this once or wrap with a flag)
+        # await post_anon_button(bot, 1399853992959283372)  # Replace with your interface channel ID
 
-        # Only start the reminder loop if it hasn't already started        
-        if not reminder_loop_started:
-            bot.loop.create_task(reminder_check_loop())
-            reminder_loop_started = True
+        # The gateway cache is rebuilt on a new session, so re-cache channels and roles from it
+        discord_cache.clear()
+        await discord_cache.warm(
+            [config["channel_id"] for config in TEAM_CONFIG.values()] + [ABSENCE_MANAGEMENT_CHANNEL_ID],
+            [config["role_id"] for config in TEAM_CONFIG.values()] + [MANAGEMENT_ROLE_ID]
+        )
 
-        # Register persistent views
-        bot.add_view(PersistentScrimButton())
-        bot.add_view(PersistentAbsenceView())
+        logger.info(f"Bot ready! Logged in as {bot.user}")
+        if connected_at is not None:
+            logger.info(f"Startup took {time.monotonic() - connected_at:.2f}s from connect to ready")
 
-        # ✅ Add the persistent anonymous report button
-        from anon_report import AnonymousReportButton, post_anon_button
-        bot.add_view(AnonymousReportButton())
+    except Exception as e:
+        logger.error(f"Error during startup: {e}")
 
-        # Optional: send button message in interface channel on startup (only do this once or wrap with a flag)
-        # await post_anon_button(bot, 1399853992959283372)  # Replace with your interface channel ID
+@bot.event
+async def on_guild_channel_delete(channel):
+    """Forget a deleted channel."""
+    discord_cache.invalidate_channel(channel.id)
 
-        # Pre-cache channels and roles
-        for team_name, config in TEAM_CONFIG.items():
-            channel_id = config.get("channel_id")
-            role_id = config.get("role_id")
+@bot.event
+async def on_guild_channel_update(before, after):
+    """Keep the cached channel current."""
+    discord_cache.invalidate_channel(after.id, after)
 
-            channel = bot.get_channel(channel_id)
-            if channel:
-                channel_cache[channel_id] = channel
+@bot.event
+async def on_guild_role_delete(role):
+    """Forget a deleted role."""
+    discord_cache.invalidate_role(role.id)
+    permissions.invalidate_guild(role.guild.id)
 
-            for guild in bot.guilds:
-                role = guild.get_role(role_id)
-                if role:
-                    role_cache[role_id] = role
-                    break
+@bot.event
+async def on_guild_role_update(before, after):
+    """Keep the cached role current."""
+    discord_cache.invalidate_role(after.id, after)
+    if before.permissions != after.permissions:
+        permissions.invalidate_guild(after.guild.id)
 
-        # Sync slash commands
-        await bot.tree.sync()
+@bot.event
+async def on_member_update(before, after):
+    """Forget a fetched member whose roles may have changed."""
+    discord_cache.invalidate_member(after.guild.id, after.id)
+    if before.roles != after.roles:
+        permissions.invalidate_member(after.guild.id, after.id)
 
-        logger.info(f"Bot ready! Logged in as {bot.user}")
+@bot.event
+async def on_member_remove(member):
+    """Forget a fetched member who left."""
+    discord_cache.invalidate_member(member.guild.id, member.id)
+    permissions.invalidate_member(member.guild.id, member.id)
 
-    except Exception as e:
-        logger.error(f"Error during startup: {e}")
+@bot.event
+async def on_guild_remove(guild):
+    """Forget channels and roles of a guild the bot is no longer in."""
+    discord_cache.invalidate_guild(guild.id)
+    permissions.invalidate_guild(guild.id)
 
 @bot.event
 async def on_error(event, *args, **kwargs):
@@ -1378,22 +3983,15 @@ async def on_error(event, *args, **kwargs):
 @commands.is_owner()
 async def forcesync(ctx):
     """Force sync slash commands with Discord."""
-    await bot.tree.sync()
+    await sync_command_tree(force=True)
     await ctx.send("✅ Slash commands have been synced!")
 
-# --- Shutdown Handling ---
-@bot.event
-async def on_close():
-    """Handle bot shutdown."""
-    # Close database connection
-    await db_manager.close()
-    logger.info("Bot shutting down, resources cleaned up")
-
 # --- Run Bot ---
 def main():
     """Main entry point for the bot."""
     try:
-        bot.run(os.getenv("DISCORD_TOKEN"))
+        # discord.py logs through the root logger's queue instead of its own blocking handler
+        bot.run(os.getenv("DISCORD_TOKEN"), log_handler=None)
     except Exception as e:
         logger.critical(f"Failed to start bot: {e}")
         
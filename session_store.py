@@ -0,0 +1,273 @@
+import asyncio
+import datetime
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("affinity_bot")
+
+
+def _encode(value: Any) -> Any:
+    """JSON hook for the non-JSON types workflows keep in their sessions."""
+    if isinstance(value, datetime.datetime):
+        return {"__datetime__": value.timestamp()}
+    raise TypeError(f"Cannot persist session value of type {type(value).__name__}")
+
+
+def _decode(value: Dict[str, Any]) -> Any:
+    """JSON hook reversing _encode."""
+    if "__datetime__" in value:
+        return datetime.datetime.fromtimestamp(value["__datetime__"])
+    return value
+
+
+def dump_session(data: Dict[str, Any]) -> str:
+    """Serialize session data for persistence."""
+    return json.dumps(data, default=_encode)
+
+
+def load_session(text: str) -> Dict[str, Any]:
+    """Deserialize persisted session data."""
+    return json.loads(text, object_hook=_decode)
+
+
+class _Session:
+    """A single user's workflow state and when it expires."""
+
+    __slots__ = ("data", "expires_at")
+
+    def __init__(self, data: Dict[str, Any], expires_at: float):
+        self.data = data
+        self.expires_at = expires_at
+
+
+class SessionStore:
+    """Per-user workflow sessions with a sliding TTL, an LRU size cap and eviction metrics.
+
+    Every workflow (scrim scheduling, absence submission) keeps its state here instead of
+    in a bare dict. Sessions expire after `ttl` seconds without activity, the least recently
+    used session is evicted once `max_size` is reached, and a background sweeper removes
+    expired sessions that are never touched again.
+
+    With a backend, sessions also survive restarts. Changes are written behind: they are
+    collected in memory and saved in one batch every `flush_interval` seconds, so handlers
+    never wait on disk. A session that is not in memory is loaded back by `restore`.
+    The backend provides:
+
+        async save_sessions(upserts: [(user_id, data_json, expires_at)], deletes: [user_id])
+        async load_session(user_id) -> (data_json, expires_at) or None
+        async delete_expired_sessions(now)
+
+    where expires_at is a wall-clock timestamp.
+    """
+
+    def __init__(self, ttl: float = 900, max_size: int = 5000, sweep_interval: float = 60,
+                 backend=None, flush_interval: float = 1.0):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.sweep_interval = sweep_interval
+        self.backend = backend
+        self.flush_interval = flush_interval
+        # Least recently used first
+        self._sessions: "OrderedDict[int, _Session]" = OrderedDict()
+        # Sessions changed since the last flush; None means delete the persisted copy
+        self._dirty: Dict[int, Optional[_Session]] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.metrics = {
+            "started": 0,
+            "hits": 0,
+            "misses": 0,
+            "restored": 0,
+            "ended": 0,
+            "evicted_ttl": 0,
+            "evicted_lru": 0,
+            "flushes": 0,
+            "flush_errors": 0,
+        }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, user_id: int) -> bool:
+        return self.get(user_id, touch=False) is not None
+
+    def _insert(self, user_id: int, session: _Session):
+        """Add a session as most recently used, evicting the least recently used if full."""
+        self._sessions.pop(user_id, None)
+        while len(self._sessions) >= self.max_size:
+            # A persisted session evicted here can still be restored later
+            evicted_id, _ = self._sessions.popitem(last=False)
+            self.metrics["evicted_lru"] += 1
+            logger.info(f"Session for user {evicted_id} evicted (store full)")
+        self._sessions[user_id] = session
+
+    def begin(self, user_id: int, workflow: str) -> Dict[str, Any]:
+        """Start a new session for a user, replacing any existing one, and return its data."""
+        data = {"workflow": workflow}
+        session = _Session(data, time.monotonic() + self.ttl)
+        self._insert(user_id, session)
+        self._dirty[user_id] = session
+        self.metrics["started"] += 1
+        return data
+
+    def get(self, user_id: int, touch: bool = True) -> Optional[Dict[str, Any]]:
+        """Get a user's session data, or None if there is none in memory or it has expired.
+
+        Touching a session extends it and, since the caller is about to change it,
+        queues it for the next flush.
+        """
+        session = self._sessions.get(user_id)
+        now = time.monotonic()
+
+        if session is not None and session.expires_at <= now:
+            del self._sessions[user_id]
+            self.metrics["evicted_ttl"] += 1
+            session = None
+
+        if session is None:
+            self.metrics["misses"] += 1
+            return None
+
+        if touch:
+            # Activity extends the session and marks it most recently used
+            session.expires_at = now + self.ttl
+            self._sessions.move_to_end(user_id)
+            self._dirty[user_id] = session
+        self.metrics["hits"] += 1
+        return session.data
+
+    async def restore(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get a user's session, loading it from the backend if it is not in memory."""
+        data = self.get(user_id)
+        if data is not None or self.backend is None:
+            return data
+
+        # A change still waiting to be flushed is newer than anything persisted
+        if user_id in self._dirty:
+            return None
+
+        try:
+            row = await self.backend.load_session(user_id)
+        except Exception as e:
+            logger.error(f"Error restoring session for user {user_id}: {e}")
+            return None
+        if row is None:
+            return None
+
+        text, expires_at = row
+        if expires_at <= time.time():
+            return None
+
+        # Another interaction may have started a session while we were loading
+        if user_id in self._sessions:
+            return self.get(user_id)
+
+        # Restoring counts as activity, so the session gets a full TTL like any other touch.
+        # That also keeps the store in order of expiry, which sweep() relies on.
+        data = load_session(text)
+        self._insert(user_id, _Session(data, time.monotonic() + self.ttl))
+        self._dirty[user_id] = self._sessions[user_id]
+        self.metrics["restored"] += 1
+        logger.info(f"Restored {data.get('workflow')} session for user {user_id}")
+        return data
+
+    def end(self, user_id: int) -> bool:
+        """End a user's session; returns whether one existed."""
+        existed = self._sessions.pop(user_id, None) is not None
+        if self.backend is not None:
+            self._dirty[user_id] = None
+        if existed:
+            self.metrics["ended"] += 1
+        return existed
+
+    def sweep(self) -> int:
+        """Remove every expired session from memory and return how many were removed."""
+        # Sessions are kept in order of last activity and share one TTL, so they are
+        # also in order of expiry and the expired ones are all at the front
+        now = time.monotonic()
+        removed = 0
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.expires_at > now:
+                break
+            self._sessions.popitem(last=False)
+            removed += 1
+        self.metrics["evicted_ttl"] += removed
+        return removed
+
+    async def flush(self):
+        """Write every pending session change to the backend in one batch."""
+        if self.backend is None or not self._dirty:
+            return
+
+        dirty, self._dirty = self._dirty, {}
+        now_wall, now_monotonic = time.time(), time.monotonic()
+        upserts: List[Tuple[int, str, float]] = []
+        deletes: List[int] = []
+        for user_id, session in dirty.items():
+            if session is None:
+                deletes.append(user_id)
+                continue
+            try:
+                text = dump_session(session.data)
+            except (TypeError, ValueError) as e:
+                logger.error(f"Not persisting session for user {user_id}: {e}")
+                continue
+            upserts.append((user_id, text, now_wall + (session.expires_at - now_monotonic)))
+
+        try:
+            await self.backend.save_sessions(upserts, deletes)
+            self.metrics["flushes"] += 1
+        except Exception as e:
+            self.metrics["flush_errors"] += 1
+            logger.error(f"Error persisting {len(dirty)} sessions: {e}")
+            # Retry on the next flush unless a newer change has been queued since
+            for user_id, session in dirty.items():
+                self._dirty.setdefault(user_id, session)
+
+    def stats(self) -> Dict[str, int]:
+        """Get the eviction and usage counters together with the current size."""
+        return {"size": len(self._sessions), "pending_writes": len(self._dirty), **self.metrics}
+
+    def start(self):
+        """Start the background sweeper and, with a backend, the write-behind flusher."""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+        if self.backend is not None and (self._flusher is None or self._flusher.done()):
+            self._flusher = asyncio.create_task(self._flush_loop())
+        return self._sweeper
+
+    def stop(self):
+        """Stop the background tasks."""
+        for task in (self._sweeper, self._flusher):
+            if task:
+                task.cancel()
+        self._sweeper = None
+        self._flusher = None
+
+    async def close(self):
+        """Stop the background tasks and persist any pending changes."""
+        self.stop()
+        await self.flush()
+
+    async def _sweep_loop(self):
+        """Periodically remove expired sessions."""
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                removed = self.sweep()
+                if removed:
+                    logger.info(f"Swept {removed} expired sessions ({len(self._sessions)} active)")
+                if self.backend is not None:
+                    await self.backend.delete_expired_sessions(time.time())
+            except Exception as e:
+                logger.error(f"Error sweeping sessions: {e}")
+
+    async def _flush_loop(self):
+        """Periodically persist changed sessions."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The bot's modules live at the repository root rather than in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Importing scrim_bot must not start the metrics server
+os.environ.setdefault("METRICS_PORT", "0")
@@ -0,0 +1,85 @@
+import asyncio
+import types
+
+import discord
+import pytest
+
+from anon_report import REPORT_CHANNEL_ID, ReportModal
+
+
+class FakeDispatcher:
+    def __init__(self, error=None):
+        self.error = error
+        self.sent = []
+
+    async def send(self, channel, **kwargs):
+        if self.error is not None:
+            raise self.error
+        self.sent.append((channel, kwargs))
+
+
+class FakeResponse:
+    def __init__(self):
+        self.deferred = False
+        self.messages = []
+
+    async def defer(self, **kwargs):
+        self.deferred = True
+
+    async def send_message(self, content=None, **kwargs):
+        self.messages.append(content)
+
+
+class FakeFollowup:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        self.messages.append(content)
+
+
+def submit(dispatcher, channel=object()):
+    channels = {REPORT_CHANNEL_ID: channel} if channel is not None else {}
+    interaction = types.SimpleNamespace(
+        client=types.SimpleNamespace(get_channel=channels.get, outbound=dispatcher),
+        response=FakeResponse(),
+        followup=FakeFollowup(),
+    )
+
+    async def scenario():
+        modal = ReportModal()
+        modal.report._value = "Something happened"
+        await modal.on_submit(interaction)
+
+    asyncio.run(scenario())
+    return interaction
+
+
+def test_report_is_sent_through_the_dispatcher():
+    dispatcher = FakeDispatcher()
+    interaction = submit(dispatcher)
+
+    assert interaction.response.deferred
+    assert dispatcher.sent[0][1]["embed"].description == "Something happened"
+    assert interaction.followup.messages == ["✅ Your report has been sent anonymously."]
+
+
+@pytest.mark.parametrize("error", [
+    discord.RateLimited(60.0),
+    discord.DiscordServerError(types.SimpleNamespace(status=503, reason="Service Unavailable"), "unavailable"),
+])
+def test_failed_delivery_is_reported_after_deferring(error):
+    interaction = submit(FakeDispatcher(error))
+
+    assert interaction.response.deferred
+    assert len(interaction.followup.messages) == 1
+    assert interaction.followup.messages[0].startswith("❌ Your report couldn't be delivered")
+
+
+def test_missing_channel_is_reported_without_deferring():
+    dispatcher = FakeDispatcher()
+    interaction = submit(dispatcher, channel=None)
+
+    assert not interaction.response.deferred
+    assert interaction.response.messages[0].startswith("❌ Reports can't be delivered")
+    assert dispatcher.sent == []
@@ -0,0 +1,172 @@
+import asyncio
+import email.parser
+import http.server
+import json
+import pathlib
+import re
+import threading
+
+import googleapiclient.discovery
+import pytest
+from google.oauth2.credentials import Credentials
+from googleapiclient.errors import HttpError
+
+import scrim_bot
+from scrim_bot import CalendarManager
+
+
+class BatchHandler(http.server.BaseHTTPRequestHandler):
+    """Answers Calendar batch requests the way the batch endpoint does.
+
+    Events whose summary is in server.failures get a 400, those in server.dropped no part at all.
+    """
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        message = email.parser.BytesParser().parsebytes(
+            b"Content-Type: " + self.headers["Content-Type"].encode() + b"\r\n\r\n" + body
+        )
+        self.server.batches.append(
+            (self.path, self.headers["Authorization"], len(message.get_payload()))
+        )
+
+        boundary = "response_boundary"
+        parts = []
+        for part in message.get_payload():
+            # Each part is an HTTP request of its own: headers, a blank line, then the event
+            summary = json.loads(re.split(r"\r?\n\r?\n", part.get_payload(), 1)[1])["summary"]
+            if summary in self.server.dropped:
+                continue
+            if summary in self.server.failures:
+                status, content = "400 Bad Request", {"error": {"code": 400, "message": "Invalid end time"}}
+            else:
+                status, content = "200 OK", {"id": summary, "htmlLink": f"https://calendar.example/{summary}"}
+            parts.append(
+                f"--{boundary}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{part['Content-ID'][1:]}\r\n\r\n"
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{json.dumps(content)}\r\n"
+            )
+        payload = ("".join(parts) + f"--{boundary}--\r\n").encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", f"multipart/mixed; boundary={boundary}")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def calendar_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), BatchHandler)
+    server.batches = []
+    server.failures = set()
+    server.dropped = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def calendar(calendar_server, monkeypatch):
+    """A CalendarManager whose service sends its requests to the local stand-in."""
+    document = json.loads(
+        (pathlib.Path(googleapiclient.discovery.__file__).parent / "discovery_cache" / "documents"
+         / "calendar.v3.json").read_text()
+    )
+    document["rootUrl"] = f"http://127.0.0.1:{calendar_server.server_port}/"
+
+    def build(service_name, version, credentials=None, **kwargs):
+        return googleapiclient.discovery.build_from_document(document, credentials=credentials)
+    monkeypatch.setattr(googleapiclient.discovery, "build", build)
+
+    manager = CalendarManager(max_workers=2)
+    manager.calendar_id = "team@example.com"
+    manager.credentials = Credentials(token="test-token")
+    yield manager
+    manager.close()
+
+
+def event(summary):
+    return {"summary": summary, "start": {"date": "2026-11-02"}, "end": {"date": "2026-11-07"}}
+
+
+def test_batch_returns_a_link_or_error_per_event(calendar, calendar_server):
+    calendar_server.failures.add("bad")
+
+    results = asyncio.run(calendar.insert_events([event("first"), event("bad"), event("third")]))
+
+    assert results[0] == "https://calendar.example/first"
+    assert isinstance(results[1], HttpError) and results[1].status_code == 400
+    assert results[2] == "https://calendar.example/third"
+    # One HTTP request for the three events, sent with the worker's authorized client
+    assert calendar_server.batches == [("/batch/calendar/v3", "Bearer test-token", 3)]
+
+
+def test_events_beyond_the_batch_limit_go_in_further_requests(calendar, calendar_server, monkeypatch):
+    monkeypatch.setattr(scrim_bot, "CALENDAR_BATCH_LIMIT", 2)
+
+    results = asyncio.run(calendar.insert_events([event(f"event{i}") for i in range(5)]))
+
+    assert results == [f"https://calendar.example/event{i}" for i in range(5)]
+    assert [size for _, _, size in calendar_server.batches] == [2, 2, 1]
+
+
+def test_unanswered_batch_fails_every_event_in_it(calendar, calendar_server):
+    calendar_server.dropped.add("lost")
+
+    results = asyncio.run(calendar.insert_events([event("first"), event("lost")]))
+
+    assert len(results) == 2
+    assert all(isinstance(result, Exception) for result in results)
+
+
+class FakeBatch:
+    """A batch that only answers some of its requests."""
+
+    def __init__(self, callback, answered):
+        self.callback = callback
+        self.answered = answered
+        self.request_ids = []
+
+    def add(self, request, request_id):
+        self.request_ids.append(request_id)
+
+    def execute(self, http=None):
+        for request_id in self.request_ids:
+            if request_id in self.answered:
+                self.callback(request_id, {"htmlLink": f"https://calendar.example/{request_id}"}, None)
+
+
+class FakeService:
+    def __init__(self, answered):
+        self.answered = answered
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(callback, self.answered)
+
+    def events(self):
+        return self
+
+    def insert(self, calendarId, body):
+        return body
+
+
+def test_event_without_a_response_is_reported_as_failed(monkeypatch):
+    calendar = CalendarManager()
+    monkeypatch.setattr(calendar, "_thread_http", lambda: None)
+
+    results = calendar._execute_batch(FakeService(answered={"0", "2"}), [event("a"), event("b"), event("c")])
+
+    assert results[0] == "https://calendar.example/0"
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == "https://calendar.example/2"
@@ -0,0 +1,188 @@
+import asyncio
+import datetime
+
+import pytest
+
+import scrim_bot
+from scrim_bot import CALENDAR_OUTBOX_HOLD, CalendarOutboxWorker, DatabaseManager
+
+EVENT = {"summary": "Vacation - player", "start": {"date": "2026-11-02"}, "end": {"date": "2026-11-07"}}
+
+
+class FakeCalendar:
+    """Stands in for CalendarManager.insert_events; fails the first `failures` calls."""
+
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.calls = []
+        self.called = asyncio.Event()
+
+    async def insert_events(self, events):
+        self.calls.append(events)
+        self.called.set()
+        if len(self.calls) <= self.failures:
+            return [RuntimeError("backend error")] * len(events)
+        return [f"https://calendar.example/event/{len(self.calls)}/{i}" for i in range(len(events))]
+
+
+class FakeBot:
+    async def wait_until_ready(self):
+        pass
+
+    def is_closed(self):
+        return False
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+    """Patch the worker's collaborators and return a runner for scenarios using them."""
+    monkeypatch.setattr(scrim_bot, "bot", FakeBot())
+
+    def run(scenario, calendar):
+        monkeypatch.setattr(scrim_bot, "calendar_manager", calendar)
+
+        async def main():
+            db = DatabaseManager(str(tmp_path / "bot_data.db"))
+            await db.initialize()
+            monkeypatch.setattr(scrim_bot, "db_manager", db)
+            try:
+                return await asyncio.wait_for(scenario(db), 10)
+            finally:
+                await db.close()
+        return asyncio.run(main())
+    return run
+
+
+def add_absence(db):
+    return db.add_absence(1, "player", "Vacation", "2026-11-02", "2026-11-06", "Affinity EMEA", "Travel",
+                          calendar_event=EVENT)
+
+
+async def outbox_row(db, absence_id):
+    rows = await db._read(
+        'SELECT status, attempts, next_attempt_at, last_error, notification_message_id '
+        'FROM calendar_outbox WHERE absence_id = ?', (absence_id,)
+    )
+    return rows[0]
+
+
+async def calendar_link(db, absence_id):
+    return (await db._read('SELECT calendar_link FROM absences WHERE id = ?', (absence_id,)))[0][0]
+
+
+def test_failed_event_is_retried_until_created(outbox):
+    calendar = FakeCalendar(failures=2)
+
+    async def scenario(db):
+        worker = CalendarOutboxWorker(base_delay=0.05, max_delay=0.1, idle_sleep=0.05)
+        updated = []
+
+        async def update_notification(channel_id, message_id, link):
+            updated.append((channel_id, message_id, link))
+        worker.update_notification = update_notification
+
+        absence_id = await add_absence(db)
+        await db.release_outbox_event(absence_id, 5, 6)
+        worker.start()
+        try:
+            while await calendar_link(db, absence_id) is None:
+                await asyncio.sleep(0.01)
+        finally:
+            await worker.stop()
+        return absence_id, updated, await outbox_row(db, absence_id), await calendar_link(db, absence_id)
+
+    absence_id, updated, row, link = outbox(scenario, calendar)
+
+    assert calendar.calls == [[EVENT]] * 3
+    assert link == "https://calendar.example/event/3/0"
+    assert row[:2] == ("done", 2)
+    assert row[3] is None
+    assert updated == [(5, 6, link)]
+
+
+def test_held_entry_waits_for_release(outbox):
+    calendar = FakeCalendar()
+
+    async def scenario(db):
+        worker = CalendarOutboxWorker(idle_sleep=0.05)
+        worker.update_notification = lambda *args: asyncio.sleep(0)
+        absence_id = await add_absence(db)
+        held_until = (await outbox_row(db, absence_id))[2]
+
+        worker.start()
+        try:
+            # Several passes of the worker go by without the entry being picked up
+            await asyncio.sleep(0.2)
+            assert calendar.calls == []
+
+            await db.release_outbox_event(absence_id, 5, 6)
+            worker.notify()
+            await calendar.called.wait()
+            while await calendar_link(db, absence_id) is None:
+                await asyncio.sleep(0.01)
+        finally:
+            await worker.stop()
+        return held_until, await outbox_row(db, absence_id)
+
+    held_until, row = outbox(scenario, calendar)
+
+    assert held_until >= datetime.datetime.now().timestamp() + CALENDAR_OUTBOX_HOLD - 10
+    assert row[0] == "done"
+    assert row[4] == 6
+
+
+def test_release_does_not_touch_entries_already_attempted(outbox):
+    async def scenario(db):
+        absence_id = await add_absence(db)
+        entry_id = (await db._read('SELECT id FROM calendar_outbox WHERE absence_id = ?', (absence_id,)))[0][0]
+        retry_at = datetime.datetime.now().timestamp() + 600
+        await db.retry_outbox_event(entry_id, 1, retry_at, "backend error")
+        await db.release_outbox_event(absence_id, 5, 6)
+        return retry_at, await outbox_row(db, absence_id)
+
+    retry_at, row = outbox(scenario, FakeCalendar())
+
+    assert row[:3] == ("pending", 1, retry_at)
+    assert row[4] is None
+
+
+def test_backoff_grows_exponentially_and_gives_up(outbox, monkeypatch):
+    # The jitter's upper end, so delays are exact
+    monkeypatch.setattr(scrim_bot.random, "uniform", lambda low, high: high)
+
+    async def scenario(db):
+        worker = CalendarOutboxWorker(max_attempts=5, base_delay=30, max_delay=100)
+        absence_id = await add_absence(db)
+        entry = (await db.get_due_outbox_events(float("inf")))[0]
+        delays = []
+        for attempts in range(4):
+            entry["attempts"] = attempts
+            before = datetime.datetime.now().timestamp()
+            await worker.handle_result(entry, RuntimeError(f"attempt {attempts + 1}"))
+            status, recorded, next_attempt_at, error, _ = await outbox_row(db, absence_id)
+            assert (status, recorded, error) == ("pending", attempts + 1, f"attempt {attempts + 1}")
+            delays.append(round(next_attempt_at - before))
+
+        entry["attempts"] = 4
+        await worker.handle_result(entry, RuntimeError("attempt 5"))
+        return delays, await outbox_row(db, absence_id)
+
+    delays, row = outbox(scenario, FakeCalendar())
+
+    assert delays == [30, 60, 100, 100]
+    assert row[:2] == ("failed", 5)
+
+
+def test_backoff_is_jittered_below_the_full_delay(outbox):
+    async def scenario(db):
+        worker = CalendarOutboxWorker(base_delay=100, max_delay=1000)
+        absence_id = await add_absence(db)
+        entry = (await db.get_due_outbox_events(float("inf")))[0]
+        entry["attempts"] = 1
+        before = datetime.datetime.now().timestamp()
+        await worker.handle_result(entry, RuntimeError("backend error"))
+        return (await outbox_row(db, absence_id))[2] - before
+
+    delay = outbox(scenario, FakeCalendar())
+
+    assert 100 <= delay <= 200 + 1
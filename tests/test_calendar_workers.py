@@ -0,0 +1,68 @@
+import asyncio
+import threading
+
+from google.oauth2.credentials import Credentials
+
+from scrim_bot import CalendarManager
+
+
+def test_calls_beyond_the_limit_wait_their_turn():
+    calendar = CalendarManager(max_workers=2, max_queued=3)
+    release = threading.Event()
+    lock = threading.Lock()
+    running = {"now": 0, "peak": 0}
+
+    def call(index):
+        with lock:
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        release.wait(5)
+        with lock:
+            running["now"] -= 1
+        return index
+
+    async def scenario():
+        calls = [asyncio.create_task(calendar._run(lambda index=index: call(index))) for index in range(10)]
+        await asyncio.sleep(0.2)
+
+        # Two calls on the workers, three queued behind them, the other five not yet submitted
+        assert running["now"] == 2
+        assert calendar._executor._work_queue.qsize() == 3
+        assert not any(task.done() for task in calls)
+
+        release.set()
+        return await asyncio.wait_for(asyncio.gather(*calls), 5)
+
+    try:
+        assert asyncio.run(scenario()) == list(range(10))
+    finally:
+        calendar.close()
+
+    assert running["peak"] == 2
+
+
+def test_each_worker_thread_keeps_its_own_http_client():
+    calendar = CalendarManager(max_workers=2)
+    calendar.credentials = Credentials(token="test-token")
+    barrier = threading.Barrier(2, timeout=5)
+
+    def call():
+        first = calendar._thread_http()
+        # Both workers hold their client at the same time
+        barrier.wait()
+        assert calendar._thread_http() is first
+        return threading.current_thread().name, first
+
+    async def scenario():
+        return await asyncio.gather(*(calendar._run(call) for _ in range(4)))
+
+    try:
+        results = asyncio.run(scenario())
+    finally:
+        calendar.close()
+
+    clients = dict(results)
+    assert len(clients) == 2
+    assert len({id(http) for http in clients.values()}) == 2
+    # A thread reuses its client on later calls
+    assert all(clients[name] is http for name, http in results)
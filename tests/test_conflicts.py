@@ -0,0 +1,128 @@
+import asyncio
+import datetime
+import types
+
+import pytest
+
+import scrim_bot
+from scrim_bot import MAX_CONFLICTS_SHOWN, DatabaseManager, find_scrim_conflicts
+
+TEAM = "Affinity EMEA"
+EVENING = datetime.datetime(2026, 11, 7, 20, 0)
+
+
+@pytest.fixture
+def run_db(tmp_path, monkeypatch):
+    """Run a scenario with a migrated database installed as the bot's."""
+    def run(scenario):
+        async def main():
+            db = DatabaseManager(str(tmp_path / "bot_data.db"))
+            await db.initialize()
+            monkeypatch.setattr(scrim_bot, "db_manager", db)
+            try:
+                return await scenario(db)
+            finally:
+                await db.close()
+        return asyncio.run(main())
+    return run
+
+
+def add_scrim(db, start_time, format_type, team=TEAM, opponent="Rivals"):
+    return db.add_scrim(team, opponent, start_time, format_type, ["Ascent"], "EU", ["<@1>"], "Diamond", 10, 20)
+
+
+def add_absence(db, user_id, user_name, start_date, end_date, team=TEAM):
+    return db.add_absence(user_id, user_name, "Vacation", start_date, end_date, team, "Travel")
+
+
+@pytest.mark.parametrize("start, clashes", [
+    # Best of 3 from 20:00 is estimated to run until 23:00
+    (EVENING + datetime.timedelta(hours=2, minutes=59), True),
+    (EVENING + datetime.timedelta(hours=3), False),
+    # A 2 game scrim at 18:30 would still be running at 20:00
+    (EVENING - datetime.timedelta(minutes=90), True),
+    (EVENING - datetime.timedelta(hours=2), False),
+])
+def test_overlap_uses_format_durations(run_db, start, clashes):
+    async def scenario(db):
+        await add_scrim(db, EVENING, "Best of 3")
+        # Other teams' scrims never clash
+        await add_scrim(db, start, "Best of 5", team="Affinity NA", opponent="Elsewhere")
+        return await find_scrim_conflicts(TEAM, start, "2 Games", [])
+
+    conflicts = run_db(scenario)
+
+    if clashes:
+        assert conflicts == [
+            f"{TEAM} already has a scrim against **Rivals** at <t:{int(EVENING.timestamp())}:F> (Best of 3)"
+        ]
+    else:
+        assert conflicts == []
+
+
+def test_absent_players_are_matched_by_mention_or_name(run_db):
+    async def scenario(db):
+        await add_absence(db, 7, "mentioned", "2026-11-06", "2026-11-08")
+        await add_absence(db, 8, "Anna", "2026-11-07", "2026-11-07")
+        # Back the day before, listed for another team, or not listed
+        await add_absence(db, 9, "early", "2026-11-01", "2026-11-06")
+        await add_absence(db, 10, "bo", "2026-11-07", "2026-11-07", team="Affinity NA")
+        await add_absence(db, 11, "unlisted", "2026-11-07", "2026-11-07")
+        return await find_scrim_conflicts(TEAM, EVENING, "1 Game", ["<@7>", "@anna", "early", "bo"])
+
+    assert run_db(scenario) == [
+        "**mentioned** is absent (Vacation) from 06/11/2026 to 08/11/2026",
+        "**Anna** is absent (Vacation) from 07/11/2026 to 07/11/2026",
+    ]
+
+
+class FakeResponse:
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, content=None, **kwargs):
+        self.messages.append((content, kwargs))
+
+
+def preview(user_id=42):
+    data = {
+        "team": TEAM, "opponent": "Newcomers", "opponent_rank": "Diamond", "start_time": EVENING,
+        "format": "1 Game", "maps": ["Ascent"], "server": "Frankfurt", "players": ["<@1>"],
+    }
+    interaction = types.SimpleNamespace(response=FakeResponse())
+    return interaction, scrim_bot.send_scrim_preview(interaction, user_id, data)
+
+
+def test_preview_lists_a_capped_number_of_conflicts(run_db):
+    async def scenario(db):
+        for minutes in range(0, 60, 5):
+            await add_scrim(db, EVENING + datetime.timedelta(minutes=minutes), "1 Game")
+        interaction, sending = preview()
+        await sending
+        return interaction.response.messages
+
+    [(content, kwargs)] = run_db(scenario)
+
+    lines = content.splitlines()
+    assert lines[0] == "⚠️ **Possible scheduling conflicts:**"
+    assert len(lines[1:-2]) == MAX_CONFLICTS_SHOWN + 1
+    assert lines[-3] == f"- ...and {12 - MAX_CONFLICTS_SHOWN} more"
+    assert lines[-1] == "Here's a preview of your scrim announcement:"
+    assert len(content) < 2000
+    assert kwargs["ephemeral"] and kwargs["view"].user_id == 42
+
+
+def test_preview_is_sent_when_the_check_fails(run_db, monkeypatch):
+    async def failing(*args):
+        raise RuntimeError("database is locked")
+
+    async def scenario(db):
+        monkeypatch.setattr(db, "get_team_scrims_between", failing)
+        interaction, sending = preview()
+        await sending
+        return interaction.response.messages
+
+    [(content, kwargs)] = run_db(scenario)
+
+    assert content == "Here's a preview of your scrim announcement:"
+    assert kwargs["embed"].title == f"🛡️ {TEAM} Scrim Scheduled"
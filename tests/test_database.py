@@ -0,0 +1,198 @@
+import asyncio
+import datetime
+
+from scrim_bot import DatabaseManager
+
+STAGES = 'SELECT team, offset_minutes FROM reminder_stages ORDER BY offset_minutes'
+
+
+async def start_held_write(db):
+    """Start a write that inserts a stage and keeps its transaction open until released."""
+    inserted = asyncio.Event()
+    release = asyncio.Event()
+
+    async def operation(connection):
+        await connection.execute(
+            'INSERT INTO reminder_stages (team, offset_minutes) VALUES (?, ?)', ("Affinity EMEA", 120)
+        )
+        inserted.set()
+        await release.wait()
+
+    write = asyncio.create_task(db._write_operation(operation))
+    await asyncio.wait_for(inserted.wait(), 5)
+    return write, release
+
+
+def test_reads_see_committed_data_during_an_open_write(tmp_path):
+    async def scenario():
+        db = DatabaseManager(str(tmp_path / "bot_data.db"), reader_pool_size=2)
+        await db.initialize()
+        try:
+            write, release = await start_held_write(db)
+
+            # More reads than readers, all finishing while the write is still open
+            during = await asyncio.wait_for(asyncio.gather(*(db._read(STAGES) for _ in range(6))), 5)
+            assert not write.done()
+
+            release.set()
+            await write
+            return during, await db._read(STAGES), db._idle_readers.qsize()
+        finally:
+            await db.close()
+
+    during, after, idle = asyncio.run(scenario())
+
+    assert during == [[("", 30)]] * 6
+    assert after == [("", 30), ("Affinity EMEA", 120)]
+    # Every borrowed reader went back to the pool
+    assert idle == 2
+
+
+def test_in_memory_database_reads_wait_for_the_writer():
+    async def scenario():
+        db = DatabaseManager(":memory:")
+        await db.initialize()
+        try:
+            assert db._readers == [] and db._idle_readers is None
+            write, release = await start_held_write(db)
+
+            # Reads share the writer's connection, so they wait instead of seeing the open transaction
+            read = asyncio.create_task(db._read(STAGES))
+            await asyncio.sleep(0.05)
+            assert not read.done()
+
+            release.set()
+            await write
+            return await asyncio.wait_for(read, 5)
+        finally:
+            await db.close()
+
+    assert asyncio.run(scenario()) == [("", 30), ("Affinity EMEA", 120)]
+
+
+def add_absence(db, day):
+    return db.add_absence(day, f"player{day}", "Vacation", f"2026-11-{day:02d}", f"2026-11-{day:02d}",
+                          "Affinity EMEA", "Travel")
+
+
+def run_counting_commits(tmp_path, scenario, **options):
+    """Run a scenario against a database and also return how many commits the writer made."""
+    async def main():
+        db = DatabaseManager(str(tmp_path / "bot_data.db"), **options)
+        await db.initialize()
+        commits = 0
+        commit = db.connection.commit
+
+        async def counting_commit():
+            nonlocal commits
+            commits += 1
+            await commit()
+        db.connection.commit = counting_commit
+        try:
+            return await scenario(db), commits
+        finally:
+            await db.close()
+    return asyncio.run(main())
+
+
+ABSENCE_DAYS = 'SELECT user_id FROM absences ORDER BY id'
+
+
+def test_concurrent_writes_share_one_commit(tmp_path):
+    async def scenario(db):
+        ids = await asyncio.gather(*(add_absence(db, day) for day in range(1, 31)))
+        return ids, await db._read(ABSENCE_DAYS)
+
+    (ids, rows), commits = run_counting_commits(tmp_path, scenario)
+
+    assert commits == 1
+    assert ids == list(range(1, 31))
+    assert rows == [(day,) for day in range(1, 31)]
+
+
+def test_without_group_commit_every_write_commits(tmp_path):
+    async def scenario(db):
+        return await asyncio.gather(*(add_absence(db, day) for day in range(1, 6)))
+
+    ids, commits = run_counting_commits(tmp_path, scenario, group_commit=False)
+
+    assert ids == [1, 2, 3, 4, 5]
+    assert commits == 5
+
+
+def test_failed_write_only_fails_its_caller(tmp_path):
+    async def scenario(db):
+        results = await asyncio.gather(
+            add_absence(db, 1),
+            db._write('INSERT INTO no_such_table VALUES (1)'),
+            add_absence(db, 2),
+            return_exceptions=True
+        )
+        return results, await db._read(ABSENCE_DAYS)
+
+    (results, rows), commits = run_counting_commits(tmp_path, scenario)
+
+    assert results[0] == 1 and results[2] == 2
+    assert "no such table" in str(results[1])
+    assert rows == [(1,), (2,)]
+    assert commits == 1
+
+
+def test_write_that_breaks_the_transaction_fails_its_batch(tmp_path):
+    async def end_transaction(connection):
+        # Leaves no savepoint to roll back to, so the whole batch has to be abandoned
+        await connection.execute('ROLLBACK')
+        raise RuntimeError("bad operation")
+
+    async def scenario(db):
+        results = await asyncio.gather(
+            add_absence(db, 1), db._write_operation(end_transaction), return_exceptions=True
+        )
+        # The writer is usable again afterwards
+        later = await add_absence(db, 2)
+        return results, later, await db._read(ABSENCE_DAYS)
+
+    (results, later, rows), _ = run_counting_commits(tmp_path, scenario)
+
+    assert all(isinstance(result, Exception) for result in results)
+    assert isinstance(results[1], RuntimeError)
+    assert rows == [(2,)]
+    # Nothing from the failed batch was kept, not even its row ID
+    assert later == 1
+
+
+def test_absence_index_follows_writes_and_is_rebuilt_on_startup(tmp_path):
+    path = str(tmp_path / "bot_data.db")
+
+    def lookups(db):
+        on = [record.user_name for record in db.get_absences_on("Affinity EMEA", datetime.date(2026, 11, 5))]
+        overlapping = [
+            (record.team, record.user_name)
+            for record in db.get_overlapping_absences(datetime.date(2026, 11, 6), datetime.date(2026, 11, 8))
+        ]
+        return on, overlapping
+
+    async def scenario():
+        db = DatabaseManager(path)
+        await db.initialize()
+        try:
+            await db.add_absence(1, "zed", "Vacation", "2026-11-02", "2026-11-06", "Affinity EMEA", "Travel")
+            await db.add_absence(2, "Anna", "Sick", "2026-11-05", "2026-11-05", "Affinity EMEA", "Flu")
+            await db.add_absence(3, "bo", "Vacation", "2026-11-07", "2026-11-09", "Affinity NA", "Travel")
+            await db.add_absence(4, "cy", "Vacation", "2026-11-10", "2026-11-12", "Affinity EMEA", "Travel")
+            written = lookups(db)
+        finally:
+            await db.close()
+
+        db = DatabaseManager(path)
+        await db.initialize()
+        try:
+            return written, lookups(db), db.get_absences_on("Unknown", datetime.date(2026, 11, 5))
+        finally:
+            await db.close()
+
+    written, reloaded, unknown = asyncio.run(scenario())
+
+    assert written == (["Anna", "zed"], [("Affinity EMEA", "zed"), ("Affinity NA", "bo")])
+    assert reloaded == written
+    assert unknown == []
@@ -0,0 +1,112 @@
+import asyncio
+import re
+import time
+import types
+
+import scrim_bot
+from diagnostics import LoopLagMonitor, SlowCallbackTracker, name_current_task
+from metrics import Histogram
+
+BLOCK = 0.3
+
+
+async def blocking_handler(name):
+    name_current_task(name)
+    # Stalls the whole event loop, as a synchronous call in a handler would
+    time.sleep(BLOCK)
+
+
+def test_lag_monitor_reports_a_blocked_loop():
+    histogram = Histogram("lag_seconds", "Lag", buckets=(0.1, 1.0))
+    monitor = LoopLagMonitor(histogram, interval=0.02)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.1)
+        await blocking_handler("command:/slow")
+        await asyncio.sleep(0.1)
+        monitor.stop()
+        return monitor.stats()
+
+    stats = asyncio.run(scenario())
+
+    assert stats["max"] >= BLOCK - 0.05
+    assert stats["recent_max"] == stats["max"]
+    # The sample spanning the stall is late, most of the others are not
+    assert stats["p50"] < 0.1
+    assert histogram.count() == stats["samples"]
+    assert histogram.bucket_counts()["0.1"] < stats["samples"]
+
+
+def test_slow_callback_tracker_names_the_blocking_task():
+    histogram = Histogram("slow_seconds", "Slow callbacks", ("task",), buckets=(0.1, 1.0))
+    tracker = SlowCallbackTracker(histogram)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        tracker.enable(loop, 0.1)
+        try:
+            await asyncio.create_task(blocking_handler("command:/slow"))
+            await asyncio.create_task(blocking_handler("command:/slow"))
+            # Fast enough to go unreported
+            await asyncio.create_task(asyncio.sleep(0.01), name="command:/fast")
+        finally:
+            tracker.disable(loop)
+        return loop.get_debug()
+
+    assert asyncio.run(scenario()) is False
+
+    [(name, count, total, worst)] = tracker.top()
+    assert (name, count) == ("command:/slow", 2)
+    assert total >= 2 * BLOCK and worst >= BLOCK
+    assert histogram.count("command:/slow") == 2
+    assert [name for name, _ in tracker.recent] == ["command:/slow"] * 2
+
+
+class FakeResponse:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, *args, **kwargs):
+        self.sent.append(kwargs)
+
+
+def test_diag_reports_lag_and_slow_callbacks(monkeypatch):
+    monitor = LoopLagMonitor(interval=0.02)
+    tracker = SlowCallbackTracker()
+    monkeypatch.setattr(scrim_bot, "loop_lag_monitor", monitor)
+    monkeypatch.setattr(scrim_bot, "slow_callbacks", tracker)
+
+    async def is_owner(user):
+        return True
+
+    async def diag(**options):
+        interaction = types.SimpleNamespace(
+            user=types.SimpleNamespace(id=1), command=None, data=None, response=FakeResponse()
+        )
+        await scrim_bot.diag.callback(interaction, **options)
+        return {field.name: field.value for field in interaction.response.sent[0]["embed"].fields}
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        monkeypatch.setattr(scrim_bot, "bot", types.SimpleNamespace(
+            loop=loop, is_owner=is_owner, outbound=types.SimpleNamespace(stats=lambda: {"queued": 0})
+        ))
+        monitor.start()
+        try:
+            before = await diag(slow_callbacks_on=True)
+            await asyncio.create_task(blocking_handler("command:/slow"))
+            await asyncio.sleep(0.1)
+            after = await diag(slow_callbacks_on=False)
+        finally:
+            monitor.stop()
+            tracker.disable(loop)
+        return before, after
+
+    before, after = asyncio.run(scenario())
+
+    threshold = f"{scrim_bot.SLOW_CALLBACK_THRESHOLD * 1000:.0f}"
+    assert before[f"Slow callbacks (on (>{threshold} ms))"] == "None recorded"
+    assert after["Slow callbacks (off)"].startswith("`command:/slow` ×1,")
+    max_lag_ms = float(re.search(r" max ([\d.]+) ms$", after["Event loop lag"]).group(1))
+    assert max_lag_ms >= (BLOCK - 0.05) * 1000
@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import types
+
+import discord
+import pytest
+
+import scrim_bot
+from discord_cache import DiscordCache
+
+GUILD_ID = 10
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeGuild:
+    """A guild without a member cache, fetching members from the API."""
+
+    def __init__(self, missing=(), error=None):
+        self.id = GUILD_ID
+        self.missing = set(missing)
+        self.error = error
+        self.fetches = []
+
+    def get_member(self, user_id):
+        return None
+
+    async def fetch_member(self, user_id):
+        self.fetches.append(user_id)
+        if self.error is not None:
+            raise self.error
+        if user_id in self.missing:
+            raise discord.NotFound(types.SimpleNamespace(status=404, reason="Not Found"), "Unknown Member")
+        return types.SimpleNamespace(id=user_id)
+
+
+def test_fetched_members_are_cached_briefly_and_bounded():
+    guild = FakeGuild(missing={99})
+    cache = DiscordCache(types.SimpleNamespace(), max_members=2, member_ttl=0.1)
+
+    async def scenario():
+        first = await cache.get_member(guild, 1)
+        assert await cache.get_member(guild, 1) is first
+        await cache.get_member(guild, 2)
+        await cache.get_member(guild, 1)
+        # 2 is now the least recently used, so it makes room for 3
+        await cache.get_member(guild, 3)
+        assert list(cache._members) == [(GUILD_ID, 1), (GUILD_ID, 3)]
+
+        # A role change reported by the gateway, and expiry without one
+        cache.invalidate_member(GUILD_ID, 1)
+        await cache.get_member(guild, 1)
+        await asyncio.sleep(0.15)
+        await cache.get_member(guild, 3)
+
+        assert await cache.get_member(guild, 99) is None
+        assert await cache.get_member(guild, 99) is None
+
+    asyncio.run(scenario())
+
+    assert guild.fetches == [1, 2, 3, 1, 3, 99, 99]
+    assert cache.metrics["member_hits"] == 2
+    assert cache.stats()["members"] == 2
+
+
+@pytest.fixture
+def team_guild(monkeypatch):
+    """Install a member cache that knows the team guild through the management role."""
+    guild = FakeGuild()
+    cache = DiscordCache(types.SimpleNamespace())
+    cache._roles[scrim_bot.MANAGEMENT_ROLE_ID] = types.SimpleNamespace(id=scrim_bot.MANAGEMENT_ROLE_ID, guild=guild)
+    monkeypatch.setattr(scrim_bot, "discord_cache", cache)
+    return guild
+
+
+def test_guild_interaction_uses_the_member_in_the_payload(team_guild):
+    # Payload members arrive as discord.Member with their roles
+    member = discord.Member.__new__(discord.Member)
+    interaction = types.SimpleNamespace(user=member)
+
+    assert asyncio.run(scrim_bot.get_interaction_member(interaction)) is member
+    assert team_guild.fetches == []
+
+
+def test_dm_interaction_fetches_the_member_from_the_team_guild(team_guild):
+    async def scenario():
+        interaction = types.SimpleNamespace(user=types.SimpleNamespace(id=5))
+        return [await scrim_bot.get_interaction_member(interaction) for _ in range(2)]
+
+    first, second = asyncio.run(scenario())
+
+    assert first.id == 5 and second is first
+    assert team_guild.fetches == [5]
+
+
+def test_failed_member_fetch_denies_instead_of_raising(team_guild):
+    team_guild.error = discord.HTTPException(types.SimpleNamespace(status=503, reason="Unavailable"), "Try again")
+    interaction = types.SimpleNamespace(user=types.SimpleNamespace(id=5))
+
+    assert asyncio.run(scrim_bot.get_interaction_member(interaction)) is None
+
+
+def bot_config(low_footprint, cwd):
+    """Import the bot in a fresh interpreter and describe how its client is set up."""
+    script = (
+        "import json, scrim_bot\n"
+        "from discord.ext import commands\n"
+        "bot = scrim_bot.bot\n"
+        "print(json.dumps({\n"
+        "    'intents': sorted(name for name, enabled in bot.intents if enabled),\n"
+        "    'member_cache': bot._connection.member_cache_flags.value,\n"
+        "    'chunk': bot._connection._chunk_guilds,\n"
+        "    'mention_prefix': bot.command_prefix is commands.when_mentioned,\n"
+        "}))\n"
+    )
+    env = {**os.environ, "PYTHONPATH": ROOT, "METRICS_PORT": "0",
+           "BOT_LOW_FOOTPRINT": "1" if low_footprint else ""}
+    return json.loads(subprocess.run(
+        # Run elsewhere so the bot's log file isn't written into the repository
+        [sys.executable, "-c", script], cwd=cwd, env=env, capture_output=True, text=True, check=True
+    ).stdout.splitlines()[-1])
+
+
+def test_low_footprint_mode_drops_privileged_intents_and_the_member_cache(tmp_path):
+    default, low = bot_config(False, tmp_path), bot_config(True, tmp_path)
+
+    assert {"members", "message_content"} <= set(default["intents"])
+    assert default["member_cache"] != 0 and default["chunk"]
+    assert low == {
+        "intents": ["dm_messages", "guild_messages", "guilds"],
+        "member_cache": 0,
+        "chunk": False,
+        "mention_prefix": True,
+    }
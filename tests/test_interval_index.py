@@ -0,0 +1,60 @@
+import math
+import random
+
+import pytest
+
+from interval_index import IntervalIndex
+
+
+def random_intervals(rng, count):
+    intervals = []
+    for item in range(count):
+        start = rng.randrange(0, 1000)
+        intervals.append((start, start + rng.randrange(0, 60), item))
+    return intervals
+
+
+def brute_force(intervals, start, end):
+    return sorted(item for low, high, item in intervals if low <= end and high >= start)
+
+
+@pytest.mark.parametrize("bulk", [False, True])
+def test_queries_match_a_scan_of_every_interval(bulk):
+    rng = random.Random(6)
+    intervals = random_intervals(rng, 500)
+    if bulk:
+        index = IntervalIndex(intervals)
+    else:
+        index = IntervalIndex()
+        for interval in intervals:
+            index.add(*interval)
+
+    assert len(index) == 500
+    assert sorted(index) == sorted(intervals)
+    for _ in range(300):
+        start = rng.randrange(-10, 1070)
+        end = start + rng.choice((0, 0, 1, 7, 100))
+        assert sorted(index.overlapping(start, end)) == brute_force(intervals, start, end)
+        assert sorted(index.at(start)) == brute_force(intervals, start, start)
+
+
+def test_inserts_keep_a_logarithmic_number_of_trees():
+    index = IntervalIndex()
+    for start, end, item in random_intervals(random.Random(6), 1000):
+        index.add(start, end, item)
+        assert len(index._trees) <= math.log2(len(index)) + 1
+        sizes = [len(tree.intervals) for tree in index._trees]
+        # Older trees are larger, so merges stay cheap
+        assert sizes == sorted(sizes, reverse=True)
+
+
+def test_bounds_are_inclusive():
+    index = IntervalIndex()
+    index.add(10, 20, "absence")
+    index.add(21, 21, "single day")
+
+    assert index.at(10) == index.at(20) == ["absence"]
+    assert index.at(9) == [] and index.at(22) == []
+    assert sorted(index.overlapping(20, 21)) == ["absence", "single day"]
+    with pytest.raises(ValueError):
+        index.add(5, 4, "backwards")
@@ -0,0 +1,99 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import threading
+
+import pytest
+
+from logging_setup import setup_logging
+
+
+@pytest.fixture
+def configure(tmp_path):
+    """Set up logging into tmp_path, putting the root logger back afterwards."""
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    listeners = []
+
+    def configure(**options):
+        listener = setup_logging(str(tmp_path / "bot.log"), **options)
+        listeners.append(listener)
+        return listener
+
+    yield configure
+
+    for listener in listeners:
+        if listener._thread is not None:
+            listener.stop()
+        atexit.unregister(listener.stop)
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_records_are_written_by_the_listener_thread(configure, tmp_path):
+    listener = configure()
+    written_on = []
+    file_handler = next(handler for handler in listener.handlers if isinstance(handler, logging.FileHandler))
+    emit = file_handler.emit
+    file_handler.emit = lambda record: (written_on.append(threading.current_thread()), emit(record))
+
+    root = logging.getLogger()
+    assert len(root.handlers) == 1 and isinstance(root.handlers[0], logging.handlers.QueueHandler)
+    logging.getLogger("affinity_bot").info("Reminder sent for scrim ID %d", 7)
+    logging.getLogger("affinity_bot").debug("Not at the configured level")
+    listener.stop()
+
+    lines = (tmp_path / "bot.log").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 1
+    assert lines[0].endswith(" - affinity_bot - INFO - Reminder sent for scrim ID 7")
+    assert written_on and all(thread is not threading.main_thread() for thread in written_on)
+
+
+def test_file_rotates_at_the_size_limit(configure, tmp_path):
+    listener = configure(max_bytes=400, backup_count=2)
+    for index in range(100):
+        logging.getLogger("affinity_bot").info("Line %03d", index)
+    listener.stop()
+
+    files = sorted(path.name for path in tmp_path.iterdir())
+    assert files == ["bot.log", "bot.log.1", "bot.log.2"]
+    assert all((tmp_path / name).stat().st_size <= 400 for name in files)
+    # The newest records are in the current file
+    assert (tmp_path / "bot.log").read_text(encoding="utf-8").splitlines()[-1].endswith("Line 099")
+
+
+def test_json_format_writes_one_object_per_line(configure, tmp_path):
+    listener = configure(json_format=True)
+    logger = logging.getLogger("affinity_bot")
+    logger.warning('Channel "%s" not found', "reminders")
+    try:
+        raise ValueError("bad payload")
+    except ValueError:
+        logger.exception("Error handling interaction")
+    listener.stop()
+
+    entries = [json.loads(line) for line in (tmp_path / "bot.log").read_text(encoding="utf-8").splitlines()]
+    assert [(entry["level"], entry["logger"], entry["message"]) for entry in entries] == [
+        ("WARNING", "affinity_bot", 'Channel "reminders" not found'),
+        ("ERROR", "affinity_bot", "Error handling interaction"),
+    ]
+    assert "exception" not in entries[0]
+    assert entries[1]["exception"].endswith("ValueError: bad payload")
+
+
+def test_text_format_keeps_the_traceback_after_the_message(configure, tmp_path):
+    listener = configure()
+    try:
+        raise ValueError("bad payload")
+    except ValueError:
+        logging.getLogger("affinity_bot").exception("Error handling interaction")
+    listener.stop()
+
+    lines = (tmp_path / "bot.log").read_text(encoding="utf-8").splitlines()
+    assert lines[0].endswith(" - affinity_bot - ERROR - Error handling interaction")
+    assert lines[1] == "Traceback (most recent call last):"
+    assert lines[-1] == "ValueError: bad payload"
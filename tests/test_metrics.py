@@ -0,0 +1,136 @@
+import asyncio
+import types
+
+import pytest
+
+from metrics import Histogram, Registry, timed
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 0.5, 1.0))
+    for value in (0.05, 0.1, 0.3, 1.0, 2.0):
+        histogram.observe(value)
+
+    # A value equal to a bound counts towards that bound, as Prometheus' le does
+    assert histogram.bucket_counts() == {"0.1": 2, "0.5": 3, "1.0": 4, "+Inf": 5}
+    assert histogram.count() == 5
+    assert histogram.bucket_counts("unseen") == {"0.1": 0, "0.5": 0, "1.0": 0, "+Inf": 0}
+
+
+def test_timed_records_duration_and_errors():
+    registry = Registry()
+    seconds = registry.histogram("call_seconds", "Call duration", ("module", "call"))
+    errors = registry.counter("call_errors_total", "Calls that raised", ("module", "call"))
+
+    @timed(seconds, "db", errors=errors)
+    async def lookup(fail):
+        if fail:
+            raise ValueError("no such row")
+        return "row"
+
+    assert asyncio.run(lookup(False)) == "row"
+    with pytest.raises(ValueError):
+        asyncio.run(lookup(True))
+
+    # The qualified name fills in the missing label
+    labels = ("db", lookup.__qualname__)
+    assert seconds.count(*labels) == 2
+    assert errors.get(*labels) == 1
+
+
+def test_registry_renders_prometheus_text_format():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests handled", ("handler",))
+    latency = registry.histogram("request_seconds", "Request latency", buckets=(0.5,))
+    queue = {"queued": 3, "sent": 7}
+    registry.stats("queue", "Queue counters", lambda: queue)
+
+    requests.inc('say "hi"\n')
+    latency.observe(0.25)
+    latency.observe(0.75)
+    queue["queued"] = 0
+
+    assert registry.render() == (
+        "# HELP requests_total Requests handled\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{handler="say \\"hi\\"\\n"} 1\n'
+        "# HELP request_seconds Request latency\n"
+        "# TYPE request_seconds histogram\n"
+        'request_seconds_bucket{le="0.5"} 1\n'
+        'request_seconds_bucket{le="+Inf"} 2\n'
+        "request_seconds_sum 1.0\n"
+        "request_seconds_count 2\n"
+        "# HELP queue Queue counters\n"
+        "# TYPE queue gauge\n"
+        'queue{stat="queued"} 0\n'
+        'queue{stat="sent"} 7\n'
+    )
+
+
+def test_registry_rejects_duplicate_names():
+    registry = Registry()
+    registry.counter("requests_total", "Requests handled")
+    with pytest.raises(ValueError):
+        registry.histogram("requests_total", "Requests handled")
+
+
+def test_bot_exports_component_stats():
+    from scrim_bot import metrics_registry
+
+    rendered = metrics_registry.render()
+    for line in (
+        'bot_sessions{stat="evicted_lru"} 0',
+        'bot_discord_cache{stat="members"} 0',
+        'bot_permissions{stat="size"} 0',
+        'bot_outbound{stat="queued"} 0',
+    ):
+        assert line in rendered
+
+
+class FakeResponse:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.sent = []
+
+    async def send_message(self, *args, **kwargs):
+        if self.fail:
+            raise RuntimeError("interaction expired")
+        self.sent.append(kwargs)
+
+
+def test_workflow_fills_interaction_and_database_histograms(tmp_path):
+    import scrim_bot
+    from scrim_bot import DB_SECONDS, INTERACTION_ERRORS, INTERACTION_SECONDS, DatabaseManager
+
+    db_labels = ("DatabaseManager.add_absence",)
+    command_labels = ("command", "scrim")
+    db_before = DB_SECONDS.count(*db_labels)
+    command_before = INTERACTION_SECONDS.count(*command_labels)
+    errors_before = INTERACTION_ERRORS.get(*command_labels)
+
+    async def scenario():
+        db = DatabaseManager(str(tmp_path / "bot_data.db"))
+        await db.initialize()
+        try:
+            await db.add_absence(1, "player", "Vacation", "2026-11-02", "2026-11-06", "Affinity EMEA", "Travel")
+        finally:
+            await db.close()
+
+        # Not a guild member, so /scrim answers with Access Denied
+        response = FakeResponse()
+        await scrim_bot.scrim.callback(types.SimpleNamespace(user=types.SimpleNamespace(id=1), response=response))
+        assert response.sent[0]["embed"].title == "❌ Access Denied"
+
+        with pytest.raises(RuntimeError):
+            await scrim_bot.scrim.callback(
+                types.SimpleNamespace(user=types.SimpleNamespace(id=1), response=FakeResponse(fail=True))
+            )
+
+    asyncio.run(scenario())
+
+    assert DB_SECONDS.count(*db_labels) == db_before + 1
+    assert INTERACTION_SECONDS.count(*command_labels) == command_before + 2
+    assert INTERACTION_ERRORS.get(*command_labels) == errors_before + 1
+    rendered = scrim_bot.metrics_registry.render()
+    assert 'bot_db_duration_seconds_count{method="DatabaseManager.add_absence"}' in rendered
+    assert 'bot_interaction_duration_seconds_bucket{kind="command",handler="scrim",le="3.0"}' in rendered
@@ -0,0 +1,151 @@
+import asyncio
+import json
+
+import discord
+from multidict import CIMultiDict
+
+from outbound import OutboundDispatcher
+
+CHANNEL_ID = 123
+
+
+def message_payload(content):
+    return {
+        "id": "1", "channel_id": str(CHANNEL_ID), "type": 0, "content": content or "",
+        "author": {"id": "2", "username": "bot", "discriminator": "0", "avatar": None},
+        "timestamp": "2026-01-01T00:00:00+00:00", "edited_timestamp": None, "tts": False,
+        "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+        "embeds": [], "pinned": False,
+    }
+
+
+class FakeResponse:
+    def __init__(self, status, body):
+        self.status = status
+        self.reason = "OK" if status < 400 else "Error"
+        self.body = body
+        self.headers = CIMultiDict({"content-type": "application/json", "Via": "1.1 google"})
+
+    async def text(self, encoding=None):
+        return json.dumps(self.body)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+class FakeSession:
+    """Stands in for discord.py's aiohttp session, answering POSTs from a script of statuses."""
+
+    closed = False
+
+    def __init__(self, statuses, retry_after=0.05):
+        self.statuses = list(statuses)
+        self.retry_after = retry_after
+        self.posts = []
+
+    def request(self, method, url, **kwargs):
+        payload = json.loads(kwargs["data"])
+        self.posts.append(payload)
+        status = self.statuses.pop(0) if self.statuses else 200
+        if status == 429:
+            body = {"message": "You are being rate limited.", "retry_after": self.retry_after, "global": False}
+        elif status >= 400:
+            body = {"message": "error", "code": 0}
+        else:
+            body = message_payload(payload.get("content"))
+        return FakeResponse(status, body)
+
+
+async def make_channel(session, max_ratelimit_timeout=None):
+    """A channel whose sends go through a real discord.py HTTP client onto the fake session."""
+    client = discord.Client(intents=discord.Intents(guilds=True))
+    await client._async_setup_hook()
+    # What HTTPClient.static_login sets up, minus logging in
+    client.http._HTTPClient__session = session
+    client.http._global_over = asyncio.Event()
+    client.http._global_over.set()
+    client.http.max_ratelimit_timeout = max_ratelimit_timeout
+    return client.get_partial_messageable(CHANNEL_ID)
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 10))
+
+
+def test_short_rate_limit_is_waited_out_by_the_http_client():
+    session = FakeSession([429])
+    dispatcher = OutboundDispatcher(base_delay=0.01)
+
+    async def scenario():
+        message = await dispatcher.send(await make_channel(session), content="hello")
+        await dispatcher.close()
+        return message
+
+    assert run(scenario()).content == "hello"
+    assert len(session.posts) == 2
+    assert dispatcher.metrics["retries"] == 0
+
+
+def test_long_rate_limit_is_retried_by_the_dispatcher():
+    # Anything longer than the client's max_ratelimit_timeout raises RateLimited
+    # instead of sleeping inside the request
+    session = FakeSession([429, 429])
+    dispatcher = OutboundDispatcher(base_delay=0.01)
+
+    async def scenario():
+        channel = await make_channel(session, max_ratelimit_timeout=0.01)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        message = await dispatcher.send(channel, content="hello")
+        elapsed = loop.time() - started
+        await dispatcher.close()
+        return message, elapsed
+
+    message, elapsed = run(scenario())
+    assert message.content == "hello"
+    assert len(session.posts) == 3
+    assert dispatcher.metrics["retries"] == 2
+    # Never sooner than Discord asked
+    assert elapsed >= 2 * session.retry_after
+
+
+def test_server_error_is_not_posted_again():
+    session = FakeSession([503])
+    dispatcher = OutboundDispatcher(base_delay=0.01)
+
+    async def scenario():
+        try:
+            await dispatcher.send(await make_channel(session), content="hello")
+        except discord.DiscordServerError:
+            return True
+        finally:
+            await dispatcher.close()
+        return False
+
+    assert run(scenario())
+    assert len(session.posts) == 1
+    assert dispatcher.metrics["failed"] == 1
+
+
+def test_sends_are_paced_and_coalesced_per_channel():
+    session = FakeSession([])
+    dispatcher = OutboundDispatcher(rate=2, per=0.2, coalesce_window=0.05)
+
+    async def scenario():
+        channel = await make_channel(session)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.gather(*(dispatcher.send(channel, content=f"plain {i}") for i in range(3)))
+        paced = loop.time() - started
+        await asyncio.gather(*(dispatcher.send(channel, coalesce=True, content=f"merged {i}") for i in range(4)))
+        await dispatcher.close()
+        return paced
+
+    # The third message waits for the first to leave the 0.2 s window
+    assert run(scenario()) >= 0.2
+    assert [post["content"] for post in session.posts[:3]] == ["plain 0", "plain 1", "plain 2"]
+    assert session.posts[3]["content"] == "merged 0\n\nmerged 1\n\nmerged 2\n\nmerged 3"
+    assert dispatcher.metrics["coalesced"] == 3
@@ -0,0 +1,160 @@
+import asyncio
+import itertools
+import time
+
+import discord
+import pytest
+
+import scrim_bot
+from permissions import PermissionResolver, Policy
+from scrim_bot import ALLOWED_ROLES, PERMISSION_POLICIES
+
+GUILD_ID = 10
+OWNER_ID = 1
+ADMIN_ROLE = 500
+OTHER_ROLE = 600
+
+
+def role_payload(role_id, permissions=0):
+    return {"id": str(role_id), "name": f"role {role_id}", "permissions": str(permissions), "position": 1,
+            "color": 0, "hoist": False, "managed": False, "mentionable": False}
+
+
+def make_guild():
+    roles = [role_payload(GUILD_ID), role_payload(ADMIN_ROLE, discord.Permissions(administrator=True).value),
+             role_payload(OTHER_ROLE), *(role_payload(role_id) for role_id in ALLOWED_ROLES)]
+    return discord.Guild(
+        data={"id": str(GUILD_ID), "name": "Affinity", "owner_id": str(OWNER_ID), "roles": roles},
+        state=scrim_bot.bot._connection
+    )
+
+
+def make_member(guild, user_id, role_ids):
+    """A member as discord.py builds it from an interaction or gateway payload."""
+    return discord.Member(
+        data={"user": {"id": str(user_id), "username": f"user{user_id}", "discriminator": "0", "avatar": None},
+              "roles": [str(role_id) for role_id in role_ids], "joined_at": None, "deaf": False, "mute": False,
+              "flags": 0},
+        guild=guild, state=scrim_bot.bot._connection
+    )
+
+
+def old_has_permission(member):
+    """has_permission before the per-action policies."""
+    if member is None:
+        return False
+    return any(role.id in ALLOWED_ROLES for role in member.roles) or member.guild_permissions.administrator
+
+
+def old_button_check(member):
+    """The check /create_scrim_button and /setup_absence_button made before the policies."""
+    return member.guild_permissions.administrator
+
+
+def every_kind_of_member(guild):
+    role_sets = [[], [OTHER_ROLE], [ADMIN_ROLE], [OTHER_ROLE, ADMIN_ROLE]]
+    role_sets += [[role_id] for role_id in ALLOWED_ROLES]
+    role_sets += [[role_id, OTHER_ROLE] for role_id in ALLOWED_ROLES]
+    role_sets += [list(pair) for pair in itertools.combinations(ALLOWED_ROLES, 2)]
+    role_sets += [[ALLOWED_ROLES[0], ADMIN_ROLE]]
+    members = [make_member(guild, 100 + index, roles) for index, roles in enumerate(role_sets)]
+    # The owner has every permission without holding a role
+    members.append(make_member(guild, OWNER_ID, []))
+    return members
+
+
+def test_policies_decide_like_the_checks_they_replaced():
+    guild = make_guild()
+    members = every_kind_of_member(guild)
+    resolver = PermissionResolver(PERMISSION_POLICIES)
+
+    # Twice, so cached decisions are compared as well as fresh ones
+    for _ in range(2):
+        for member in members:
+            assert resolver.allowed(member, "schedule_scrim") == old_has_permission(member)
+            assert resolver.allowed(member, "view_absences") == old_has_permission(member)
+            assert resolver.allowed(member, "create_persistent_button") == old_button_check(member)
+
+    # Both outcomes are covered for every action
+    assert {old_has_permission(member) for member in members} == {True, False}
+    assert {old_button_check(member) for member in members} == {True, False}
+    assert resolver.metrics["misses"] == 3 * len(members)
+    assert resolver.metrics["hits"] == 3 * len(members)
+
+
+def test_unknown_member_or_action():
+    resolver = PermissionResolver(PERMISSION_POLICIES)
+
+    assert all(not resolver.allowed(None, action) for action in PERMISSION_POLICIES)
+    with pytest.raises(KeyError):
+        resolver.allowed(make_member(make_guild(), 100, []), "delete_everything")
+
+
+def test_decisions_are_recomputed_after_invalidation_or_expiry():
+    guild = make_guild()
+    resolver = PermissionResolver(PERMISSION_POLICIES, ttl=0.1)
+    before = make_member(guild, 100, [])
+    # The same member after being given a team role
+    after = make_member(guild, 100, [ALLOWED_ROLES[0]])
+
+    assert not resolver.allowed(before, "schedule_scrim")
+    assert not resolver.allowed(after, "schedule_scrim")
+    resolver.invalidate_member(GUILD_ID, 100)
+    assert resolver.allowed(after, "schedule_scrim")
+
+    resolver.invalidate_guild(GUILD_ID)
+    assert not resolver.allowed(before, "schedule_scrim")
+    # Without member events, a stale decision lasts at most the TTL
+    time.sleep(0.15)
+    assert resolver.allowed(after, "schedule_scrim")
+
+    resolver.configure({**PERMISSION_POLICIES, "schedule_scrim": Policy([OTHER_ROLE], administrator=False)})
+    assert not resolver.allowed(after, "schedule_scrim")
+    assert resolver.metrics["invalidations"] == 2
+
+
+def test_least_recently_checked_members_are_dropped_when_full():
+    guild = make_guild()
+    resolver = PermissionResolver(PERMISSION_POLICIES, max_size=2)
+    members = [make_member(guild, user_id, []) for user_id in (100, 101, 102)]
+
+    resolver.allowed(members[0], "schedule_scrim")
+    resolver.allowed(members[1], "schedule_scrim")
+    resolver.allowed(members[0], "view_absences")
+    resolver.allowed(members[2], "schedule_scrim")
+
+    assert list(resolver._decisions) == [(GUILD_ID, 100), (GUILD_ID, 102)]
+    assert resolver.stats()["size"] == 2
+
+
+def test_gateway_events_invalidate_cached_decisions(monkeypatch):
+    guild = make_guild()
+    resolver = PermissionResolver(PERMISSION_POLICIES)
+    monkeypatch.setattr(scrim_bot, "permissions", resolver)
+    before = make_member(guild, 100, [])
+    after = make_member(guild, 100, [ALLOWED_ROLES[0]])
+    other = make_member(guild, 101, [OTHER_ROLE])
+    role = guild.get_role(OTHER_ROLE)
+
+    async def scenario():
+        assert not scrim_bot.has_permission(before, "schedule_scrim")
+        # A nickname change leaves the decision alone, a role change drops it
+        await scrim_bot.on_member_update(before, before)
+        assert resolver.stats()["size"] == 1
+        await scrim_bot.on_member_update(before, after)
+        assert scrim_bot.has_permission(after, "schedule_scrim")
+
+        assert not scrim_bot.has_permission(other, "create_persistent_button")
+        # Only a change to a role's permissions affects decisions
+        await scrim_bot.on_guild_role_update(role, role)
+        assert resolver.stats()["size"] == 2
+        elevated = discord.Role(guild=guild, state=scrim_bot.bot._connection,
+                                data=role_payload(OTHER_ROLE, discord.Permissions(administrator=True).value))
+        await scrim_bot.on_guild_role_update(role, elevated)
+        assert resolver.stats()["size"] == 0
+
+        scrim_bot.has_permission(other, "schedule_scrim")
+        await scrim_bot.on_member_remove(other)
+        assert resolver.stats()["size"] == 0
+
+    asyncio.run(scenario())
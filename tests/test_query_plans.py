@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from scrim_bot import INDEXED_QUERIES, SCHEMA_MIGRATIONS, DatabaseManager
+
+
+def migrated_plans(db_path):
+    """Migrate a fresh database and get the query plan of every indexed query."""
+    async def scenario():
+        db = DatabaseManager(str(db_path))
+        await db.initialize()
+        try:
+            cursor = await db.connection.execute("PRAGMA user_version")
+            version = (await cursor.fetchone())[0]
+            plans = {name: await db.explain(query, params) for name, (query, params) in INDEXED_QUERIES.items()}
+            return version, plans, await db.check_query_plans()
+        finally:
+            await db.close()
+
+    return asyncio.run(scenario())
+
+
+@pytest.fixture(scope="module")
+def migrated(tmp_path_factory):
+    return migrated_plans(tmp_path_factory.mktemp("db") / "bot_data.db")
+
+
+def test_migrations_reach_latest_version(migrated):
+    version, _, _ = migrated
+    assert version == len(SCHEMA_MIGRATIONS)
+
+
+@pytest.mark.parametrize("name", sorted(INDEXED_QUERIES))
+def test_indexed_query_does_not_scan(migrated, name):
+    _, plans, _ = migrated
+    plan = plans[name]
+    assert plan
+    assert not [detail for detail in plan if detail.startswith("SCAN")], plan
+
+
+def test_check_query_plans_reports_no_regressions(migrated):
+    _, _, regressions = migrated
+    assert regressions == []
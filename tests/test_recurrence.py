@@ -0,0 +1,92 @@
+import datetime
+import zoneinfo
+
+import pytest
+
+from recurrence import Recurrence
+
+BERLIN = zoneinfo.ZoneInfo("Europe/Berlin")
+WEEK = 7 * 24 * 3600
+
+
+def local(*args, tz=BERLIN):
+    return datetime.datetime(*args, tzinfo=tz).timestamp()
+
+
+def wall_clock(timestamp, tz=BERLIN):
+    return datetime.datetime.fromtimestamp(timestamp, tz).strftime("%Y-%m-%d %H:%M %Z")
+
+
+def test_fall_back_keeps_local_time():
+    # Clocks go back on 25 October 2026
+    recurrence = Recurrence.parse(local(2026, 10, 14, 20, 0), "FREQ=WEEKLY", BERLIN)
+
+    assert [wall_clock(timestamp) for _, timestamp in recurrence.between(local(2026, 10, 1), local(2026, 11, 5))] == [
+        "2026-10-14 20:00 CEST", "2026-10-21 20:00 CEST", "2026-10-28 20:00 CET", "2026-11-04 20:00 CET",
+    ]
+    # The week across the change is an hour longer
+    assert recurrence.at(2) - recurrence.at(1) == WEEK + 3600
+
+
+def test_spring_forward_keeps_local_time():
+    # Clocks go forward on 28 March 2027
+    recurrence = Recurrence.parse(local(2027, 3, 17, 20, 0), "FREQ=WEEKLY", BERLIN)
+
+    assert wall_clock(recurrence.at(1)) == "2027-03-24 20:00 CET"
+    assert wall_clock(recurrence.at(2)) == "2027-03-31 20:00 CEST"
+    assert recurrence.at(2) - recurrence.at(1) == WEEK - 3600
+
+
+@pytest.mark.parametrize("start", [local(2026, 10, 14, 20, 0), local(2027, 3, 17, 20, 0)])
+def test_window_search_matches_walking_the_series(start):
+    recurrence = Recurrence(start, freq="DAILY", tz=BERLIN)
+    walked = [recurrence.at(index) for index in range(60)]
+
+    # Windows starting exactly on, just before and just after each occurrence
+    for index, timestamp in enumerate(walked[:-1]):
+        for offset in (-1, 0, 1):
+            expected = index if offset <= 0 else index + 1
+            assert recurrence.first_index_from(timestamp + offset) == expected
+        assert list(recurrence.between(timestamp, walked[index + 1] + 1)) == [
+            (index, timestamp), (index + 1, walked[index + 1])
+        ]
+
+
+def test_index_on_uses_the_series_timezone():
+    # 23:30 in Berlin is already the next day in UTC during summer time
+    recurrence = Recurrence(local(2026, 10, 14, 23, 30), tz=BERLIN)
+
+    assert recurrence.index_on(datetime.date(2026, 10, 21)) == 1
+    assert recurrence.index_on(datetime.date(2026, 10, 28)) == 2
+    assert recurrence.index_on(datetime.date(2026, 10, 29)) is None
+
+
+def test_until_across_a_change_includes_the_last_local_occurrence():
+    start = local(2026, 10, 14, 20, 0)
+    recurrence = Recurrence.parse(start, "FREQ=WEEKLY;UNTIL=20261104T190000Z", BERLIN)
+
+    # 4 November 20:00 CET is 19:00 UTC, exactly the end of the series
+    assert recurrence.last_index() == 3
+    assert recurrence.occurrence(4) is None
+    assert len(list(recurrence.between(start, float("inf")))) == 4
+
+
+def test_without_a_timezone_occurrences_are_a_fixed_period_apart():
+    recurrence = Recurrence.parse(local(2026, 10, 14, 20, 0), "FREQ=WEEKLY;COUNT=3")
+
+    assert [recurrence.at(index) - recurrence.start for index in range(3)] == [0, WEEK, 2 * WEEK]
+    # The same UTC time, so an hour earlier locally after the clocks go back
+    assert wall_clock(recurrence.at(2)) == "2026-10-28 19:00 CET"
+    assert recurrence.occurrence(3) is None
+    assert recurrence.describe() == "every week at the same UTC time, not following daylight saving, 3 times"
+
+
+def test_rule_round_trip_and_description():
+    recurrence = Recurrence.parse(local(2026, 10, 14, 20, 0), "RRULE:FREQ=DAILY;INTERVAL=2;COUNT=10", BERLIN)
+
+    assert recurrence.to_rule() == "FREQ=DAILY;INTERVAL=2;COUNT=10"
+    assert recurrence.describe() == "every 2 days at the same Europe/Berlin time, 10 times"
+    with pytest.raises(ValueError):
+        Recurrence.parse(0, "FREQ=MONTHLY")
+    with pytest.raises(ValueError):
+        Recurrence.parse(0, "FREQ=WEEKLY;BYDAY=MO")
@@ -0,0 +1,357 @@
+import asyncio
+import datetime
+
+import aiosqlite
+
+import scrim_bot
+from scrim_bot import DEFAULT_REMINDER_TEAM, DatabaseManager, ReminderScheduler, ScrimRecord
+
+TEAM = "Affinity EMEA"
+
+
+class FakeBot:
+    async def wait_until_ready(self):
+        pass
+
+    def is_closed(self):
+        return False
+
+
+def add_scrim(db, start_time, team=TEAM):
+    return db.add_scrim(team, "Rivals", start_time, "Bo3", ["Ascent"], "EU", ["<@1>"], "Diamond", 10, 20)
+
+
+def record(scrim_id, start_time):
+    return ScrimRecord(scrim_id, TEAM, "Rivals", start_time, "Bo3", ["Ascent"], "EU", ["<@1>"], "Diamond", 10, 20)
+
+
+async def deliveries(db, scrim_id):
+    return sorted(offset for offset, _ in await db.get_scrim_deliveries(scrim_id))
+
+
+def test_migration_turns_reminder_flags_into_deliveries(tmp_path, monkeypatch):
+    path = str(tmp_path / "bot_data.db")
+    start = datetime.datetime(2026, 11, 7, 20, 0).timestamp()
+
+    async def scenario():
+        # A database from before reminder stages, with one reminded and one unreminded scrim
+        db = DatabaseManager(path)
+        db.connection = await aiosqlite.connect(path)
+        monkeypatch.setattr(scrim_bot, "SCHEMA_MIGRATIONS", scrim_bot.SCHEMA_MIGRATIONS[:8])
+        await db.migrate()
+        await db.connection.executemany('''
+        INSERT INTO scrims (id, team, opponent, start_time, format, maps, server, players,
+                            opponent_rank, reminder_sent, channel_id, role_id)
+        VALUES (?, ?, 'Rivals', ?, 'Bo3', '', 'EU', '', 'Diamond', ?, 10, 20)
+        ''', [(1, TEAM, start, True), (2, TEAM, start + 3600, False)])
+        await db.connection.commit()
+
+        monkeypatch.undo()
+        await db.migrate()
+        cursor = await db.connection.execute(
+            'SELECT scrim_id, offset_minutes, due_at, sent_at FROM reminder_deliveries ORDER BY scrim_id'
+        )
+        rows = await cursor.fetchall()
+        cursor = await db.connection.execute('SELECT team, offset_minutes FROM reminder_stages')
+        stages = await cursor.fetchall()
+        await db.connection.close()
+        return rows, stages
+
+    rows, stages = asyncio.run(scenario())
+
+    assert rows == [(1, 30, start - 1800, start - 1800), (2, 30, start + 1800, None)]
+    assert stages == [(DEFAULT_REMINDER_TEAM, 30)]
+
+
+def test_stage_changes_resync_pending_deliveries(tmp_path):
+    async def scenario():
+        db = DatabaseManager(str(tmp_path / "bot_data.db"))
+        await db.initialize()
+        try:
+            scrim_id = await add_scrim(db, datetime.datetime.now() + datetime.timedelta(days=2))
+            other_id = await add_scrim(db, datetime.datetime.now() + datetime.timedelta(days=2), team="Other")
+            assert await deliveries(db, scrim_id) == [30]
+
+            # Default stages apply to every team without its own
+            assert await db.add_reminder_stage(DEFAULT_REMINDER_TEAM, 120)
+            assert await deliveries(db, scrim_id) == [30, 120]
+            assert await deliveries(db, other_id) == [30, 120]
+
+            # A team's first own stage starts from the defaults
+            assert await db.add_reminder_stage(TEAM, 1440)
+            assert db.get_reminder_offsets(TEAM) == (1440, 120, 30)
+            assert await deliveries(db, scrim_id) == [30, 120, 1440]
+            assert not await db.add_reminder_stage(TEAM, 1440)
+
+            # Later default changes no longer reach that team
+            assert await db.remove_reminder_stage(DEFAULT_REMINDER_TEAM, 120)
+            assert await deliveries(db, scrim_id) == [30, 120, 1440]
+            assert await deliveries(db, other_id) == [30]
+
+            assert await db.remove_reminder_stage(TEAM, 30)
+            assert await deliveries(db, scrim_id) == [120, 1440]
+            assert not await db.remove_reminder_stage(TEAM, 30)
+
+            # A stage that has already passed is not created late
+            soon_id = await add_scrim(db, datetime.datetime.now() + datetime.timedelta(hours=1))
+            assert await deliveries(db, soon_id) == [120]
+            assert await db.add_reminder_stage(TEAM, 15)
+            assert await deliveries(db, soon_id) == [15, 120]
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_overdue_stages_collapse_to_the_shortest():
+    now = datetime.datetime.now()
+    scrim = ScrimRecord(1, TEAM, "Rivals", now + datetime.timedelta(minutes=20), "Bo3", ["Ascent"], "EU",
+                        ["<@1>"], "Diamond", 10, 20)
+    other = ScrimRecord(2, TEAM, "Rivals", now + datetime.timedelta(hours=23), "Bo3", ["Ascent"], "EU",
+                        ["<@1>"], "Diamond", 10, 20)
+    start = scrim.start_time.timestamp()
+
+    async def scenario():
+        scheduler = ReminderScheduler()
+        # As after downtime: the 24h and 2h stages were missed, the 30m stage is due now
+        for offset in (1440, 120, 30):
+            scheduler._push(scrim, offset, start - offset * 60)
+        scheduler._push(scrim, 10, start - 600)
+        scheduler._push(other, 1440, other.start_time.timestamp() - 86400)
+        return scheduler._pop_due(), scheduler._next_delay()
+
+    (send, skipped), next_delay = asyncio.run(scenario())
+
+    assert sorted((scrim.id, offset) for scrim, offset in send) == [(1, 30), (2, 1440)]
+    assert sorted(skipped) == [(1, 120), (1, 1440)]
+    # The 10 minute stage is still ahead and stays queued
+    assert 0 < next_delay <= 600
+
+
+def test_reload_during_sending_does_not_send_twice(tmp_path, monkeypatch):
+    sent = []
+    release = asyncio.Event()
+
+    async def send_scrim_reminder(scrim, offset_minutes):
+        sent.append((scrim.id, offset_minutes))
+        await release.wait()
+
+    monkeypatch.setattr(scrim_bot, "send_scrim_reminder", send_scrim_reminder)
+
+    async def scenario():
+        release.clear()
+        db = DatabaseManager(str(tmp_path / "bot_data.db"))
+        await db.initialize()
+        monkeypatch.setattr(scrim_bot, "db_manager", db)
+        try:
+            # Starts before its 30 minute stage would be due, so the stage is due right away
+            scrim_id = await add_scrim(db, datetime.datetime.now() + datetime.timedelta(minutes=10))
+            scheduler = ReminderScheduler()
+            await scheduler.load()
+            due, skipped = scheduler._pop_due()
+            assert [(scrim.id, offset) for scrim, offset in due] == [(scrim_id, 30)]
+
+            firing = asyncio.create_task(scheduler.fire(due, skipped))
+            await asyncio.sleep(0.05)
+            # /reminder_stages reloads while the reminder is still being sent
+            reloading = asyncio.create_task(scheduler.load())
+            await asyncio.sleep(0.05)
+            release.set()
+            await asyncio.gather(firing, reloading)
+
+            assert scheduler._pop_due() == ([], [])
+            assert await db.get_scrim_deliveries(scrim_id) == []
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+    assert len(sent) == 1
+
+
+def run_scheduler(tmp_path, monkeypatch, scenario, failures=0):
+    """Run a scenario against a scheduler with a fake send that records (scrim id, time sent).
+
+    The first `failures` sends raise.
+    """
+    sent = []
+
+    async def send_scrim_reminder(scrim, offset_minutes):
+        sent.append((scrim.id, datetime.datetime.now().timestamp()))
+        if len(sent) <= failures:
+            raise RuntimeError("channel unavailable")
+
+    monkeypatch.setattr(scrim_bot, "send_scrim_reminder", send_scrim_reminder)
+    monkeypatch.setattr(scrim_bot, "bot", FakeBot())
+
+    async def main():
+        db = DatabaseManager(str(tmp_path / "bot_data.db"))
+        await db.initialize()
+        monkeypatch.setattr(scrim_bot, "db_manager", db)
+        scheduler = ReminderScheduler(retry_delay=0.2, max_sleep=60)
+        try:
+            return await asyncio.wait_for(scenario(db, scheduler, sent), 10)
+        finally:
+            await scheduler.stop()
+            await db.close()
+
+    return asyncio.run(main()), sent
+
+
+async def wait_for_sends(sent, count):
+    while len(sent) < count:
+        await asyncio.sleep(0.01)
+
+
+def assert_sent_at(sent, scrim_id, due):
+    sent_id, sent_at = sent
+    assert sent_id == scrim_id
+    assert due <= sent_at < due + 0.1
+
+
+def test_scheduler_sleeps_until_each_deadline(tmp_path, monkeypatch):
+    async def scenario(db, scheduler, sent):
+        scheduler.start()
+        await asyncio.sleep(0.1)
+        now = datetime.datetime.now()
+        start_time = now + datetime.timedelta(minutes=30, seconds=0.5)
+        soon_id = await add_scrim(db, start_time)
+        await scheduler.schedule(record(soon_id, start_time))
+        # Due in a day
+        later = now + datetime.timedelta(days=1, minutes=30)
+        later_id = await add_scrim(db, later)
+        await scheduler.schedule(record(later_id, later))
+        wakeups = scheduler.wakeups
+
+        await wait_for_sends(sent, 1)
+        await asyncio.sleep(0.1)
+        due = start_time.timestamp() - 1800
+        return soon_id, due, scheduler.wakeups - wakeups, await db.get_scrim_deliveries(soon_id)
+
+    (soon_id, due, wakeups, remaining), sent = run_scheduler(tmp_path, monkeypatch, scenario)
+
+    assert len(sent) == 1
+    assert_sent_at(sent[0], soon_id, due)
+    # A new earlier deadline and that deadline passing, not a poll every so often
+    assert wakeups <= 2
+    assert remaining == []
+
+
+def test_overdue_reminders_fire_at_startup_and_failures_are_retried(tmp_path, monkeypatch):
+    async def scenario(db, scheduler, sent):
+        now = datetime.datetime.now()
+        # Its 30 minute stage passed while the bot was down, but the scrim hasn't started
+        overdue_id = await add_scrim(db, now + datetime.timedelta(minutes=10))
+        # Already started, so its reminder is no longer useful
+        await add_scrim(db, now - datetime.timedelta(minutes=5))
+        started = datetime.datetime.now().timestamp()
+        scheduler.start()
+        await wait_for_sends(sent, 2)
+        await asyncio.sleep(0.1)
+        return overdue_id, started, await db.get_scrim_deliveries(overdue_id)
+
+    (overdue_id, started, remaining), sent = run_scheduler(tmp_path, monkeypatch, scenario, failures=1)
+
+    # Sent right away, and again after the retry delay since the first send failed
+    assert len(sent) == 2
+    assert_sent_at(sent[0], overdue_id, started)
+    assert_sent_at(sent[1], overdue_id, sent[0][1] + 0.2)
+    assert remaining == []
+
+
+def test_due_reminders_are_sent_concurrently_and_recorded_together(tmp_path, monkeypatch):
+    in_flight = {"now": 0, "peak": 0}
+    sent = []
+
+    async def send_scrim_reminder(scrim, offset_minutes):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        try:
+            await asyncio.sleep(0.05)
+            if scrim.id == 3:
+                raise RuntimeError("channel unavailable")
+            sent.append(scrim.id)
+        finally:
+            in_flight["now"] -= 1
+
+    monkeypatch.setattr(scrim_bot, "send_scrim_reminder", send_scrim_reminder)
+
+    async def scenario():
+        db = DatabaseManager(str(tmp_path / "bot_data.db"))
+        await db.initialize()
+        monkeypatch.setattr(scrim_bot, "db_manager", db)
+        marked = []
+        mark_reminders_sent = db.mark_reminders_sent
+
+        async def recording(deliveries):
+            marked.append(list(deliveries))
+            await mark_reminders_sent(deliveries)
+        monkeypatch.setattr(db, "mark_reminders_sent", recording)
+        try:
+            start_time = datetime.datetime.now() + datetime.timedelta(minutes=10)
+            scrim_ids = [await add_scrim(db, start_time) for _ in range(20)]
+            scheduler = ReminderScheduler(max_concurrency=5, retry_delay=60)
+            await scheduler.load()
+            due, skipped = scheduler._pop_due()
+            assert len(due) == 20
+
+            started = asyncio.get_running_loop().time()
+            await scheduler.fire(due, skipped)
+            elapsed = asyncio.get_running_loop().time() - started
+
+            pending = {scrim_id: await db.get_scrim_deliveries(scrim_id) for scrim_id in scrim_ids}
+            return elapsed, marked, pending, list(scheduler._pending)
+        finally:
+            await db.close()
+
+    elapsed, marked, pending, retrying = asyncio.run(scenario())
+
+    # Four rounds of five, rather than twenty sends one after another
+    assert in_flight["peak"] == 5
+    assert elapsed < 20 * 0.05 / 2
+    assert sorted(sent) == [scrim_id for scrim_id in range(1, 21) if scrim_id != 3]
+    # Every delivered reminder in one write; the failed one stays unsent and is retried alone
+    assert marked == [[(scrim_id, 30) for scrim_id in range(1, 21) if scrim_id != 3]]
+    assert [scrim_id for scrim_id, deliveries in pending.items() if deliveries] == [3]
+    assert retrying == [(3, 30)]
+
+
+def test_failed_record_is_retried_without_resending(tmp_path, monkeypatch):
+    sent = []
+
+    async def send_scrim_reminder(scrim, offset_minutes):
+        sent.append(scrim.id)
+
+    monkeypatch.setattr(scrim_bot, "send_scrim_reminder", send_scrim_reminder)
+
+    async def scenario():
+        db = DatabaseManager(str(tmp_path / "bot_data.db"))
+        await db.initialize()
+        monkeypatch.setattr(scrim_bot, "db_manager", db)
+        mark_reminders_sent = db.mark_reminders_sent
+        failures = [RuntimeError("database is locked")]
+
+        async def flaky(deliveries):
+            if failures:
+                raise failures.pop()
+            await mark_reminders_sent(deliveries)
+        monkeypatch.setattr(db, "mark_reminders_sent", flaky)
+        try:
+            scrim_id = await add_scrim(db, datetime.datetime.now() + datetime.timedelta(minutes=10))
+            scheduler = ReminderScheduler()
+            await scheduler.load()
+            await scheduler.fire(*scheduler._pop_due())
+            assert scheduler._unmarked == {(scrim_id, 30)}
+            assert await db.get_scrim_deliveries(scrim_id) != []
+
+            # Reading pending deliveries back must not queue the delivered reminder again
+            await scheduler.load()
+            assert scheduler._pop_due() == ([], [])
+
+            await scheduler.record_sent([])
+            assert scheduler._unmarked == set()
+            return await db.get_scrim_deliveries(scrim_id)
+        finally:
+            await db.close()
+
+    assert asyncio.run(scenario()) == []
+    assert sent == [1]
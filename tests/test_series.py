@@ -0,0 +1,122 @@
+import asyncio
+import datetime
+
+import pytest
+
+from scrim_bot import SERIES_TIMEZONES, DatabaseManager
+
+TEAM = "Affinity EMEA"
+DAY = datetime.timedelta(days=1)
+
+
+def add_series(db, start_time, window, timezone=None):
+    return db.add_scrim_series(
+        TEAM, "Rivals", start_time, "Bo3", ["Ascent"], "EU", ["<@1>"], "Diamond", 10, 20,
+        timezone=timezone, window=window.total_seconds()
+    )
+
+
+async def scheduled(db, start_time):
+    scrims = await db.get_team_scrims_between(TEAM, start_time - DAY, start_time + 60 * DAY)
+    return [(scrim.occurrence, scrim.opponent) for scrim in scrims]
+
+
+@pytest.fixture
+def run_db(tmp_path):
+    """Run a scenario against a migrated database, reopening it when asked to."""
+    path = str(tmp_path / "bot_data.db")
+
+    def run(scenario):
+        async def main():
+            db = DatabaseManager(path)
+            await db.initialize()
+            try:
+                return await scenario(db)
+            finally:
+                await db.close()
+        return asyncio.run(main())
+    return run
+
+
+def test_occurrences_are_written_as_they_come_into_the_window(run_db):
+    start_time = (datetime.datetime.now() + DAY).replace(microsecond=0)
+
+    async def create(db):
+        series, scrims = await add_series(db, start_time, 10 * DAY)
+        assert [scrim.occurrence for scrim in scrims] == [0, 1]
+        assert await scheduled(db, start_time) == [(0, "Rivals"), (1, "Rivals")]
+
+        # A future occurrence can be skipped before it is written
+        await db.set_series_exception(series.id, 3, skipped=True)
+        created = await db.materialize_series(datetime.datetime.now().timestamp() + 30 * DAY.total_seconds())
+        assert [scrim.occurrence for scrim in created] == [2, 4]
+        # Nothing new to write the second time
+        assert await db.materialize_series(datetime.datetime.now().timestamp() + 30 * DAY.total_seconds()) == []
+        return series.id
+
+    series_id = run_db(create)
+
+    async def reopen(db):
+        series = db.scrim_series[series_id]
+        assert series.is_skipped(3)
+        assert series.recurrence.start == start_time.timestamp()
+        return await scheduled(db, start_time)
+
+    assert run_db(reopen) == [(0, "Rivals"), (1, "Rivals"), (2, "Rivals"), (4, "Rivals")]
+
+
+def test_skip_and_override_replace_written_occurrences(run_db):
+    start_time = (datetime.datetime.now() + DAY).replace(microsecond=0)
+
+    async def scenario(db):
+        series, _ = await add_series(db, start_time, 20 * DAY)
+
+        removed, created = await db.set_series_exception(series.id, 1, skipped=True)
+        assert len(removed) == 1 and created == []
+
+        moved = start_time + 14 * DAY + datetime.timedelta(hours=2)
+        removed, created = await db.set_series_exception(
+            series.id, 2, overrides={"opponent": "Stand-ins", "start_time": moved.timestamp()}
+        )
+        assert len(removed) == 1
+        assert [(scrim.occurrence, scrim.opponent, scrim.start_time) for scrim in created] == [
+            (2, "Stand-ins", moved)
+        ]
+        # Later overrides add to earlier ones
+        await db.set_series_exception(series.id, 2, overrides={"opponent_rank": "Immortal"})
+        scrims = await db.get_team_scrims_between(TEAM, moved, moved + datetime.timedelta(minutes=1))
+        assert [(scrim.opponent, scrim.opponent_rank) for scrim in scrims] == [("Stand-ins", "Immortal")]
+
+        return await scheduled(db, start_time)
+
+    assert run_db(scenario) == [(0, "Rivals"), (2, "Stand-ins")]
+
+
+def test_ending_a_series_removes_later_occurrences(run_db):
+    start_time = (datetime.datetime.now() + DAY).replace(microsecond=0)
+
+    async def scenario(db):
+        series, _ = await add_series(db, start_time, 20 * DAY)
+        removed = await db.end_scrim_series(series.id, at=(start_time + 8 * DAY).timestamp())
+
+        assert len(removed) == 1
+        assert series.recurrence.last_index() == 1
+        assert not series.finished(datetime.datetime.now().timestamp())
+        assert series.finished((start_time + 7 * DAY).timestamp())
+        assert await db.materialize_series(datetime.datetime.now().timestamp() + 60 * DAY.total_seconds()) == []
+        return await scheduled(db, start_time)
+
+    assert run_db(scenario) == [(0, "Rivals"), (1, "Rivals")]
+
+
+def test_gmt_series_repeat_at_a_fixed_utc_time(run_db):
+    start_time = (datetime.datetime.now() + DAY).replace(microsecond=0)
+
+    async def scenario(db):
+        series, scrims = await add_series(db, start_time, 60 * DAY, timezone=SERIES_TIMEZONES["GMT"])
+        return series.recurrence.describe(), [scrim.start_time.timestamp() for scrim in scrims]
+
+    description, starts = run_db(scenario)
+
+    assert description == "every week at the same UTC time"
+    assert {later - earlier for earlier, later in zip(starts, starts[1:])} == {7 * DAY.total_seconds()}
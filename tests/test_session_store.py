@@ -0,0 +1,316 @@
+import asyncio
+import datetime
+import time
+import types
+
+import scrim_bot
+import session_store
+from scrim_bot import DatabaseManager, ResumeScrimView
+from session_store import SessionStore, dump_session, load_session
+
+USER_ID = 42
+
+
+class FakeBackend:
+    """Keeps persisted sessions in a dict; fails the next `failures` saves."""
+
+    def __init__(self, failures=0):
+        self.rows = {}
+        self.saves = []
+        self.failures = failures
+
+    async def save_sessions(self, upserts, deletes):
+        self.saves.append((list(upserts), list(deletes)))
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("disk full")
+        for user_id, text, expires_at in upserts:
+            self.rows[user_id] = (text, expires_at)
+        for user_id in deletes:
+            self.rows.pop(user_id, None)
+
+    async def load_session(self, user_id):
+        return self.rows.get(user_id)
+
+    async def delete_expired_sessions(self, now):
+        self.rows = {user_id: row for user_id, row in self.rows.items() if row[1] > now}
+
+
+def test_datetimes_round_trip():
+    start_time = datetime.datetime(2026, 3, 29, 20, 30, 15)
+    data = {"workflow": "scrim", "start_time": start_time, "maps": ["Ascent"], "nested": {"at": start_time}}
+    assert load_session(dump_session(data)) == data
+
+
+def test_flush_writes_changes_in_one_batch():
+    backend = FakeBackend()
+    store = SessionStore(ttl=60, backend=backend)
+    store.begin(USER_ID, "scrim")["opponent"] = "Rivals"
+    store.begin(USER_ID + 1, "absence")
+    store.end(USER_ID + 1)
+
+    asyncio.run(store.flush())
+
+    assert len(backend.saves) == 1
+    upserts, deletes = backend.saves[0]
+    assert [user_id for user_id, _, _ in upserts] == [USER_ID]
+    assert deletes == [USER_ID + 1]
+    text, expires_at = backend.rows[USER_ID]
+    assert load_session(text) == {"workflow": "scrim", "opponent": "Rivals"}
+    assert time.time() < expires_at <= time.time() + 60
+    assert store.stats()["pending_writes"] == 0
+    assert store.metrics["flushes"] == 1
+
+    # Nothing changed since, so nothing is written
+    asyncio.run(store.flush())
+    assert len(backend.saves) == 1
+
+
+def test_fresh_store_restores_persisted_session():
+    backend = FakeBackend()
+    start_time = datetime.datetime(2026, 10, 25, 19, 0)
+    store = SessionStore(ttl=60, backend=backend)
+    store.begin(USER_ID, "scrim").update({"opponent": "Rivals", "start_time": start_time})
+    asyncio.run(store.flush())
+
+    # As after a restart: nothing in memory, same backend
+    restarted = SessionStore(ttl=60, backend=backend)
+    assert restarted.get(USER_ID) is None
+    data = asyncio.run(restarted.restore(USER_ID))
+
+    assert data == {"workflow": "scrim", "opponent": "Rivals", "start_time": start_time}
+    assert restarted.metrics["restored"] == 1
+    assert restarted.get(USER_ID) is data
+
+
+def test_expired_session_is_not_restored():
+    backend = FakeBackend()
+    backend.rows[USER_ID] = (dump_session({"workflow": "scrim"}), time.time() - 1)
+    store = SessionStore(ttl=60, backend=backend)
+
+    assert asyncio.run(store.restore(USER_ID)) is None
+    assert store.metrics["restored"] == 0
+
+
+def test_restored_session_is_swept_in_expiry_order(monkeypatch):
+    now = fake_clock(monkeypatch)
+    backend = FakeBackend()
+    # Persisted before a restart with only 5 seconds left
+    backend.rows[USER_ID + 1] = (dump_session({"workflow": "absence"}), now["time"] + 35)
+    store = SessionStore(ttl=60, backend=backend)
+    store.begin(USER_ID, "scrim")
+
+    now["monotonic"] += 30
+    now["time"] += 30
+    assert asyncio.run(store.restore(USER_ID + 1)) == {"workflow": "absence"}
+    expiries = [session.expires_at for session in store._sessions.values()]
+    assert expiries == sorted(expiries)
+
+    # The session started first expires first, the restored one a full TTL after restoring
+    now["monotonic"] += 40
+    assert store.sweep() == 1
+    assert USER_ID not in store and USER_ID + 1 in store
+    now["monotonic"] += 25
+    assert store.sweep() == 1
+    assert len(store) == 0
+
+
+def fake_clock(monkeypatch):
+    now = {"monotonic": 0.0, "time": 1_000_000.0}
+    monkeypatch.setattr(session_store, "time", types.SimpleNamespace(
+        monotonic=lambda: now["monotonic"], time=lambda: now["time"]
+    ))
+    return now
+
+
+def test_activity_extends_a_session(monkeypatch):
+    now = fake_clock(monkeypatch)
+    store = SessionStore(ttl=60)
+    store.begin(USER_ID, "scrim")
+
+    now["monotonic"] += 50
+    assert store.get(USER_ID) == {"workflow": "scrim"}
+    now["monotonic"] += 50
+    # Checking for a session doesn't count as activity
+    assert USER_ID in store
+    now["monotonic"] += 11
+
+    assert store.get(USER_ID) is None
+    assert USER_ID not in store
+    assert store.metrics["evicted_ttl"] == 1
+    assert store.metrics["hits"] == 2
+
+
+def test_least_recently_used_session_is_evicted_when_full():
+    store = SessionStore(ttl=60, max_size=3)
+    for user_id in (1, 2, 3):
+        store.begin(user_id, "scrim")
+    store.get(1)
+    store.begin(4, "scrim")
+    store.begin(5, "absence")
+
+    assert list(store._sessions) == [1, 4, 5]
+    assert store.stats()["size"] == 3
+    assert store.metrics["evicted_lru"] == 2
+    assert store.metrics["started"] == 5
+
+
+def test_sweeper_removes_abandoned_sessions():
+    store = SessionStore(ttl=0.05, sweep_interval=0.02)
+
+    async def scenario():
+        for user_id in range(100):
+            store.begin(user_id, "scrim")
+        store.start()
+        try:
+            await asyncio.sleep(0.2)
+        finally:
+            store.stop()
+
+    asyncio.run(scenario())
+
+    assert len(store) == 0
+    assert store.metrics["evicted_ttl"] == 100
+    assert store.metrics["misses"] == 0
+
+
+def test_failed_flush_is_retried():
+    backend = FakeBackend(failures=1)
+    store = SessionStore(ttl=60, backend=backend)
+    store.begin(USER_ID, "scrim")
+    store.begin(USER_ID + 1, "absence")
+
+    asyncio.run(store.flush())
+    assert backend.rows == {}
+    assert store.metrics["flush_errors"] == 1
+    assert store.stats()["pending_writes"] == 2
+
+    # A change queued after the failure wins over the failed one
+    store.end(USER_ID + 1)
+    asyncio.run(store.flush())
+
+    assert store.metrics["flushes"] == 1
+    assert set(backend.rows) == {USER_ID}
+    assert backend.saves[-1][1] == [USER_ID + 1]
+    assert store.stats()["pending_writes"] == 0
+
+
+def test_session_survives_restart_through_database(tmp_path):
+    start_time = datetime.datetime(2026, 3, 29, 1, 30)
+
+    async def scenario():
+        db = DatabaseManager(str(tmp_path / "bot_data.db"))
+        await db.initialize()
+        try:
+            store = SessionStore(ttl=60, backend=db)
+            store.begin(USER_ID, "scrim")["start_time"] = start_time
+            await store.close()
+
+            restarted = SessionStore(ttl=60, backend=db)
+            return await restarted.restore(USER_ID)
+        finally:
+            await db.close()
+
+    assert asyncio.run(scenario()) == {"workflow": "scrim", "start_time": start_time}
+
+
+class FakeResponse:
+    def __init__(self):
+        self.messages = []
+        self.modals = []
+
+    def is_done(self):
+        return False
+
+    async def send_message(self, content=None, **kwargs):
+        self.messages.append((content, kwargs))
+
+    async def send_modal(self, modal):
+        self.modals.append(modal)
+
+
+def fake_interaction(user_id):
+    return types.SimpleNamespace(user=types.SimpleNamespace(id=user_id), response=FakeResponse())
+
+
+def test_scrim_workflow_resumes_after_restart(tmp_path, monkeypatch):
+    start_time = datetime.datetime(2026, 10, 25, 20, 0)
+    monkeypatch.setattr(scrim_bot, "has_permission", lambda member, action: True)
+
+    async def scenario():
+        db = DatabaseManager(str(tmp_path / "bot_data.db"))
+        await db.initialize()
+        try:
+            # Team, time and opponent were entered before the bot restarted
+            store = SessionStore(ttl=60, backend=db)
+            store.begin(USER_ID, "scrim").update({
+                "team": "Affinity EMEA", "start_time": start_time, "timezone": "CET",
+                "opponent": "Rivals", "opponent_rank": "Diamond"
+            })
+            await store.close()
+
+            restarted = SessionStore(ttl=60, backend=db)
+            monkeypatch.setattr(scrim_bot, "sessions", restarted)
+
+            interaction = fake_interaction(USER_ID)
+            await scrim_bot.start_scrim_workflow(interaction)
+            content, kwargs = interaction.response.messages[0]
+            assert "unfinished scrim for **Affinity EMEA** against **Rivals**" in content
+            view = kwargs["view"]
+            assert isinstance(view, ResumeScrimView)
+
+            interaction = fake_interaction(USER_ID)
+            await view.resume_callback(interaction)
+            return interaction.response, restarted
+        finally:
+            await db.close()
+
+    response, restarted = asyncio.run(scenario())
+
+    # The next step after the opponent is the format
+    assert response.modals == []
+    content, kwargs = response.messages[0]
+    assert content == "Please select the match format:"
+    assert kwargs["view"].children[0].custom_id == f"format_select_{USER_ID}"
+    assert restarted.get(USER_ID) == {
+        "workflow": "scrim", "team": "Affinity EMEA", "start_time": start_time, "timezone": "CET",
+        "opponent": "Rivals", "opponent_rank": "Diamond"
+    }
+
+
+def test_step_after_the_session_expired_asks_to_start_again(monkeypatch):
+    store = SessionStore(ttl=60)
+    monkeypatch.setattr(scrim_bot, "sessions", store)
+    select = types.SimpleNamespace(values=["vacation"])
+
+    async def scenario():
+        button = scrim_bot.AbsenceButton()
+        expired = fake_interaction(USER_ID)
+        await button.on_absence_type_select(expired, select)
+
+        store.begin(USER_ID, "absence")
+        active = fake_interaction(USER_ID)
+        await button.on_absence_type_select(active, select)
+        return expired.response, active.response
+
+    expired, active = asyncio.run(scenario())
+
+    assert expired.messages == [("⌛ This session has expired. Please start again.", {"ephemeral": True})]
+    assert expired.modals == []
+    assert active.messages == [] and len(active.modals) == 1
+    assert store.get(USER_ID)["absence_type"]["value"] == "vacation"
+
+
+def test_view_timeout_leaves_the_session_to_its_ttl(monkeypatch):
+    store = SessionStore(ttl=900)
+    monkeypatch.setattr(scrim_bot, "sessions", store)
+
+    async def scenario():
+        store.begin(USER_ID, "scrim")
+        # The team was picked more than the view's 300 seconds ago, but later steps are still going
+        await scrim_bot.BasicView(USER_ID).on_timeout()
+
+    asyncio.run(scenario())
+
+    assert store.get(USER_ID) == {"workflow": "scrim"}
+    assert store.metrics["ended"] == 0
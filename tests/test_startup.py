@@ -0,0 +1,207 @@
+import asyncio
+
+import discord
+import pytest
+
+import scrim_bot
+from diagnostics import LoopLagMonitor
+from scrim_bot import AffinityBot, CalendarOutboxWorker, DatabaseManager, ReminderScheduler
+from session_store import SessionStore
+
+
+class FakeCalendarManager:
+    def __init__(self):
+        self.initialized = 0
+
+    async def initialize(self):
+        self.initialized += 1
+
+    def close(self):
+        pass
+
+
+class FakeDiscordCache:
+    def __init__(self):
+        self.warmed = 0
+
+    def clear(self):
+        pass
+
+    async def warm(self, channel_ids, role_ids):
+        self.warmed += 1
+
+
+def test_database_refuses_second_initialize(tmp_path):
+    async def scenario():
+        db = DatabaseManager(str(tmp_path / "bot_data.db"), reader_pool_size=2)
+        await db.initialize()
+        try:
+            connection, readers = db.connection, list(db._readers)
+            await db.initialize()
+            assert db.connection is connection
+            assert db._readers == readers
+        finally:
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("worker_class", [ReminderScheduler, CalendarOutboxWorker])
+def test_background_worker_start_is_idempotent(worker_class):
+    async def scenario():
+        worker = worker_class()
+        runs = []
+
+        async def run():
+            # Stands in for the loop, which waits for the gateway before doing anything
+            runs.append(asyncio.current_task())
+            await asyncio.Event().wait()
+
+        worker.run = run
+        task = worker.start()
+        assert worker.start() is task
+        await asyncio.sleep(0)
+        assert worker.start() is task
+        assert runs == [task]
+
+        await worker.stop()
+        assert task.cancelled()
+
+        # A stopped worker can be started again
+        restarted = worker.start()
+        assert restarted is not task
+        await asyncio.sleep(0)
+        assert len(runs) == 2
+        await worker.stop()
+
+    asyncio.run(scenario())
+
+
+def test_repeated_on_ready_does_not_repeat_startup(tmp_path, monkeypatch):
+    opened = []
+    connect = scrim_bot.aiosqlite.connect
+
+    def counting_connect(*args, **kwargs):
+        opened.append(args[0])
+        return connect(*args, **kwargs)
+
+    async def no_sync():
+        return False
+
+    async def scenario():
+        db = DatabaseManager(str(tmp_path / "bot_data.db"), reader_pool_size=1)
+        calendar = FakeCalendarManager()
+        cache = FakeDiscordCache()
+        workers = {"reminders": ReminderScheduler(), "calendar": CalendarOutboxWorker()}
+        runs = {name: 0 for name in workers}
+        for name, worker in workers.items():
+            async def run(name=name):
+                runs[name] += 1
+                await asyncio.Event().wait()
+            worker.run = run
+
+        monkeypatch.setattr(scrim_bot.aiosqlite, "connect", counting_connect)
+        monkeypatch.setattr(scrim_bot, "db_manager", db)
+        monkeypatch.setattr(scrim_bot, "calendar_manager", calendar)
+        monkeypatch.setattr(scrim_bot, "discord_cache", cache)
+        monkeypatch.setattr(scrim_bot, "reminder_scheduler", workers["reminders"])
+        monkeypatch.setattr(scrim_bot, "calendar_outbox", workers["calendar"])
+        monkeypatch.setattr(scrim_bot, "sessions", SessionStore())
+        monkeypatch.setattr(scrim_bot, "loop_lag_monitor", LoopLagMonitor())
+        monkeypatch.setattr(scrim_bot, "sync_command_tree", no_sync)
+
+        bot = AffinityBot(command_prefix="/", intents=discord.Intents(guilds=True))
+        await bot.setup_hook()
+        connection = db.connection
+        tasks = {name: worker._task for name, worker in workers.items()}
+        # A resume or reconnect dispatches on_ready again
+        for _ in range(3):
+            await scrim_bot.on_ready()
+            await asyncio.sleep(0)
+
+        try:
+            # The writer and the one pooled reader, both opened by setup_hook
+            assert len(opened) == 2
+            assert opened[0] == str(tmp_path / "bot_data.db")
+            assert db.connection is connection
+            assert calendar.initialized == 1
+            assert cache.warmed == 3
+            assert runs == {"reminders": 1, "calendar": 1}
+            assert {name: worker._task for name, worker in workers.items()} == tasks
+        finally:
+            for worker in workers.values():
+                await worker.stop()
+            scrim_bot.sessions.stop()
+            scrim_bot.loop_lag_monitor.stop()
+            await db.close()
+
+    asyncio.run(scenario())
+
+
+def test_command_tree_is_synced_only_when_it_changes(tmp_path, monkeypatch):
+    synced = []
+
+    async def sync():
+        synced.append(scrim_bot.command_tree_hash())
+        return scrim_bot.bot.tree.get_commands()
+
+    monkeypatch.setattr(scrim_bot.bot.tree, "sync", sync)
+    path = str(tmp_path / "bot_data.db")
+
+    async def ping(interaction: discord.Interaction):
+        pass
+    added = discord.app_commands.Command(name="ping", description="Check the bot responds", callback=ping)
+
+    async def boot(*expected):
+        """Start as after a restart, and sync once per expected outcome."""
+        db = DatabaseManager(path)
+        await db.initialize()
+        monkeypatch.setattr(scrim_bot, "db_manager", db)
+        try:
+            return [await scrim_bot.sync_command_tree(force=force) for force in expected]
+        finally:
+            await db.close()
+
+    async def scenario():
+        assert await boot(False, False) == [True, False]
+        # Restarting with the same commands doesn't sync
+        assert await boot(False) == [False]
+        # forcesync always does
+        assert await boot(True) == [True]
+
+        scrim_bot.bot.tree.add_command(added)
+        try:
+            assert await boot(False, False) == [True, False]
+        finally:
+            scrim_bot.bot.tree.remove_command("ping")
+        assert await boot(False) == [True]
+
+        # Another application needs its own commands registered
+        monkeypatch.setattr(scrim_bot.bot._connection, "application_id", 1234)
+        assert await boot(False) == [True]
+
+    asyncio.run(scenario())
+
+    assert len(synced) == 5
+    assert len(set(synced)) == 3
+
+
+def test_unreadable_sync_state_falls_back_to_syncing(monkeypatch):
+    synced = []
+
+    class BrokenState:
+        async def get_state(self, key):
+            raise RuntimeError("database is locked")
+
+        async def set_state(self, key, value):
+            raise RuntimeError("database is locked")
+
+    async def sync():
+        synced.append(True)
+        return []
+
+    monkeypatch.setattr(scrim_bot.bot.tree, "sync", sync)
+    monkeypatch.setattr(scrim_bot, "db_manager", BrokenState())
+
+    assert asyncio.run(scrim_bot.sync_command_tree()) is True
+    assert synced == [True]